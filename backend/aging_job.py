@@ -0,0 +1,40 @@
+#!/usr/bin/env python
+"""Maintain the accounts-receivable aging buckets.
+
+With no flags, moves balances that crossed a 30/60/90-day boundary
+(run nightly). --rebuild recomputes all buckets from bills; --check
+reports drift without writing.
+"""
+import argparse
+import sys
+from datetime import date
+sys.path.insert(0, '.')
+
+from app.db.session import SessionLocal
+from app.services import aging
+
+parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+group = parser.add_mutually_exclusive_group()
+group.add_argument("--rebuild", action="store_true", help="Recompute every bucket from bills")
+group.add_argument("--check", action="store_true", help="Compare stored buckets with a recomputation")
+parser.add_argument("--as-of", type=date.fromisoformat, default=None, help="Aging date (YYYY-MM-DD), default today")
+args = parser.parse_args()
+
+db = SessionLocal()
+try:
+    if args.rebuild:
+        patients = aging.rebuild(db, args.as_of)
+        print(f"✓ Rebuilt aging buckets for {patients} patients")
+    elif args.check:
+        result = aging.check(db, args.as_of)
+        print(f"Patients with drifted balances: {len(result['mismatched_patients'])}")
+        print(f"Bills in the wrong bucket: {result['misbucketed_bills']}")
+        if result["mismatched_patients"] or result["misbucketed_bills"]:
+            print(f"  First mismatched patients: {result['mismatched_patients'][:20]}")
+            sys.exit(1)
+        print("✓ Aging buckets match bills")
+    else:
+        moved = aging.age_balances(db, args.as_of)
+        print(f"✓ Aged receivables: {moved}")
+finally:
+    db.close()
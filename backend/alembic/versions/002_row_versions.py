@@ -0,0 +1,32 @@
+"""
+Add optimistic-concurrency version counters.
+
+Revision ID: 002_row_versions
+Revises: 001_initial_schema
+Create Date: 2026-10-19 00:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "002_row_versions"
+down_revision = "001_initial_schema"
+branch_labels = None
+depends_on = None
+
+VERSIONED_TABLES = ['patients', 'appointments', 'medical_records', 'bills']
+
+
+def upgrade() -> None:
+    """Add a version column to every mutable table."""
+    for table in VERSIONED_TABLES:
+        op.add_column(
+            table,
+            sa.Column('version', sa.Integer(), nullable=False, server_default='1')
+        )
+
+
+def downgrade() -> None:
+    """Drop the version columns."""
+    for table in VERSIONED_TABLES:
+        op.drop_column(table, 'version')
@@ -0,0 +1,31 @@
+"""
+Add soft-delete timestamps.
+
+Revision ID: 003_soft_delete
+Revises: 002_row_versions
+Create Date: 2026-10-19 00:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "003_soft_delete"
+down_revision = "002_row_versions"
+branch_labels = None
+depends_on = None
+
+SOFT_DELETE_TABLES = ['patients', 'doctors', 'users']
+
+
+def upgrade() -> None:
+    """Add an indexed deleted_at column to soft-deletable tables."""
+    for table in SOFT_DELETE_TABLES:
+        op.add_column(table, sa.Column('deleted_at', sa.DateTime(), nullable=True))
+        op.create_index(f'ix_{table}_deleted_at', table, ['deleted_at'])
+
+
+def downgrade() -> None:
+    """Drop the deleted_at columns."""
+    for table in SOFT_DELETE_TABLES:
+        op.drop_index(f'ix_{table}_deleted_at', table_name=table)
+        op.drop_column(table, 'deleted_at')
@@ -0,0 +1,39 @@
+"""
+Add stored responses for Idempotency-Key replays.
+
+Revision ID: 004_idempotency_keys
+Revises: 003_soft_delete
+Create Date: 2026-10-19 00:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "004_idempotency_keys"
+down_revision = "003_soft_delete"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Create idempotency_keys table."""
+    op.create_table(
+        'idempotency_keys',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('key_hash', sa.String(64), nullable=False),
+        sa.Column('request_hash', sa.String(64), nullable=False),
+        sa.Column('state', sa.String(20), nullable=False),
+        sa.Column('status_code', sa.Integer(), nullable=True),
+        sa.Column('content_type', sa.String(100), nullable=True),
+        sa.Column('response_body', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('expires_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('key_hash'),
+        sa.Index('idx_idempotency_keys_expires_at', 'expires_at')
+    )
+
+
+def downgrade() -> None:
+    """Drop idempotency_keys table."""
+    op.drop_table('idempotency_keys')
@@ -0,0 +1,33 @@
+"""
+Add per-facility/per-year bill number counters.
+
+Revision ID: 005_bill_number_sequences
+Revises: 004_idempotency_keys
+Create Date: 2026-10-19 00:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "005_bill_number_sequences"
+down_revision = "004_idempotency_keys"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Create bill_number_sequences table."""
+    op.create_table(
+        'bill_number_sequences',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('facility', sa.String(20), nullable=False),
+        sa.Column('year', sa.Integer(), nullable=False),
+        sa.Column('next_value', sa.BigInteger(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('facility', 'year', name='uq_bill_number_sequences_facility_year')
+    )
+
+
+def downgrade() -> None:
+    """Drop bill_number_sequences table."""
+    op.drop_table('bill_number_sequences')
@@ -0,0 +1,46 @@
+"""
+Store money as Decimal and track bill balances.
+
+Revision ID: 006_bill_balances
+Revises: 005_bill_number_sequences
+Create Date: 2026-10-19 00:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "006_bill_balances"
+down_revision = "005_bill_number_sequences"
+branch_labels = None
+depends_on = None
+
+MONEY = sa.Numeric(12, 2)
+
+
+def upgrade() -> None:
+    """Convert money columns to DECIMAL and add running balances."""
+    for column in ['amount', 'tax', 'total_amount']:
+        op.alter_column('bills', column, type_=MONEY, existing_type=sa.Float())
+    op.alter_column('payments', 'amount', type_=MONEY, existing_type=sa.Float(), existing_nullable=False)
+
+    op.add_column('bills', sa.Column('amount_paid', MONEY, nullable=False, server_default='0'))
+    op.add_column('bills', sa.Column('balance_due', MONEY, nullable=False, server_default='0'))
+
+    # Backfill from existing payments; two statements because MySQL
+    # evaluates multi-column SET clauses left to right
+    op.execute(
+        "UPDATE bills SET amount_paid = COALESCE("
+        "(SELECT SUM(payments.amount) FROM payments WHERE payments.bill_id = bills.id), 0)"
+    )
+    op.execute("UPDATE bills SET balance_due = total_amount - amount_paid")
+    op.create_index('idx_bills_balance_due', 'bills', ['balance_due'])
+
+
+def downgrade() -> None:
+    """Drop running balances and restore float money columns."""
+    op.drop_index('idx_bills_balance_due', table_name='bills')
+    op.drop_column('bills', 'balance_due')
+    op.drop_column('bills', 'amount_paid')
+    op.alter_column('payments', 'amount', type_=sa.Float(), existing_type=MONEY, existing_nullable=False)
+    for column in ['amount', 'tax', 'total_amount']:
+        op.alter_column('bills', column, type_=sa.Float(), existing_type=MONEY)
@@ -0,0 +1,45 @@
+"""
+Add incrementally maintained receivables aging buckets.
+
+Run ``python aging_job.py --rebuild`` once after upgrading to populate
+the buckets from existing bills.
+
+Revision ID: 007_ar_aging
+Revises: 006_bill_balances
+Create Date: 2026-10-19 00:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "007_ar_aging"
+down_revision = "006_bill_balances"
+branch_labels = None
+depends_on = None
+
+MONEY = sa.Numeric(14, 2)
+
+
+def upgrade() -> None:
+    """Add bills.aging_bucket and the ar_aging_balances table."""
+    op.add_column('bills', sa.Column('aging_bucket', sa.SmallInteger(), nullable=False, server_default='0'))
+    op.create_index('idx_bills_aging_bucket_due_date', 'bills', ['aging_bucket', 'due_date'])
+
+    op.create_table(
+        'ar_aging_balances',
+        sa.Column('patient_id', sa.Integer(), nullable=False),
+        sa.Column('days_0_30', MONEY, nullable=False, server_default='0'),
+        sa.Column('days_31_60', MONEY, nullable=False, server_default='0'),
+        sa.Column('days_61_90', MONEY, nullable=False, server_default='0'),
+        sa.Column('days_over_90', MONEY, nullable=False, server_default='0'),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['patient_id'], ['patients.id']),
+        sa.PrimaryKeyConstraint('patient_id')
+    )
+
+
+def downgrade() -> None:
+    """Drop aging buckets."""
+    op.drop_table('ar_aging_balances')
+    op.drop_index('idx_bills_aging_bucket_due_date', table_name='bills')
+    op.drop_column('bills', 'aging_bucket')
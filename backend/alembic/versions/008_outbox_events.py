@@ -0,0 +1,42 @@
+"""
+Add transactional outbox for appointment and billing events.
+
+Revision ID: 008_outbox_events
+Revises: 007_ar_aging
+Create Date: 2026-10-19 00:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "008_outbox_events"
+down_revision = "007_ar_aging"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Create outbox_events table."""
+    op.create_table(
+        'outbox_events',
+        sa.Column('id', sa.BigInteger(), autoincrement=True, nullable=False),
+        sa.Column('event_type', sa.String(50), nullable=False),
+        sa.Column('aggregate_type', sa.String(50), nullable=False),
+        sa.Column('aggregate_id', sa.Integer(), nullable=False),
+        sa.Column('payload', sa.Text(), nullable=False),
+        sa.Column('status', sa.String(20), nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('claim_token', sa.String(32), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('available_at', sa.DateTime(), nullable=False),
+        sa.Column('delivered_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.Index('idx_outbox_events_status_available_at', 'status', 'available_at'),
+        sa.Index('ix_outbox_events_claim_token', 'claim_token')
+    )
+
+
+def downgrade() -> None:
+    """Drop outbox_events table."""
+    op.drop_table('outbox_events')
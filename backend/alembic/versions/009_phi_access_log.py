@@ -0,0 +1,66 @@
+"""
+Add the PHI access audit log, partitioned by month on MySQL.
+
+The primary key includes accessed_at because MySQL requires the
+partitioning column in every unique key. Run ``python audit_partitions.py``
+monthly to add partitions ahead of time; rows past the last monthly
+partition land in ``pmax`` until then.
+
+Revision ID: 009_phi_access_log
+Revises: 008_outbox_events
+Create Date: 2026-10-19 00:00:00.000000
+"""
+from datetime import date, timedelta
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "009_phi_access_log"
+down_revision = "008_outbox_events"
+branch_labels = None
+depends_on = None
+
+MONTHS_AHEAD = 3
+
+
+def _next_month(month: date) -> date:
+    return (month.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def upgrade() -> None:
+    """Create phi_access_log."""
+    op.create_table(
+        'phi_access_log',
+        sa.Column('id', sa.BigInteger(), autoincrement=True, nullable=False),
+        sa.Column('accessed_at', sa.DateTime(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('role', sa.String(20), nullable=True),
+        sa.Column('action', sa.SmallInteger(), nullable=False),
+        sa.Column('patient_id', sa.Integer(), nullable=True),
+        sa.Column('resource_id', sa.Integer(), nullable=True),
+        sa.Column('client_ip', sa.String(45), nullable=True),
+        sa.PrimaryKeyConstraint('id', 'accessed_at'),
+        sa.Index('idx_phi_access_log_patient_accessed_at', 'patient_id', 'accessed_at'),
+        sa.Index('idx_phi_access_log_user_accessed_at', 'user_id', 'accessed_at')
+    )
+
+    if op.get_bind().dialect.name == 'mysql':
+        month = date.today().replace(day=1)
+        partitions = []
+        for _ in range(MONTHS_AHEAD + 1):
+            following = _next_month(month)
+            partitions.append(
+                f"PARTITION p{month:%Y%m} VALUES LESS THAN (TO_DAYS('{following:%Y-%m-%d}'))"
+            )
+            month = following
+        partitions.append("PARTITION pmax VALUES LESS THAN MAXVALUE")
+        op.execute(
+            "ALTER TABLE phi_access_log PARTITION BY RANGE (TO_DAYS(accessed_at)) ("
+            + ", ".join(partitions) + ")"
+        )
+
+
+def downgrade() -> None:
+    """Drop phi_access_log."""
+    op.drop_table('phi_access_log')
@@ -0,0 +1,59 @@
+"""
+Reserve doctor slots so concurrent bookings cannot double-book.
+
+Existing active appointments are given their slots. Where two already
+share a slot, the earlier booking keeps it and the later ones are
+printed for the front desk to resolve; they stay scheduled but hold no
+slot.
+
+Revision ID: 010_appointment_slots
+Revises: 009_phi_access_log
+Create Date: 2026-10-19 00:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from app.services.scheduling import slot_start
+
+
+revision = "010_appointment_slots"
+down_revision = "009_phi_access_log"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Create appointment_slots and reserve slots for active appointments."""
+    slots = op.create_table(
+        'appointment_slots',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('doctor_id', sa.Integer(), nullable=False),
+        sa.Column('slot_start', sa.DateTime(), nullable=False),
+        sa.Column('appointment_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['doctor_id'], ['users.id']),
+        sa.ForeignKeyConstraint(['appointment_id'], ['appointments.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('doctor_id', 'slot_start', name='uq_appointment_slots_doctor_slot'),
+        sa.UniqueConstraint('appointment_id')
+    )
+
+    rows = op.get_bind().execute(sa.text(
+        "SELECT id, doctor_id, appointment_date FROM appointments "
+        "WHERE status != 'CANCELLED' ORDER BY id"
+    )).all()
+    taken = set()
+    reservations = []
+    for appointment_id, doctor_id, appointment_date in rows:
+        key = (doctor_id, slot_start(appointment_date))
+        if key in taken:
+            print(f"  appointment {appointment_id} double-books doctor {doctor_id} at {key[1]}; left without a slot")
+            continue
+        taken.add(key)
+        reservations.append({'doctor_id': doctor_id, 'slot_start': key[1], 'appointment_id': appointment_id})
+    if reservations:
+        op.bulk_insert(slots, reservations)
+
+
+def downgrade() -> None:
+    """Drop appointment_slots."""
+    op.drop_table('appointment_slots')
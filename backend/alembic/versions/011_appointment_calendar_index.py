@@ -0,0 +1,24 @@
+"""
+Index appointments by doctor and time for calendar range queries.
+
+Revision ID: 011_appointment_calendar_index
+Revises: 010_appointment_slots
+Create Date: 2026-10-19 00:00:00.000000
+"""
+from alembic import op
+
+
+revision = "011_appointment_calendar_index"
+down_revision = "010_appointment_slots"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Add the (doctor_id, appointment_date) index."""
+    op.create_index('idx_appointments_doctor_id_appointment_date', 'appointments', ['doctor_id', 'appointment_date'])
+
+
+def downgrade() -> None:
+    """Drop the (doctor_id, appointment_date) index."""
+    op.drop_index('idx_appointments_doctor_id_appointment_date', table_name='appointments')
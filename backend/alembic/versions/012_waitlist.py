@@ -0,0 +1,58 @@
+"""
+Add the cancellation waitlist.
+
+Revision ID: 012_waitlist
+Revises: 011_appointment_calendar_index
+Create Date: 2026-10-19 00:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "012_waitlist"
+down_revision = "011_appointment_calendar_index"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Create waitlist_entries and waitlist_windows tables."""
+    op.create_table(
+        'waitlist_entries',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('patient_id', sa.Integer(), nullable=False),
+        sa.Column('doctor_id', sa.Integer(), nullable=True),
+        sa.Column('specialization', sa.String(255), nullable=True),
+        sa.Column('reason', sa.String(255), nullable=False),
+        sa.Column('priority', sa.Integer(), nullable=False),
+        sa.Column('status', sa.String(50), nullable=False),
+        sa.Column('offered_doctor_id', sa.Integer(), nullable=True),
+        sa.Column('offered_slot_start', sa.DateTime(), nullable=True),
+        sa.Column('offered_at', sa.DateTime(), nullable=True),
+        sa.Column('appointment_id', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['patient_id'], ['patients.id']),
+        sa.ForeignKeyConstraint(['doctor_id'], ['users.id']),
+        sa.ForeignKeyConstraint(['offered_doctor_id'], ['users.id']),
+        sa.ForeignKeyConstraint(['appointment_id'], ['appointments.id']),
+        sa.PrimaryKeyConstraint('id'),
+        sa.Index('ix_waitlist_entries_id', 'id'),
+        sa.Index('idx_waitlist_entries_updated_at', 'updated_at')
+    )
+    op.create_table(
+        'waitlist_windows',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('entry_id', sa.Integer(), nullable=False),
+        sa.Column('window_start', sa.DateTime(), nullable=False),
+        sa.Column('window_end', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['entry_id'], ['waitlist_entries.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.Index('ix_waitlist_windows_entry_id', 'entry_id')
+    )
+
+
+def downgrade() -> None:
+    """Drop waitlist tables."""
+    op.drop_table('waitlist_windows')
+    op.drop_table('waitlist_entries')
@@ -0,0 +1,20 @@
+#!/usr/bin/env python
+"""Build the columnar snapshot the analytics reports are served from.
+
+Run nightly. Extracts from ANALYTICS_DATABASE_URL when set (point it at
+a read replica), otherwise from DATABASE_URL.
+"""
+import argparse
+import sys
+sys.path.insert(0, '.')
+
+from app.services.analytics import build_snapshot, source_engine
+
+parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+parser.add_argument("--output-dir", default=None, help="Override ANALYTICS_DIR")
+parser.add_argument("--keep", type=int, default=2, help="Snapshots to keep (default 2)")
+args = parser.parse_args()
+
+manifest = build_snapshot(source_engine(), args.output_dir, keep=args.keep)
+rows = ", ".join(f"{count} {table}" for table, count in manifest["rows"].items())
+print(f"✓ Snapshot {manifest['name']}: {rows}")
@@ -0,0 +1,62 @@
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from typing import Optional
+
+from app.core.security import check_role
+from app.services import analytics
+
+router = APIRouter(prefix="/api/v1/analytics", tags=["Analytics"])
+
+# Reports are served from the snapshot built by analytics_snapshot.py
+MONTH_PATTERN = r"^\d{4}-(0[1-9]|1[0-2])$"
+
+
+def _snapshot() -> analytics.Snapshot:
+    try:
+        return analytics.current_snapshot()
+    except analytics.SnapshotNotFound as exc:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(exc))
+
+
+def _report(snapshot: analytics.Snapshot, rows: list[dict]) -> dict:
+    return {"as_of": snapshot.manifest["created_at"], "rows": rows}
+
+
+@router.get("/snapshot")
+def get_snapshot(current_user: dict = Depends(check_role(["admin"]))):
+    """When the current snapshot was taken and how many rows it holds (Admin only)."""
+    manifest = _snapshot().manifest
+    return {"name": manifest["name"], "created_at": manifest["created_at"], "rows": manifest["rows"]}
+
+
+@router.get("/revenue-by-doctor")
+def revenue_by_doctor(
+    start: Optional[str] = Query(None, pattern=MONTH_PATTERN, description="First month, YYYY-MM"),
+    end: Optional[str] = Query(None, pattern=MONTH_PATTERN, description="Last month, YYYY-MM"),
+    current_user: dict = Depends(check_role(["admin"]))
+):
+    """Billed and collected amounts per doctor and month (Admin only)."""
+    snapshot = _snapshot()
+    return _report(snapshot, analytics.revenue_by_doctor_month(snapshot, start, end))
+
+
+@router.get("/visits-by-specialization")
+def visits_by_specialization(
+    start: Optional[str] = Query(None, pattern=MONTH_PATTERN, description="First month, YYYY-MM"),
+    end: Optional[str] = Query(None, pattern=MONTH_PATTERN, description="Last month, YYYY-MM"),
+    appointment_status: Optional[str] = Query("completed", alias="status", description="Empty for all statuses"),
+    current_user: dict = Depends(check_role(["admin"]))
+):
+    """Appointments and distinct patients per specialization (Admin only)."""
+    snapshot = _snapshot()
+    return _report(snapshot, analytics.visits_by_specialization(snapshot, start, end, appointment_status or None))
+
+
+@router.get("/payment-methods")
+def payment_methods(
+    start: Optional[str] = Query(None, pattern=MONTH_PATTERN, description="First month, YYYY-MM"),
+    end: Optional[str] = Query(None, pattern=MONTH_PATTERN, description="Last month, YYYY-MM"),
+    current_user: dict = Depends(check_role(["admin"]))
+):
+    """Completed payments by method with each method's share (Admin only)."""
+    snapshot = _snapshot()
+    return _report(snapshot, analytics.payment_method_mix(snapshot, start, end))
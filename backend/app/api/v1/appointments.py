@@ -1,13 +1,34 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Header, Response
 from sqlalchemy.orm import Session
+from sqlalchemy import select
+from typing import Optional
+from datetime import date, datetime, time, timedelta
 
 from app.db.session import get_db
-from app.schemas.appointment import AppointmentCreate, AppointmentUpdate, AppointmentResponse
-from app.models.appointment import Appointment
+from app.schemas.appointment import AppointmentCreate, AppointmentUpdate, AppointmentResponse, CalendarResponse
+from app.models.appointment import Appointment, AppointmentStatus
+from app.models.patient import Patient
 from app.core.security import get_current_user, check_role
+from app.core.concurrency import conditional_update, format_etag
+from app.core.expansions import ExpansionSet, doctor_summary, expandable, patient_summary
+from app.core.counts import CountMode, count_mode, total_count_headers
+from app.core.fieldsets import FieldSet, sparse_fields
+from app.core.lookup import IdList, check_ids, fetch_by_ids, requested_ids
+from app.core.responses import json_response
+from app.services.outbox import record_event
+from app.services.scheduling import MissingReference, SlotTaken, book, event_payload, slot_start, sync_slot
+from app.services.waitlist import waitlist_matcher
 
 router = APIRouter(prefix="/api/v1/appointments", tags=["Appointments"])
 
+SLOT_TAKEN = "Doctor already has an appointment in this slot"
+MISSING_REFERENCE = "Patient or doctor not found"
+CALENDAR_MAX_DAYS = 62
+
+list_fields = sparse_fields(AppointmentResponse, Appointment, deferred=("notes",))
+item_fields = sparse_fields(AppointmentResponse, Appointment, always=("version",))
+list_expansions = expandable(patient=patient_summary(Appointment.patient), doctor=doctor_summary(Appointment.doctor))
+
 
 @router.post("", response_model=AppointmentResponse)
 def create_appointment(
@@ -15,11 +36,16 @@ def create_appointment(
     current_user: dict = Depends(check_role(["admin", "receptionist", "doctor"])),
     db: Session = Depends(get_db)
 ):
-    """Create a new appointment."""
+    """Create a new appointment; 409 if the doctor's slot is already booked, 400 for an unknown patient or doctor."""
     db_appointment = Appointment(**appointment_data.dict())
-    db.add(db_appointment)
+    try:
+        book(db, db_appointment)
+    except SlotTaken:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=SLOT_TAKEN)
+    except MissingReference:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=MISSING_REFERENCE)
+    record_event(db, "appointment.created", "appointment", db_appointment.id, event_payload(db_appointment))
     db.commit()
-    db.refresh(db_appointment)
     return db_appointment
 
 
@@ -30,54 +56,151 @@ def list_appointments(
     patient_id: int = Query(None),
     doctor_id: int = Query(None),
     status_filter: str = Query(None, alias="status"),
+    ids: Optional[list[int]] = Depends(requested_ids),
+    fields: FieldSet = Depends(list_fields),
+    expand: ExpansionSet = Depends(list_expansions),
+    count: CountMode = Depends(count_mode),
     current_user: dict = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """List appointments with optional filters."""
-    query = db.query(Appointment)
+    """List appointments with optional filters, or the ones in ids. notes are only sent when asked for in fields."""
+    statement = fields.select(also=expand.foreign_keys)
+    model = list[expand.model(fields.model)]
+    if ids is not None:
+        appointments, headers = fetch_by_ids(fields.fetch, db, statement, Appointment.id, ids)
+        return json_response(model, expand.expand(db, appointments), headers=headers)
     
     if patient_id:
-        query = query.filter(Appointment.patient_id == patient_id)
+        statement = statement.where(Appointment.patient_id == patient_id)
     if doctor_id:
-        query = query.filter(Appointment.doctor_id == doctor_id)
+        statement = statement.where(Appointment.doctor_id == doctor_id)
     if status_filter:
-        query = query.filter(Appointment.status == status_filter)
+        statement = statement.where(Appointment.status == status_filter)
+    
+    headers = total_count_headers(db, statement, count)
+    appointments = fields.fetch(db, statement.offset(skip).limit(limit))
+    return json_response(model, expand.expand(db, appointments), headers=headers)
+
+
+@router.post("/lookup", response_model=list[AppointmentResponse])
+def lookup_appointments(
+    lookup: IdList,
+    fields: FieldSet = Depends(list_fields),
+    current_user: dict = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Appointments by id, as GET with ids, for lists too long for a URL."""
+    appointments, headers = fetch_by_ids(fields.fetch, db, fields.select(), Appointment.id, check_ids(lookup.ids))
+    return json_response(list[fields.model], appointments, headers=headers)
+
+
+@router.get("/calendar", response_model=CalendarResponse)
+def get_calendar(
+    doctor_id: int,
+    start: date = Query(..., alias="from", description="First day, YYYY-MM-DD"),
+    end: date = Query(..., alias="to", description="Last day, YYYY-MM-DD (inclusive)"),
+    include_cancelled: bool = Query(False),
+    current_user: dict = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """A doctor's appointments between two days, grouped by day.
+    
+    One range query on (doctor_id, appointment_date) with the patient's
+    name joined in; at most CALENDAR_MAX_DAYS days. The join is outer: an
+    appointment still holds the doctor's slot even if its patient row is
+    missing, so it stays on the calendar with no name.
+    """
+    if end < start:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="'to' must not be before 'from'")
+    if (end - start).days >= CALENDAR_MAX_DAYS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Calendar range is limited to {CALENDAR_MAX_DAYS} days"
+        )
+    
+    query = (
+        select(
+            Appointment.id, Appointment.appointment_date, Appointment.status, Appointment.reason,
+            Appointment.patient_id, Patient.first_name, Patient.last_name
+        )
+        .outerjoin(Patient, Patient.id == Appointment.patient_id)
+        .where(
+            Appointment.doctor_id == doctor_id,
+            Appointment.appointment_date >= datetime.combine(start, time.min),
+            Appointment.appointment_date < datetime.combine(end + timedelta(days=1), time.min)
+        )
+        .order_by(Appointment.appointment_date, Appointment.id)
+    )
+    if not include_cancelled:
+        query = query.where(Appointment.status != AppointmentStatus.CANCELLED)
+    # Booked appointments stay on the calendar even if the patient was archived
+    rows = db.execute(query, execution_options={"include_deleted": True}).all()
     
-    appointments = query.offset(skip).limit(limit).all()
-    return appointments
+    days = {}
+    for row in rows:
+        days.setdefault(row.appointment_date.date(), []).append({
+            "id": row.id,
+            "start": row.appointment_date.strftime("%H:%M"),
+            "status": row.status,
+            "reason": row.reason,
+            "patient_id": row.patient_id,
+            "patient_name": f"{row.first_name} {row.last_name}" if row.first_name is not None else None,
+        })
+    return {
+        "doctor_id": doctor_id,
+        "start": start,
+        "end": end,
+        "days": [{"date": day, "appointments": entries} for day, entries in days.items()],
+    }
 
 
 @router.get("/{appointment_id}", response_model=AppointmentResponse)
 def get_appointment(
     appointment_id: int,
+    fields: FieldSet = Depends(item_fields),
     current_user: dict = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Get appointment by ID."""
-    appointment = db.query(Appointment).filter(Appointment.id == appointment_id).first()
+    appointment = db.query(Appointment).options(*fields.load_options()).filter(Appointment.id == appointment_id).first()
     if not appointment:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Appointment not found")
-    return appointment
+    return json_response(fields.model, appointment, headers={"ETag": format_etag(appointment.version)})
 
 
 @router.put("/{appointment_id}", response_model=AppointmentResponse)
 def update_appointment(
     appointment_id: int,
     appointment_update: AppointmentUpdate,
+    response: Response,
+    if_match: Optional[str] = Header(None),
     current_user: dict = Depends(check_role(["admin", "receptionist", "doctor"])),
     db: Session = Depends(get_db)
 ):
-    """Update appointment."""
-    appointment = db.query(Appointment).filter(Appointment.id == appointment_id).first()
-    if not appointment:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Appointment not found")
-    
+    """Update appointment. Send If-Match with the ETag from GET to reject stale writes."""
     update_data = appointment_update.dict(exclude_unset=True)
-    for field, value in update_data.items():
-        setattr(appointment, field, value)
     
-    db.commit()
-    db.refresh(appointment)
+    cancelling = update_data.get("status") == AppointmentStatus.CANCELLED
+    
+    def publish_change(appointment):
+        if "appointment_date" in update_data or "status" in update_data:
+            try:
+                sync_slot(db, appointment)
+            except SlotTaken:
+                raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=SLOT_TAKEN)
+        if cancelling:
+            record_event(db, "appointment.cancelled", "appointment", appointment.id, event_payload(appointment))
+            # Offer the freed slot to the waitlist in the same transaction
+            waitlist_matcher.match(db, appointment.doctor_id, slot_start(appointment.appointment_date))
+        else:
+            payload = {**event_payload(appointment), "changed": sorted(update_data)}
+            record_event(db, "appointment.updated", "appointment", appointment.id, payload)
+    
+    appointment = conditional_update(
+        db, Appointment, appointment_id, update_data, if_match, "Appointment not found",
+        before_commit=publish_change
+    )
+    response.headers["ETag"] = format_etag(appointment.version)
     return appointment
 
 
@@ -93,6 +216,7 @@ def delete_appointment(
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Appointment not found")
     
     db.delete(appointment)
+    record_event(db, "appointment.deleted", "appointment", appointment_id, event_payload(appointment))
     db.commit()
     
     return {"message": f"Appointment {appointment_id} deleted successfully"}
@@ -0,0 +1,46 @@
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from sqlalchemy.orm import Session
+from datetime import datetime, timedelta
+from typing import Optional
+
+from app.db.session import get_db
+from app.schemas.audit import PhiAccessResponse
+from app.models.audit import AuditAction, PhiAccessLog
+from app.core.security import check_role
+
+router = APIRouter(prefix="/api/v1/audit", tags=["Audit"])
+
+
+@router.get("/phi-access", response_model=list[PhiAccessResponse])
+def list_phi_access(
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    patient_id: int = Query(None),
+    user_id: int = Query(None),
+    action: str = Query(None, description="patient_read, medical_record_read or medical_record_list"),
+    start: Optional[datetime] = Query(None, description="Defaults to 30 days before end"),
+    end: Optional[datetime] = Query(None, description="Defaults to now"),
+    current_user: dict = Depends(check_role(["admin"])),
+    db: Session = Depends(get_db)
+):
+    """Who read which patient's records, newest first (Admin only).
+    
+    Always bounded by a time window so MySQL only scans the monthly
+    partitions it covers. Reads from the last few seconds may still be
+    queued in the API workers.
+    """
+    end = end or datetime.utcnow()
+    start = start or end - timedelta(days=30)
+    query = db.query(PhiAccessLog).filter(PhiAccessLog.accessed_at >= start, PhiAccessLog.accessed_at < end)
+    
+    if patient_id:
+        query = query.filter(PhiAccessLog.patient_id == patient_id)
+    if user_id:
+        query = query.filter(PhiAccessLog.user_id == user_id)
+    if action:
+        try:
+            query = query.filter(PhiAccessLog.action == AuditAction[action.upper()])
+        except KeyError:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Unknown audit action")
+    
+    return query.order_by(PhiAccessLog.accessed_at.desc()).offset(skip).limit(limit).all()
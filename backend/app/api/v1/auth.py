@@ -5,6 +5,7 @@ from datetime import timedelta
 from app.db.session import get_db
 from app.schemas.user import LoginRequest, LoginResponse, UserCreate, UserResponse, UserUpdate
 from app.models.user import User
+from app.core.response_cache import response_cache
 from app.core.security import (
     hash_password, verify_password, create_access_token, get_current_user, check_role
 )
@@ -16,8 +17,8 @@ router = APIRouter(prefix="/api/v1/auth", tags=["Authentication"])
 def register(user_data: UserCreate, db: Session = Depends(get_db)):
     """Register a new user."""
     try:
-        # Check if user already exists
-        existing_user = db.query(User).filter(
+        # Check if user already exists; soft-deleted users keep their email and username until purged
+        existing_user = db.query(User).execution_options(include_deleted=True).filter(
             (User.email == user_data.email) | (User.username == user_data.username)
         ).first()
         
@@ -39,7 +40,7 @@ def register(user_data: UserCreate, db: Session = Depends(get_db)):
         
         db.add(db_user)
         db.commit()
-        db.refresh(db_user)
+        response_cache.invalidate("user:list")
         
         # Create access token
         access_token = create_access_token(
@@ -137,7 +138,9 @@ def update_current_user(
         user.full_name = user_update.full_name
     if user_update.email:
         # Check if email is already taken
-        existing = db.query(User).filter(User.email == user_update.email, User.id != user.id).first()
+        existing = db.query(User).execution_options(include_deleted=True).filter(
+            User.email == user_update.email, User.id != user.id
+        ).first()
         if existing:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Email already taken")
         user.email = user_update.email
@@ -145,7 +148,7 @@ def update_current_user(
         user.hashed_password = hash_password(user_update.password)
     
     db.commit()
-    db.refresh(user)
+    response_cache.invalidate(f"user:{user.id}", "user:list", "doctor:list")
     return user
 
 
@@ -178,6 +181,6 @@ def promote_to_admin(
     from app.models.user import RoleEnum
     user.role = RoleEnum.ADMIN
     db.commit()
-    db.refresh(user)
+    response_cache.invalidate(f"user:{user_id}", "user:list")
     
     return user
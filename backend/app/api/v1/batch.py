@@ -0,0 +1,36 @@
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from sqlalchemy.orm import Session
+
+from app.db.session import get_db
+from app.schemas.batch import BatchRequest, BatchResponse
+from app.core.batch import run_batch
+from app.core.config import get_settings
+from app.core.security import get_current_user
+
+router = APIRouter(prefix="/api/v1/batch", tags=["Batch"])
+
+
+@router.post("", response_model=BatchResponse)
+async def batch(
+    batch_request: BatchRequest,
+    request: Request,
+    current_user: dict = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Run several API requests in one round trip; responses come back in request order.
+    
+    Sub-requests run as the caller and share one database session. Each
+    gets its own status, so one failing does not stop the rest.
+    Consecutive GETs run in parallel. A batch cannot contain another batch.
+    """
+    if getattr(request.state, "batch_user", None) is not None:
+        # A nested batch would multiply BATCH_MAX_REQUESTS with every level
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Batches cannot be nested")
+    settings = get_settings()
+    if len(batch_request.requests) > settings.batch_max_requests:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"A batch is limited to {settings.batch_max_requests} requests"
+        )
+    body = await run_batch(request, batch_request.requests, current_user, db, settings.batch_read_concurrency)
+    return Response(body, media_type="application/json")
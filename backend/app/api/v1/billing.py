@@ -1,22 +1,54 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Header, Path, Response
+from fastapi.responses import FileResponse
 from sqlalchemy.orm import Session
-import uuid
+from sqlalchemy import func, select
+from typing import Optional
 from datetime import datetime
+import os
 
 from app.db.session import get_db
 from app.schemas.billing import (
     BillCreate, BillUpdate, BillResponse,
-    PaymentCreate, PaymentResponse
+    PaymentCreate, PaymentResponse, AgingReport
 )
-from app.models.billing import Bill, Payment
+from app.models.billing import Bill, Payment, PaymentStatus
+from app.models.aging import ArAgingBalance
+from app.models.patient import Patient
 from app.core.security import get_current_user, check_role
+from app.core.concurrency import conditional_update, format_etag
+from app.core.config import get_settings
+from app.core.expansions import ExpansionSet, expandable, patient_summary
+from app.core.counts import CountMode, count_mode, total_count_headers
+from app.core.fieldsets import FieldSet, sparse_fields
+from app.core.lookup import IdList, check_ids, fetch_by_ids, requested_ids
+from app.core.responses import json_response
+from app.services.bill_numbers import bill_number_allocator
+from app.services.ledger import apply_payment, status_for_balance, to_money
+from app.services import aging, statements
+from app.services.outbox import record_event
 
 router = APIRouter(prefix="/api/v1/billing", tags=["Billing"])
 
+bill_list_fields = sparse_fields(BillResponse, Bill)
+bill_fields = sparse_fields(BillResponse, Bill, always=("version",))
+bill_list_expansions = expandable(patient=patient_summary(Bill.patient))
 
-def generate_bill_number():
-    """Generate a unique bill number."""
-    return f"BILL-{uuid.uuid4().hex[:8].upper()}"
+
+def _event_payload(bill: Bill) -> dict:
+    return {
+        "bill_id": bill.id,
+        "bill_number": bill.bill_number,
+        "patient_id": bill.patient_id,
+        "appointment_id": bill.appointment_id,
+        "total_amount": bill.total_amount,
+        "balance_due": bill.balance_due,
+        "status": bill.status,
+    }
+
+
+def generate_bill_number(db: Session) -> str:
+    """Generate a unique, per-facility/per-year sequential bill number."""
+    return bill_number_allocator.next_number(db.get_bind(), get_settings().bill_facility_code)
 
 
 @router.post("/bills", response_model=BillResponse)
@@ -26,23 +58,31 @@ def create_bill(
     db: Session = Depends(get_db)
 ):
     """Create a new bill."""
-    bill_number = generate_bill_number()
-    total_amount = bill_data.amount + (bill_data.tax or 0.0)
+    bill_number = generate_bill_number(db)
+    amount = to_money(bill_data.amount)
+    tax = to_money(bill_data.tax or 0)
+    total_amount = amount + tax
     
     db_bill = Bill(
         patient_id=bill_data.patient_id,
         appointment_id=bill_data.appointment_id,
         bill_number=bill_number,
-        amount=bill_data.amount,
-        tax=bill_data.tax or 0.0,
+        amount=amount,
+        tax=tax,
         total_amount=total_amount,
+        amount_paid=to_money(0),
+        balance_due=total_amount,
+        aging_bucket=aging.bucket_for(bill_data.due_date),
         description=bill_data.description,
-        due_date=bill_data.due_date
+        due_date=bill_data.due_date,
+        payments=[]
     )
     
     db.add(db_bill)
+    aging.add_to_bucket(db, db_bill.patient_id, db_bill.aging_bucket, total_amount)
+    db.flush()
+    record_event(db, "bill.created", "bill", db_bill.id, _event_payload(db_bill))
     db.commit()
-    db.refresh(db_bill)
     return db_bill
 
 
@@ -52,59 +92,100 @@ def list_bills(
     limit: int = Query(10, ge=1, le=100),
     patient_id: int = Query(None),
     status: str = Query(None),
+    outstanding: bool = Query(False, description="Only bills with a balance still due"),
+    ids: Optional[list[int]] = Depends(requested_ids),
+    fields: FieldSet = Depends(bill_list_fields),
+    expand: ExpansionSet = Depends(bill_list_expansions),
+    count: CountMode = Depends(count_mode),
     current_user: dict = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """List bills with optional filters."""
-    query = db.query(Bill)
+    """List bills with optional filters, or the ones in ids."""
+    statement = fields.select(also=expand.foreign_keys)
+    model = list[expand.model(fields.model)]
+    if ids is not None:
+        bills, headers = fetch_by_ids(fields.fetch, db, statement, Bill.id, ids)
+        return json_response(model, expand.expand(db, bills), headers=headers)
     
     if patient_id:
-        query = query.filter(Bill.patient_id == patient_id)
+        statement = statement.where(Bill.patient_id == patient_id)
     if status:
-        query = query.filter(Bill.status == status)
+        statement = statement.where(Bill.status == status)
+    if outstanding:
+        statement = statement.where(Bill.balance_due > 0)
     
-    bills = query.offset(skip).limit(limit).all()
-    return bills
+    headers = total_count_headers(db, statement, count)
+    bills = fields.fetch(db, statement.offset(skip).limit(limit))
+    return json_response(model, expand.expand(db, bills), headers=headers)
+
+
+@router.post("/bills/lookup", response_model=list[BillResponse])
+def lookup_bills(
+    lookup: IdList,
+    fields: FieldSet = Depends(bill_list_fields),
+    current_user: dict = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Bills by id, as GET with ids, for lists too long for a URL."""
+    bills, headers = fetch_by_ids(fields.fetch, db, fields.select(), Bill.id, check_ids(lookup.ids))
+    return json_response(list[fields.model], bills, headers=headers)
 
 
 @router.get("/bills/{bill_id}", response_model=BillResponse)
 def get_bill(
     bill_id: int,
+    fields: FieldSet = Depends(bill_fields),
     current_user: dict = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Get bill by ID."""
-    bill = db.query(Bill).filter(Bill.id == bill_id).first()
+    bill = db.query(Bill).options(*fields.load_options()).filter(Bill.id == bill_id).first()
     if not bill:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Bill not found")
-    return bill
+    return json_response(fields.model, bill, headers={"ETag": format_etag(bill.version)})
 
 
 @router.put("/bills/{bill_id}", response_model=BillResponse)
 def update_bill(
     bill_id: int,
     bill_update: BillUpdate,
+    response: Response,
+    if_match: Optional[str] = Header(None),
     current_user: dict = Depends(check_role(["admin", "receptionist"])),
     db: Session = Depends(get_db)
 ):
-    """Update bill."""
-    bill = db.query(Bill).filter(Bill.id == bill_id).first()
-    if not bill:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Bill not found")
-    
+    """Update bill. Send If-Match with the ETag from GET to reject stale writes."""
     update_data = bill_update.dict(exclude_unset=True)
     
-    # Recalculate total if amount or tax changes
+    for field in ("amount", "tax"):
+        if update_data.get(field) is not None:
+            update_data[field] = to_money(update_data[field])
+    
+    # Recalculate total and balance if amount or tax changes, reading the
+    # stored value in SQL for whichever one was not supplied
     if "amount" in update_data or "tax" in update_data:
-        amount = update_data.get("amount", bill.amount)
-        tax = update_data.get("tax", bill.tax)
+        amount = update_data.get("amount", Bill.amount)
+        tax = update_data.get("tax", Bill.tax)
         update_data["total_amount"] = amount + tax
+        update_data["balance_due"] = amount + tax - Bill.amount_paid
+        if "status" not in update_data:
+            update_data["status"] = status_for_balance(update_data["balance_due"], Bill.amount_paid)
+    if update_data.get("due_date") is not None:
+        update_data["aging_bucket"] = aging.bucket_for(update_data["due_date"])
     
-    for field, value in update_data.items():
-        setattr(bill, field, value)
+    touches_balance = bool(update_data.keys() & {"amount", "tax", "due_date", "status"})
     
-    db.commit()
-    db.refresh(bill)
+    def after_update(updated: Bill) -> None:
+        # Edits that move money between aging buckets are rare; recount the patient
+        if touches_balance:
+            aging.refresh_patient(db, updated.patient_id)
+        record_event(db, "bill.updated", "bill", updated.id, _event_payload(updated))
+    
+    bill = conditional_update(
+        db, Bill, bill_id, update_data, if_match, "Bill not found",
+        before_commit=after_update
+    )
+    response.headers["ETag"] = format_etag(bill.version)
     return bill
 
 
@@ -120,6 +201,9 @@ def delete_bill(
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Bill not found")
     
     db.delete(bill)
+    db.flush()
+    aging.refresh_patient(db, bill.patient_id)
+    record_event(db, "bill.deleted", "bill", bill_id, _event_payload(bill))
     db.commit()
     
     return {"message": f"Bill {bill_id} deleted successfully"}
@@ -133,24 +217,44 @@ def create_payment(
     current_user: dict = Depends(check_role(["admin", "receptionist"])),
     db: Session = Depends(get_db)
 ):
-    """Create a payment for a bill."""
-    bill = db.query(Bill).filter(Bill.id == bill_id).first()
-    if not bill:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Bill not found")
+    """Create a payment for a bill and apply it to the bill's balance."""
+    amount = to_money(payment_data.amount)
+    
+    # Atomic increment: concurrent payments queue on the bill row
+    if not apply_payment(db, bill_id, amount):
+        db.rollback()
+        bill_status = db.query(Bill.status).filter(Bill.id == bill_id).scalar()
+        if bill_status is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Bill not found")
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Bill is cancelled")
+    aging.subtract_payment(db, bill_id, amount)
     
     db_payment = Payment(
         bill_id=bill_id,
-        **payment_data.dict()
+        amount=amount,
+        payment_method=payment_data.payment_method,
+        notes=payment_data.notes,
+        status=PaymentStatus.COMPLETED
     )
     
     db.add(db_payment)
+    db.flush()
     
-    # Update bill status if payment is completed
-    if payment_data.payment_method and payment_data.amount >= bill.total_amount:
-        bill.status = "paid"
-    
+    bill = db.query(
+        Bill.id, Bill.bill_number, Bill.patient_id, Bill.appointment_id,
+        Bill.total_amount, Bill.balance_due, Bill.status
+    ).filter(Bill.id == bill_id).one()
+    payload = {
+        **_event_payload(bill),
+        "payment_id": db_payment.id,
+        "payment_amount": amount,
+        "payment_method": db_payment.payment_method,
+    }
+    record_event(db, "bill.payment_received", "bill", bill_id, payload)
+    # bill.paid only for the payment that settled the balance
+    if bill.balance_due <= 0 < bill.balance_due + amount:
+        record_event(db, "bill.paid", "bill", bill_id, payload)
     db.commit()
-    db.refresh(db_payment)
     return db_payment
 
 
@@ -166,4 +270,75 @@ def list_bill_payments(
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Bill not found")
     
     payments = db.query(Payment).filter(Payment.bill_id == bill_id).all()
-    return payments
+    return json_response(list[PaymentResponse], payments)
+
+
+@router.get("/aging", response_model=AgingReport)
+def get_aging_report(
+    skip: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=500),
+    patient_id: int = Query(None),
+    current_user: dict = Depends(check_role(["admin", "receptionist"])),
+    db: Session = Depends(get_db)
+):
+    """Accounts-receivable aging (0-30/31-60/61-90/90+ days past due) by patient.
+    
+    Served from per-patient buckets maintained as bills are created and
+    paid, so it never scans bills or payments.
+    """
+    columns = [getattr(ArAgingBalance, column) for column in aging.BUCKET_COLUMNS]
+    
+    totals_query = select(*[func.coalesce(func.sum(column), 0) for column in columns])
+    rows_query = (
+        select(ArAgingBalance.patient_id, Patient.first_name, Patient.last_name, *columns)
+        .outerjoin(Patient, Patient.id == ArAgingBalance.patient_id)
+        .order_by(ArAgingBalance.patient_id)
+    )
+    if patient_id:
+        totals_query = totals_query.where(ArAgingBalance.patient_id == patient_id)
+        rows_query = rows_query.where(ArAgingBalance.patient_id == patient_id)
+    
+    def buckets(values):
+        result = dict(zip(aging.BUCKET_COLUMNS, values))
+        result["total"] = sum(values)
+        return result
+    
+    totals = db.execute(totals_query).one()
+    rows = db.execute(rows_query.offset(skip).limit(limit)).all()
+    return {
+        "totals": buckets(tuple(totals)),
+        "patients": [
+            {"patient_id": row[0], "first_name": row[1], "last_name": row[2], **buckets(tuple(row[3:]))}
+            for row in rows
+        ]
+    }
+
+
+# Statements are generated offline by generate_statements.py
+PERIOD_PATTERN = r"^\d{4}-(0[1-9]|1[0-2])$"
+
+
+@router.get("/statements/{period}")
+def get_statement_run(
+    period: str = Path(..., pattern=PERIOD_PATTERN),
+    current_user: dict = Depends(check_role(["admin", "receptionist"]))
+):
+    """Progress of the statement run for a YYYY-MM period."""
+    progress = statements.read_progress(get_settings().statement_output_dir, period)
+    if progress is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No statement run for this period")
+    return progress
+
+
+@router.get("/statements/{period}/patients/{patient_id}")
+def download_statement(
+    patient_id: int,
+    period: str = Path(..., pattern=PERIOD_PATTERN),
+    current_user: dict = Depends(check_role(["admin", "receptionist"]))
+):
+    """Download a patient's statement PDF."""
+    path = statements.statement_path(get_settings().statement_output_dir, period, patient_id)
+    if not os.path.exists(path):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Statement not found")
+    return FileResponse(path, media_type="application/pdf", filename=os.path.basename(path))
+
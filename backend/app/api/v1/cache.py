@@ -0,0 +1,19 @@
+from fastapi import APIRouter, Depends
+
+from app.core.security import check_role
+from app.core.response_cache import response_cache
+
+router = APIRouter(prefix="/api/v1/cache", tags=["Cache"])
+
+
+@router.get("/stats")
+def get_cache_stats(current_user: dict = Depends(check_role(["admin"]))):
+    """Response cache hits, misses, evictions and size for this worker (Admin only)."""
+    return response_cache.stats()
+
+
+@router.delete("")
+def clear_cache(current_user: dict = Depends(check_role(["admin"]))):
+    """Empty this worker's response cache (Admin only)."""
+    response_cache.clear()
+    return {"message": "Response cache cleared"}
@@ -1,14 +1,49 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.orm import Session, joinedload
+from typing import Optional
 
 from app.db.session import get_db
 from app.schemas.doctor import DoctorCreate, DoctorUpdate, DoctorResponse
 from app.models.doctor import Doctor
 from app.models.user import User, RoleEnum
 from app.core.security import get_current_user, check_role, hash_password
+from app.core.counts import CountMode, count_mode, total_count_headers
+from app.core.lookup import IdList, check_ids, fetch_by_ids, requested_ids
+from app.core.responses import json_response
+from app.db.soft_delete import soft_delete
+from app.core.response_cache import cached_response, response_cache
 
 router = APIRouter(prefix="/api/v1/doctors", tags=["Doctors"])
 
+# Read-only lists come straight from Core rows, with the user account's details joined in
+DOCTOR_ROWS = select(
+    Doctor.id, Doctor.user_id, Doctor.specialization, Doctor.license_number, Doctor.phone, Doctor.bio,
+    Doctor.office_hours, Doctor.created_at, Doctor.updated_at, User.email, User.username, User.full_name
+).join(User, Doctor.user_id == User.id)
+
+
+def _fetch_doctors(db: Session, statement) -> list[dict]:
+    return [dict(row) for row in db.execute(statement).mappings()]
+
+
+def _doctor_response(doctor: Doctor) -> DoctorResponse:
+    """A doctor with their user account's details; doctor.user must be loaded."""
+    return DoctorResponse(
+        id=doctor.id,
+        user_id=doctor.user_id,
+        specialization=doctor.specialization,
+        license_number=doctor.license_number,
+        phone=doctor.phone,
+        bio=doctor.bio,
+        office_hours=doctor.office_hours,
+        created_at=doctor.created_at,
+        updated_at=doctor.updated_at,
+        email=doctor.user.email,
+        username=doctor.user.username,
+        full_name=doctor.user.full_name
+    )
+
 
 @router.post("", response_model=DoctorResponse)
 def create_doctor(
@@ -17,8 +52,8 @@ def create_doctor(
     db: Session = Depends(get_db)
 ):
     """Create a new doctor (Admin only)."""
-    # Check if user already exists
-    existing_user = db.query(User).filter(
+    # Check if user already exists; soft-deleted rows keep their unique values until purged
+    existing_user = db.query(User).execution_options(include_deleted=True).filter(
         (User.email == doctor_data.email) | (User.username == doctor_data.username)
     ).first()
     
@@ -29,7 +64,9 @@ def create_doctor(
         )
     
     # Check if license number already exists
-    existing_license = db.query(Doctor).filter(Doctor.license_number == doctor_data.license_number).first()
+    existing_license = db.query(Doctor).execution_options(include_deleted=True).filter(
+        Doctor.license_number == doctor_data.license_number
+    ).first()
     if existing_license:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -61,7 +98,7 @@ def create_doctor(
     
     db.add(db_doctor)
     db.commit()
-    db.refresh(db_doctor)
+    response_cache.invalidate("doctor:list", "user:list")
     
     # Build response
     response = DoctorResponse(
@@ -82,60 +119,47 @@ def create_doctor(
 
 
 @router.get("", response_model=list[DoctorResponse])
+@cached_response(list[DoctorResponse], tags=["doctor:list", "user:list"])
 def list_doctors(
     skip: int = Query(0, ge=0),
     limit: int = Query(10, ge=1, le=100),
+    ids: Optional[list[int]] = Depends(requested_ids),
+    count: CountMode = Depends(count_mode),
     current_user: dict = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """List all doctors."""
-    doctors = db.query(Doctor).offset(skip).limit(limit).all()
-    
-    responses = []
-    for doctor in doctors:
-        responses.append(DoctorResponse(
-            id=doctor.id,
-            user_id=doctor.user_id,
-            specialization=doctor.specialization,
-            license_number=doctor.license_number,
-            phone=doctor.phone,
-            bio=doctor.bio,
-            office_hours=doctor.office_hours,
-            created_at=doctor.created_at,
-            updated_at=doctor.updated_at,
-            email=doctor.user.email,
-            username=doctor.user.username,
-            full_name=doctor.user.full_name
-        ))
-    
-    return responses
+    """List all doctors, or the ones in ids."""
+    if ids is not None:
+        doctors, headers = fetch_by_ids(_fetch_doctors, db, DOCTOR_ROWS, Doctor.id, ids)
+        return json_response(list[DoctorResponse], doctors, headers=headers)
+    headers = total_count_headers(db, DOCTOR_ROWS, count)
+    return json_response(list[DoctorResponse], _fetch_doctors(db, DOCTOR_ROWS.offset(skip).limit(limit)), headers=headers)
+
+
+@router.post("/lookup", response_model=list[DoctorResponse])
+def lookup_doctors(
+    lookup: IdList,
+    current_user: dict = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Doctors by id, as GET with ids, for lists too long for a URL."""
+    doctors, headers = fetch_by_ids(_fetch_doctors, db, DOCTOR_ROWS, Doctor.id, check_ids(lookup.ids))
+    return json_response(list[DoctorResponse], doctors, headers=headers)
 
 
 @router.get("/{doctor_id}", response_model=DoctorResponse)
+@cached_response(DoctorResponse, tags=["doctor:{doctor_id}", lambda arguments, doctor: [f"user:{doctor.user_id}"]])
 def get_doctor(
     doctor_id: int,
     current_user: dict = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Get doctor by ID."""
-    doctor = db.query(Doctor).filter(Doctor.id == doctor_id).first()
+    doctor = db.query(Doctor).options(joinedload(Doctor.user)).filter(Doctor.id == doctor_id).first()
     if not doctor:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Doctor not found")
     
-    return DoctorResponse(
-        id=doctor.id,
-        user_id=doctor.user_id,
-        specialization=doctor.specialization,
-        license_number=doctor.license_number,
-        phone=doctor.phone,
-        bio=doctor.bio,
-        office_hours=doctor.office_hours,
-        created_at=doctor.created_at,
-        updated_at=doctor.updated_at,
-        email=doctor.user.email,
-        username=doctor.user.username,
-        full_name=doctor.user.full_name
-    )
+    return _doctor_response(doctor)
 
 
 @router.put("/{doctor_id}", response_model=DoctorResponse)
@@ -154,7 +178,7 @@ def update_doctor(
     if doctor_update.specialization:
         doctor.specialization = doctor_update.specialization
     if doctor_update.license_number:
-        existing = db.query(Doctor).filter(
+        existing = db.query(Doctor).execution_options(include_deleted=True).filter(
             Doctor.license_number == doctor_update.license_number,
             Doctor.id != doctor_id
         ).first()
@@ -173,13 +197,15 @@ def update_doctor(
     if doctor_update.full_name:
         user.full_name = doctor_update.full_name
     if doctor_update.email:
-        existing = db.query(User).filter(User.email == doctor_update.email, User.id != user.id).first()
+        existing = db.query(User).execution_options(include_deleted=True).filter(
+            User.email == doctor_update.email, User.id != user.id
+        ).first()
         if existing:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Email already taken")
         user.email = doctor_update.email
     
     db.commit()
-    db.refresh(doctor)
+    response_cache.invalidate(f"doctor:{doctor_id}", "doctor:list", f"user:{user.id}", "user:list")
     
     return DoctorResponse(
         id=doctor.id,
@@ -203,15 +229,15 @@ def delete_doctor(
     current_user: dict = Depends(check_role(["admin"])),
     db: Session = Depends(get_db)
 ):
-    """Delete doctor (Admin only)."""
-    doctor = db.query(Doctor).filter(Doctor.id == doctor_id).first()
-    if not doctor:
+    """Delete doctor (Admin only). History is purged in the background."""
+    user_id = db.query(Doctor.user_id).filter(Doctor.id == doctor_id).scalar()
+    if user_id is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Doctor not found")
     
     # Also delete the associated user
-    user = doctor.user
-    db.delete(doctor)
-    db.delete(user)
+    soft_delete(db, Doctor, Doctor.id == doctor_id)
+    soft_delete(db, User, User.id == user_id, is_active=False)
     db.commit()
+    response_cache.invalidate(f"doctor:{doctor_id}", "doctor:list", f"user:{user_id}", "user:list")
     
     return {"message": f"Doctor {doctor_id} deleted successfully"}
@@ -0,0 +1,124 @@
+import asyncio
+import json
+from typing import Optional
+
+from fastapi import APIRouter, Header, HTTPException, Query, Request, WebSocket, status
+from fastapi.responses import StreamingResponse
+
+from app.core.security import verify_token
+from app.services.live_feed import FeedFilter, HEARTBEAT, stream_events
+
+router = APIRouter(prefix="/api/v1/live", tags=["Live feed"])
+
+# Events each role may stream. Doctors only see their own appointments and the bills raised from them.
+ROLE_EVENT_PREFIXES = {
+    "admin": ("appointment.", "bill."),
+    "receptionist": ("appointment.", "bill."),
+    "doctor": ("appointment.", "bill."),
+    "nurse": ("appointment.",),
+}
+
+
+def _authenticate(authorization: Optional[str], access_token: Optional[str]) -> dict:
+    """Accept a bearer header or, for browser EventSource/WebSocket clients, a query token."""
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        token = access_token
+    if not token:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not authenticated")
+    payload = verify_token(token)
+    if payload.get("sub") is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
+    return {"user_id": payload["sub"], "role": payload.get("role")}
+
+
+def _feed_filter(user: dict, doctor_id: Optional[int], department: Optional[str]) -> FeedFilter:
+    """The caller's filter narrowed to what their role may see; 403 for other roles or doctors."""
+    event_prefixes = ROLE_EVENT_PREFIXES.get(user["role"])
+    if event_prefixes is None:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Insufficient permissions")
+    if user["role"] == "doctor":
+        if doctor_id is not None and doctor_id != int(user["user_id"]):
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Doctors can only follow their own schedule"
+            )
+        doctor_id = int(user["user_id"])
+    return FeedFilter(doctor_id=doctor_id, department=department, event_prefixes=event_prefixes)
+
+
+def _format_sse(event: dict) -> str:
+    if event is HEARTBEAT:
+        return ": heartbeat\n\n"
+    lines = [f"event: {event['type']}", f"data: {json.dumps(event)}"]
+    if "id" in event:
+        lines.insert(0, f"id: {event['id']}")
+    return "\n".join(lines) + "\n\n"
+
+
+@router.get("/events")
+async def stream_live_events(
+    request: Request,
+    doctor_id: Optional[int] = Query(None),
+    department: Optional[str] = Query(None, description="Doctor specialization"),
+    since: Optional[int] = Query(None, description="Resume after this event id"),
+    access_token: Optional[str] = Query(None),
+    authorization: Optional[str] = Header(None),
+    last_event_id: Optional[int] = Header(None),
+):
+    """Server-Sent Events stream of appointment and bill changes.
+    
+    EventSource reconnects send Last-Event-ID automatically, so clients
+    resume where they left off instead of reloading.
+    """
+    user = _authenticate(authorization, access_token)
+    feed_filter = _feed_filter(user, doctor_id, department)
+    resume_after = last_event_id if last_event_id is not None else since
+
+    async def body():
+        yield "retry: 3000\n\n"
+        async for event in stream_events(request.app, feed_filter, resume_after):
+            yield _format_sse(event)
+
+    return StreamingResponse(
+        body(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.websocket("/ws")
+async def live_events_websocket(
+    websocket: WebSocket,
+    doctor_id: Optional[int] = Query(None),
+    department: Optional[str] = Query(None),
+    since: Optional[int] = Query(None),
+    access_token: Optional[str] = Query(None),
+):
+    """WebSocket stream of appointment and bill changes, one JSON message per event."""
+    try:
+        user = _authenticate(websocket.headers.get("authorization"), access_token)
+        feed_filter = _feed_filter(user, doctor_id, department)
+    except HTTPException:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    await websocket.accept()
+
+    async def forward():
+        async for event in stream_events(websocket.app, feed_filter, since):
+            await websocket.send_json(event)
+
+    async def watch_client():
+        # Clients send nothing meaningful; this only notices them leaving
+        while (await websocket.receive())["type"] != "websocket.disconnect":
+            pass
+
+    tasks = [asyncio.create_task(forward()), asyncio.create_task(watch_client())]
+    done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+    for task in pending:
+        task.cancel()
+    for task in done:
+        task.result()
+    if tasks[0] in done:
+        # The stream ended (client overflowed); ask it to reconnect
+        await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER)
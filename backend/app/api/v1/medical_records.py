@@ -1,5 +1,6 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Header, Request, Response
 from sqlalchemy.orm import Session
+from typing import Optional
 
 from app.db.session import get_db
 from app.schemas.medical_record import (
@@ -8,9 +9,25 @@ from app.schemas.medical_record import (
 )
 from app.models.medical_record import MedicalRecord, Prescription
 from app.core.security import get_current_user, check_role
+from app.core.concurrency import conditional_update, format_etag
+from app.core.expansions import ExpansionSet, doctor_summary, expandable, patient_summary
+from app.core.counts import CountMode, count_mode, total_count_headers
+from app.core.fieldsets import FieldSet, sparse_fields
+from app.core.responses import json_response
+from app.models.audit import AuditAction
+from app.services.audit import audit_logger, client_ip
 
 router = APIRouter(prefix="/api/v1/medical-records", tags=["Medical Records"])
 
+# patient_id is always loaded for the PHI audit entry
+list_fields = sparse_fields(
+    MedicalRecordResponse, MedicalRecord, deferred=("diagnosis", "treatment", "notes"), always=("patient_id",)
+)
+item_fields = sparse_fields(MedicalRecordResponse, MedicalRecord, always=("patient_id", "version"))
+list_expansions = expandable(
+    patient=patient_summary(MedicalRecord.patient), doctor=doctor_summary(MedicalRecord.created_by)
+)
+
 
 @router.post("", response_model=MedicalRecordResponse)
 def create_medical_record(
@@ -19,84 +36,89 @@ def create_medical_record(
     db: Session = Depends(get_db)
 ):
     """Create a new medical record."""
+    # Prescriptions ride along on the relationship so one flush inserts both
     db_record = MedicalRecord(
         patient_id=record_data.patient_id,
         doctor_id=record_data.doctor_id,
         appointment_id=record_data.appointment_id,
         diagnosis=record_data.diagnosis,
         treatment=record_data.treatment,
-        notes=record_data.notes
+        notes=record_data.notes,
+        prescriptions=[
+            Prescription(**prescription_data.dict())
+            for prescription_data in record_data.prescriptions or []
+        ]
     )
     
     db.add(db_record)
-    db.flush()
-    
-    # Add prescriptions if provided
-    if record_data.prescriptions:
-        for prescription_data in record_data.prescriptions:
-            db_prescription = Prescription(
-                medical_record_id=db_record.id,
-                **prescription_data.dict()
-            )
-            db.add(db_prescription)
-    
     db.commit()
-    db.refresh(db_record)
     return db_record
 
 
 @router.get("", response_model=list[MedicalRecordResponse])
 def list_medical_records(
+    request: Request,
     skip: int = Query(0, ge=0),
     limit: int = Query(10, ge=1, le=100),
     patient_id: int = Query(None),
     doctor_id: int = Query(None),
+    fields: FieldSet = Depends(list_fields),
+    expand: ExpansionSet = Depends(list_expansions),
+    count: CountMode = Depends(count_mode),
     current_user: dict = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """List medical records with optional filters."""
-    query = db.query(MedicalRecord)
+    """List medical records with optional filters.
+    
+    diagnosis, treatment and notes are only sent when asked for in fields.
+    """
+    statement = fields.select(also=expand.foreign_keys)
     
     if patient_id:
-        query = query.filter(MedicalRecord.patient_id == patient_id)
+        statement = statement.where(MedicalRecord.patient_id == patient_id)
     if doctor_id:
-        query = query.filter(MedicalRecord.doctor_id == doctor_id)
+        statement = statement.where(MedicalRecord.doctor_id == doctor_id)
     
-    records = query.offset(skip).limit(limit).all()
-    return records
+    headers = total_count_headers(db, statement, count)
+    records = fields.fetch(db, statement.offset(skip).limit(limit))
+    audit_logger.record_many(
+        current_user, AuditAction.MEDICAL_RECORD_LIST,
+        [(record["patient_id"], record["id"]) for record in records], client_ip(request)
+    )
+    return json_response(list[expand.model(fields.model)], expand.expand(db, records), headers=headers)
 
 
 @router.get("/{record_id}", response_model=MedicalRecordResponse)
 def get_medical_record(
     record_id: int,
+    request: Request,
+    fields: FieldSet = Depends(item_fields),
     current_user: dict = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Get medical record by ID."""
-    record = db.query(MedicalRecord).filter(MedicalRecord.id == record_id).first()
+    record = db.query(MedicalRecord).options(*fields.load_options()).filter(MedicalRecord.id == record_id).first()
     if not record:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Medical record not found")
-    return record
+    audit_logger.record(current_user, AuditAction.MEDICAL_RECORD_READ, record.patient_id, record.id, client_ip(request))
+    return json_response(fields.model, record, headers={"ETag": format_etag(record.version)})
 
 
 @router.put("/{record_id}", response_model=MedicalRecordResponse)
 def update_medical_record(
     record_id: int,
     record_update: MedicalRecordUpdate,
+    response: Response,
+    if_match: Optional[str] = Header(None),
     current_user: dict = Depends(check_role(["admin", "doctor"])),
     db: Session = Depends(get_db)
 ):
-    """Update medical record."""
-    record = db.query(MedicalRecord).filter(MedicalRecord.id == record_id).first()
-    if not record:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Medical record not found")
-    
+    """Update medical record. Send If-Match with the ETag from GET to reject stale writes."""
     update_data = record_update.dict(exclude_unset=True)
-    for field, value in update_data.items():
-        setattr(record, field, value)
-    
-    db.commit()
-    db.refresh(record)
+    record = conditional_update(
+        db, MedicalRecord, record_id, update_data, if_match, "Medical record not found"
+    )
+    response.headers["ETag"] = format_etag(record.version)
     return record
 
 
@@ -136,5 +158,4 @@ def create_prescription(
     )
     db.add(db_prescription)
     db.commit()
-    db.refresh(db_prescription)
     return db_prescription
@@ -0,0 +1,20 @@
+from fastapi import APIRouter, Depends
+from sqlalchemy.orm import Session
+
+from app.db.session import get_db
+from app.core.security import check_role
+from app.services.outbox import backlog_stats, dispatch_metrics
+
+router = APIRouter(prefix="/api/v1/outbox", tags=["Outbox"])
+
+
+@router.get("/stats")
+def get_outbox_stats(
+    current_user: dict = Depends(check_role(["admin"])),
+    db: Session = Depends(get_db)
+):
+    """Outbox backlog and this worker's delivery metrics (Admin only)."""
+    return {
+        **backlog_stats(db),
+        "dispatcher": dispatch_metrics.snapshot(),
+    }
@@ -1,13 +1,61 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+import hashlib
+
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Header, Request, Response
 from sqlalchemy.orm import Session
+from typing import Optional
 
 from app.db.session import get_db
-from app.schemas.patient import PatientCreate, PatientUpdate, PatientResponse
+from app.schemas.patient import PatientCreate, PatientUpdate, PatientResponse, PatientChart
+from app.schemas.appointment import AppointmentResponse
+from app.schemas.billing import BillResponse
+from app.schemas.medical_record import MedicalRecordResponse
 from app.models.patient import Patient
+from app.models.appointment import Appointment
+from app.models.billing import Bill
+from app.models.medical_record import MedicalRecord
 from app.core.security import get_current_user, check_role
+from app.core.concurrency import conditional_update, etag_matches, format_etag
+from app.core.counts import CountMode, count_mode, total_count_headers
+from app.core.fieldsets import FieldSet, sparse_fields
+from app.core.lookup import MISSING_IDS_HEADER, IdList, check_ids, fetch_by_ids, requested_ids
+from app.core.responses import dump_json, json_response
+from app.db.soft_delete import soft_delete
+from app.models.audit import AuditAction
+from app.services.audit import audit_logger, client_ip
+from app.core.response_cache import cached_response, response_cache
 
 router = APIRouter(prefix="/api/v1/patients", tags=["Patients"])
 
+list_fields = sparse_fields(PatientResponse, Patient, deferred=("address", "allergies"))
+item_fields = sparse_fields(PatientResponse, Patient, always=("version",))
+chart_appointments = FieldSet.every(AppointmentResponse, Appointment)
+chart_records = FieldSet.every(MedicalRecordResponse, MedicalRecord)
+chart_bills = FieldSet.every(BillResponse, Bill)
+
+
+def _audit_cached_read(arguments: dict, response: Response) -> None:
+    # Reads served from the response cache are audited like any other
+    patient_id = arguments["patient_id"]
+    audit_logger.record(
+        arguments["current_user"], AuditAction.PATIENT_READ, patient_id, patient_id, client_ip(arguments["request"])
+    )
+
+
+def _audit_reads(current_user: dict, request: Request, patient_ids: list[int]) -> None:
+    # Fetching by id reads whole patients, so each one is audited as a get_patient would be
+    audit_logger.record_many(
+        current_user, AuditAction.PATIENT_READ, [(patient_id, patient_id) for patient_id in patient_ids],
+        client_ip(request)
+    )
+
+
+def _audit_cached_lookup(arguments: dict, response: Response) -> None:
+    if arguments["ids"] is None:
+        return  # a page of the list, not audited when computed either
+    missing = set(response.headers.get(MISSING_IDS_HEADER, "").split(","))
+    found = [patient_id for patient_id in arguments["ids"] if str(patient_id) not in missing]
+    _audit_reads(arguments["current_user"], arguments["request"], found)
+
 
 @router.post("", response_model=PatientResponse)
 def create_patient(
@@ -19,53 +67,135 @@ def create_patient(
     db_patient = Patient(**patient_data.dict())
     db.add(db_patient)
     db.commit()
-    db.refresh(db_patient)
+    response_cache.invalidate("patient:list")
     return db_patient
 
 
 @router.get("", response_model=list[PatientResponse])
+@cached_response(list[PatientResponse], tags=["patient:list"], on_hit=_audit_cached_lookup)
 def list_patients(
+    request: Request,
     skip: int = Query(0, ge=0),
     limit: int = Query(10, ge=1, le=100),
+    ids: Optional[list[int]] = Depends(requested_ids),
+    fields: FieldSet = Depends(list_fields),
+    count: CountMode = Depends(count_mode),
     current_user: dict = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """List all patients."""
-    patients = db.query(Patient).offset(skip).limit(limit).all()
-    return patients
+    """List all patients, or the ones in ids. address and allergies are only sent when asked for in fields."""
+    if ids is not None:
+        patients, headers = fetch_by_ids(fields.fetch, db, fields.select(), Patient.id, ids)
+        _audit_reads(current_user, request, [patient["id"] for patient in patients])
+        return json_response(list[fields.model], patients, headers=headers)
+    statement = fields.select()
+    headers = total_count_headers(db, statement, count)
+    patients = fields.fetch(db, statement.offset(skip).limit(limit))
+    return json_response(list[fields.model], patients, headers=headers)
+
+
+@router.post("/lookup", response_model=list[PatientResponse])
+def lookup_patients(
+    lookup: IdList,
+    request: Request,
+    fields: FieldSet = Depends(list_fields),
+    current_user: dict = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Patients by id, as GET with ids, for lists too long for a URL."""
+    patients, headers = fetch_by_ids(fields.fetch, db, fields.select(), Patient.id, check_ids(lookup.ids))
+    _audit_reads(current_user, request, [patient["id"] for patient in patients])
+    return json_response(list[fields.model], patients, headers=headers)
 
 
 @router.get("/{patient_id}", response_model=PatientResponse)
+@cached_response(PatientResponse, tags=["patient:{patient_id}"], on_hit=_audit_cached_read)
 def get_patient(
     patient_id: int,
+    request: Request,
+    fields: FieldSet = Depends(item_fields),
     current_user: dict = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Get patient by ID."""
+    patient = db.query(Patient).options(*fields.load_options()).filter(Patient.id == patient_id).first()
+    if not patient:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Patient not found")
+    audit_logger.record(current_user, AuditAction.PATIENT_READ, patient.id, patient.id, client_ip(request))
+    return json_response(fields.model, patient, headers={"ETag": format_etag(patient.version)})
+
+
+def _chart_page(db: Session, fields: FieldSet, statement, skip: int, limit: int) -> dict:
+    # One row past the page tells whether there is another page, without a COUNT
+    rows = fields.fetch(db, statement.offset(skip).limit(limit + 1))
+    return {"items": rows[:limit], "skip": skip, "limit": limit, "has_more": len(rows) > limit}
+
+
+@router.get("/{patient_id}/chart", response_model=PatientChart)
+def get_patient_chart(
+    patient_id: int,
+    request: Request,
+    limit: int = Query(20, ge=1, le=100, description="Page size of each section"),
+    appointments_skip: int = Query(0, ge=0),
+    records_skip: int = Query(0, ge=0),
+    bills_skip: int = Query(0, ge=0),
+    if_none_match: Optional[str] = Header(None),
+    current_user: dict = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """A patient's chart: the patient with a page of appointments, medical records and bills.
+    
+    Six queries however long the history is: the patient, one per section
+    and one IN query each for the records' prescriptions and the bills'
+    payments. Sections are read as plain rows, not ORM objects. Each
+    section pages on its own ``*_skip``, newest first. The ETag covers
+    the whole bundle; send it back in If-None-Match to get a 304 while
+    nothing in it has changed.
+    """
     patient = db.query(Patient).filter(Patient.id == patient_id).first()
     if not patient:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Patient not found")
-    return patient
+    
+    appointments = chart_appointments.select().where(Appointment.patient_id == patient_id).order_by(
+        Appointment.appointment_date.desc(), Appointment.id.desc()
+    )
+    records = chart_records.select().where(MedicalRecord.patient_id == patient_id).order_by(MedicalRecord.id.desc())
+    bills = chart_bills.select().where(Bill.patient_id == patient_id).order_by(Bill.id.desc())
+    chart = {
+        "patient": patient,
+        "appointments": _chart_page(db, chart_appointments, appointments, appointments_skip, limit),
+        "medical_records": _chart_page(db, chart_records, records, records_skip, limit),
+        "bills": _chart_page(db, chart_bills, bills, bills_skip, limit),
+    }
+    
+    ip = client_ip(request)
+    audit_logger.record(current_user, AuditAction.PATIENT_READ, patient.id, patient.id, ip)
+    audit_logger.record_many(
+        current_user, AuditAction.MEDICAL_RECORD_LIST,
+        [(record["patient_id"], record["id"]) for record in chart["medical_records"]["items"]], ip
+    )
+    
+    body = dump_json(PatientChart, chart)
+    etag = f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    return Response(body, media_type="application/json", headers={"ETag": etag})
 
 
 @router.put("/{patient_id}", response_model=PatientResponse)
 def update_patient(
     patient_id: int,
     patient_update: PatientUpdate,
+    response: Response,
+    if_match: Optional[str] = Header(None),
     current_user: dict = Depends(check_role(["admin", "receptionist", "doctor"])),
     db: Session = Depends(get_db)
 ):
-    """Update patient."""
-    patient = db.query(Patient).filter(Patient.id == patient_id).first()
-    if not patient:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Patient not found")
-    
+    """Update patient. Send If-Match with the ETag from GET to reject stale writes."""
     update_data = patient_update.dict(exclude_unset=True)
-    for field, value in update_data.items():
-        setattr(patient, field, value)
-    
-    db.commit()
-    db.refresh(patient)
+    patient = conditional_update(db, Patient, patient_id, update_data, if_match, "Patient not found")
+    response_cache.invalidate(f"patient:{patient_id}", "patient:list")
+    response.headers["ETag"] = format_etag(patient.version)
     return patient
 
 
@@ -75,12 +205,10 @@ def delete_patient(
     current_user: dict = Depends(check_role(["admin"])),
     db: Session = Depends(get_db)
 ):
-    """Delete patient (Admin only)."""
-    patient = db.query(Patient).filter(Patient.id == patient_id).first()
-    if not patient:
+    """Delete patient (Admin only). History is purged in the background."""
+    if not soft_delete(db, Patient, Patient.id == patient_id):
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Patient not found")
-    
-    db.delete(patient)
     db.commit()
+    response_cache.invalidate(f"patient:{patient_id}", "patient:list")
     
     return {"message": f"Patient {patient_id} deleted successfully"}
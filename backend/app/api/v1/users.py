@@ -5,25 +5,38 @@ from sqlalchemy import and_
 from app.db.session import get_db
 from app.schemas.user import UserResponse, UserUpdate
 from app.models.user import User
+from app.models.doctor import Doctor
+from app.db.soft_delete import soft_delete
 from app.core.security import get_current_user, check_role
 from app.core.config import get_settings
+from app.core.counts import CountMode, count_mode, total_count_headers
+from app.core.fieldsets import FieldSet
+from app.core.response_cache import cached_response, response_cache
+from app.core.responses import json_response
 
 router = APIRouter(prefix="/api/v1/users", tags=["Users"])
 
+USER_ROWS = FieldSet.every(UserResponse, User)
+
 
 @router.get("", response_model=list[UserResponse])
+@cached_response(list[UserResponse], tags=["user:list"])
 def list_users(
     skip: int = Query(0, ge=0),
     limit: int = Query(10, ge=1, le=100),
+    count: CountMode = Depends(count_mode),
     current_user: dict = Depends(check_role(["admin"])),
     db: Session = Depends(get_db)
 ):
     """List all users (Admin only)."""
-    users = db.query(User).offset(skip).limit(limit).all()
-    return users
+    statement = USER_ROWS.select()
+    headers = total_count_headers(db, statement, count)
+    users = USER_ROWS.fetch(db, statement.offset(skip).limit(limit))
+    return json_response(list[UserResponse], users, headers=headers)
 
 
 @router.get("/{user_id}", response_model=UserResponse)
+@cached_response(UserResponse, tags=["user:{user_id}"], per_user=True)
 def get_user(
     user_id: int,
     current_user: dict = Depends(get_current_user),
@@ -57,7 +70,9 @@ def update_user(
     if user_update.full_name:
         user.full_name = user_update.full_name
     if user_update.email:
-        existing = db.query(User).filter(and_(User.email == user_update.email, User.id != user.id)).first()
+        existing = db.query(User).execution_options(include_deleted=True).filter(
+            and_(User.email == user_update.email, User.id != user.id)
+        ).first()
         if existing:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Email already taken")
         user.email = user_update.email
@@ -65,7 +80,8 @@ def update_user(
         user.role = user_update.role
     
     db.commit()
-    db.refresh(user)
+    # Doctor responses embed the user's name and email
+    response_cache.invalidate(f"user:{user_id}", "user:list", "doctor:list")
     return user
 
 
@@ -75,12 +91,11 @@ def delete_user(
     current_user: dict = Depends(check_role(["admin"])),
     db: Session = Depends(get_db)
 ):
-    """Delete user (Admin only)."""
-    user = db.query(User).filter(User.id == user_id).first()
-    if not user:
+    """Delete user (Admin only). History is purged in the background."""
+    if not soft_delete(db, User, User.id == user_id, is_active=False):
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
-    
-    db.delete(user)
+    soft_delete(db, Doctor, Doctor.user_id == user_id)
     db.commit()
+    response_cache.invalidate(f"user:{user_id}", "user:list", "doctor:list")
     
     return {"message": f"User {user_id} deleted successfully"}
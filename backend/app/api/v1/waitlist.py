@@ -0,0 +1,156 @@
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from sqlalchemy.orm import Session
+
+from app.db.session import get_db
+from app.schemas.waitlist import WaitlistEntryCreate, WaitlistEntryResponse
+from app.models.appointment import Appointment
+from app.models.waitlist import WaitlistEntry, WaitlistStatus, WaitlistWindow
+from app.core.security import check_role
+from app.services.outbox import record_event
+from app.services.scheduling import MissingReference, SlotTaken, book, event_payload
+from app.services.waitlist import waitlist_matcher
+
+router = APIRouter(prefix="/api/v1/waitlist", tags=["Waitlist"])
+
+
+def _get_entry(db: Session, entry_id: int) -> WaitlistEntry:
+    entry = db.query(WaitlistEntry).filter(WaitlistEntry.id == entry_id).first()
+    if not entry:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Waitlist entry not found")
+    return entry
+
+
+def _require_offer(entry: WaitlistEntry) -> None:
+    if entry.status != WaitlistStatus.OFFERED:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Waitlist entry has no open offer")
+
+
+def _withdraw_offer(entry: WaitlistEntry) -> None:
+    entry.status = WaitlistStatus.WAITING
+    entry.offered_doctor_id = None
+    entry.offered_slot_start = None
+    entry.offered_at = None
+
+
+@router.post("", response_model=WaitlistEntryResponse)
+def create_waitlist_entry(
+    entry_data: WaitlistEntryCreate,
+    current_user: dict = Depends(check_role(["admin", "receptionist"])),
+    db: Session = Depends(get_db)
+):
+    """Put a patient on the waitlist for a doctor or a specialization."""
+    entry = WaitlistEntry(
+        **entry_data.dict(exclude={"windows"}),
+        windows=[WaitlistWindow(**window.dict()) for window in entry_data.windows]
+    )
+    db.add(entry)
+    db.commit()
+    return entry
+
+
+@router.get("", response_model=list[WaitlistEntryResponse])
+def list_waitlist_entries(
+    skip: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=100),
+    patient_id: int = Query(None),
+    doctor_id: int = Query(None),
+    specialization: str = Query(None),
+    status_filter: WaitlistStatus = Query(WaitlistStatus.WAITING, alias="status"),
+    current_user: dict = Depends(check_role(["admin", "receptionist", "doctor"])),
+    db: Session = Depends(get_db)
+):
+    """List waitlist entries, highest priority first."""
+    query = db.query(WaitlistEntry).filter(WaitlistEntry.status == status_filter)
+    
+    if patient_id:
+        query = query.filter(WaitlistEntry.patient_id == patient_id)
+    if doctor_id:
+        query = query.filter(WaitlistEntry.doctor_id == doctor_id)
+    if specialization:
+        query = query.filter(WaitlistEntry.specialization == specialization)
+    
+    return query.order_by(WaitlistEntry.priority.desc(), WaitlistEntry.id).offset(skip).limit(limit).all()
+
+
+@router.get("/{entry_id}", response_model=WaitlistEntryResponse)
+def get_waitlist_entry(
+    entry_id: int,
+    current_user: dict = Depends(check_role(["admin", "receptionist", "doctor"])),
+    db: Session = Depends(get_db)
+):
+    """Get waitlist entry by ID."""
+    return _get_entry(db, entry_id)
+
+
+@router.post("/{entry_id}/accept", response_model=WaitlistEntryResponse)
+def accept_offer(
+    entry_id: int,
+    current_user: dict = Depends(check_role(["admin", "receptionist"])),
+    db: Session = Depends(get_db)
+):
+    """Book the offered slot. 409 if it was booked some other way in the meantime, 400 if the patient or doctor is gone."""
+    entry = _get_entry(db, entry_id)
+    _require_offer(entry)
+    
+    appointment = Appointment(
+        patient_id=entry.patient_id,
+        doctor_id=entry.offered_doctor_id,
+        appointment_date=entry.offered_slot_start,
+        reason=entry.reason
+    )
+    try:
+        book(db, appointment)
+    except SlotTaken:
+        # The slot is gone; back to waiting for the next one
+        entry = _get_entry(db, entry_id)
+        _withdraw_offer(entry)
+        db.commit()
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Offered slot is no longer available")
+    except MissingReference:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Patient or doctor not found")
+    
+    entry.status = WaitlistStatus.BOOKED
+    entry.appointment_id = appointment.id
+    record_event(db, "appointment.created", "appointment", appointment.id, event_payload(appointment))
+    db.commit()
+    return entry
+
+
+@router.post("/{entry_id}/decline", response_model=WaitlistEntryResponse)
+def decline_offer(
+    entry_id: int,
+    current_user: dict = Depends(check_role(["admin", "receptionist"])),
+    db: Session = Depends(get_db)
+):
+    """Decline the offered slot; the entry keeps waiting and the slot goes to the next patient."""
+    entry = _get_entry(db, entry_id)
+    _require_offer(entry)
+    
+    doctor_id, slot_start = entry.offered_doctor_id, entry.offered_slot_start
+    _withdraw_offer(entry)
+    db.flush()
+    waitlist_matcher.match(db, doctor_id, slot_start, exclude=[entry.id])
+    db.commit()
+    return entry
+
+
+@router.delete("/{entry_id}")
+def remove_waitlist_entry(
+    entry_id: int,
+    current_user: dict = Depends(check_role(["admin", "receptionist"])),
+    db: Session = Depends(get_db)
+):
+    """Take a patient off the waitlist."""
+    entry = _get_entry(db, entry_id)
+    if entry.status == WaitlistStatus.BOOKED:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Waitlist entry is already booked")
+    
+    offered = entry.status == WaitlistStatus.OFFERED
+    doctor_id, slot_start = entry.offered_doctor_id, entry.offered_slot_start
+    entry.status = WaitlistStatus.CANCELLED
+    db.flush()
+    if offered:
+        waitlist_matcher.match(db, doctor_id, slot_start, exclude=[entry.id])
+    db.commit()
+    
+    return {"message": f"Waitlist entry {entry_id} removed"}
@@ -0,0 +1,137 @@
+"""Run API sub-requests in-process for ``POST /api/v1/batch``.
+
+Each sub-request goes through the full ASGI app, so routing, validation,
+role checks, the response cache and audit logging behave exactly as for
+a direct call. Two things are shared instead of repeated:
+
+* Authentication. The batch verifies the bearer token once and puts the
+  user in each sub-request's scope, where ``get_current_user`` picks it
+  up without decoding the token again.
+* The database session. Sub-requests run in order on the batch's own
+  session (see ``shared_session``). A sub-request that fails is rolled
+  back so its half-done work cannot be committed by the next one.
+
+A run of consecutive GETs cannot depend on anything between them, so it
+is executed in parallel instead, up to ``BATCH_READ_CONCURRENCY`` at a
+time. Each parallel read gets its own pooled session, because a session
+must not be used from two threads at once.
+"""
+import asyncio
+import logging
+from typing import Optional
+from urllib.parse import unquote
+
+import orjson
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import Request
+
+from app.db.session import shared_session
+from app.schemas.batch import BatchMethod, BatchRequestItem
+
+logger = logging.getLogger(__name__)
+
+# Set by the batch itself, never taken from the sub-request
+REPLACED_HEADERS = {"authorization", "content-type", "content-length", "accept-encoding", "host"}
+DROPPED_RESPONSE_HEADERS = {"content-length"}
+SERVER_ERROR = orjson.dumps({"detail": "Internal Server Error"})
+
+
+async def run_batch(
+    request: Request, items: list[BatchRequestItem], current_user: dict, db: Session, read_concurrency: int
+) -> bytes:
+    """Run items and return the JSON body of the batch response, results in request order."""
+    results: list[Optional[bytes]] = [None] * len(items)
+    semaphore = asyncio.Semaphore(max(read_concurrency, 1))
+
+    async def parallel_read(index: int):
+        async with semaphore:
+            results[index] = await _dispatch(request, items[index], current_user, None)
+
+    index = 0
+    while index < len(items):
+        end = index
+        while end < len(items) and items[end].method == BatchMethod.GET:
+            end += 1
+        if end - index > 1 and read_concurrency > 1:
+            await asyncio.gather(*(parallel_read(i) for i in range(index, end)))
+            index = end
+        else:
+            results[index] = await _dispatch(request, items[index], current_user, db)
+            index += 1
+    return b'{"responses":[' + b",".join(results) + b"]}"
+
+
+async def _dispatch(request: Request, item: BatchRequestItem, current_user: dict, db: Optional[Session]) -> bytes:
+    path, _, query = item.path.partition("?")
+    body = b"" if item.body is None else orjson.dumps(item.body)
+    headers = [
+        (name.lower().encode("latin-1"), value.encode("latin-1"))
+        for name, value in item.headers.items() if name.lower() not in REPLACED_HEADERS
+    ]
+    headers += [
+        (b"authorization", request.headers.get("authorization", "").encode("latin-1")),
+        (b"content-type", b"application/json"),
+        (b"content-length", str(len(body)).encode()),
+    ]
+    scope = {
+        "type": "http",
+        "asgi": request.scope.get("asgi", {"version": "3.0"}),
+        "http_version": request.scope.get("http_version", "1.1"),
+        "method": item.method.value,
+        "scheme": request.url.scheme,
+        "path": unquote(path),
+        "raw_path": path.encode(),
+        "query_string": query.encode(),
+        "root_path": request.scope.get("root_path", ""),
+        "headers": headers,
+        "client": request.scope.get("client"),
+        "server": request.scope.get("server"),
+        "state": {"batch_user": current_user},
+    }
+
+    sent = False
+
+    async def receive():
+        nonlocal sent
+        if sent:
+            return {"type": "http.disconnect"}
+        sent = True
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    status_code = 500
+    response_headers = []
+    chunks = []
+
+    async def send(message):
+        nonlocal status_code, response_headers
+        if message["type"] == "http.response.start":
+            status_code = message["status"]
+            response_headers = message.get("headers", [])
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+
+    token = shared_session.set(db)
+    try:
+        await request.app(scope, receive, send)
+    except Exception:
+        logger.exception("Batch sub-request %s %s failed", item.method.value, item.path)
+        status_code, response_headers, chunks = 500, [(b"content-type", b"application/json")], [SERVER_ERROR]
+    finally:
+        shared_session.reset(token)
+    if db is not None and status_code >= 400:
+        await run_in_threadpool(db.rollback)
+
+    header_map = {
+        name.decode("latin-1"): value.decode("latin-1")
+        for name, value in response_headers if name.decode("latin-1").lower() not in DROPPED_RESPONSE_HEADERS
+    }
+    content = b"".join(chunks)
+    content_type = header_map.get("content-type", "")
+    if not content:
+        encoded_body = b"null"
+    elif content_type.startswith("application/json"):
+        encoded_body = content  # already JSON; spliced in without a decode/encode round trip
+    else:
+        encoded_body = orjson.dumps(content.decode("utf-8", errors="replace"))
+    return b'{"status":%d,"headers":%s,"body":%s}' % (status_code, orjson.dumps(header_map), encoded_body)
@@ -0,0 +1,199 @@
+"""Compress responses for clients that reached the app without a proxy.
+
+Deployments behind ``nginx.conf`` get gzip from nginx. Direct
+deployments (Render, the Procfile) only get compression from this
+middleware. gzip is always available. Brotli and zstd are used when
+the ``brotli`` or ``zstandard`` package is installed. The client's
+Accept-Encoding picks among the encodings in ``COMPRESSION_ENCODINGS``,
+and ties go to the one listed first.
+
+Bodies smaller than ``COMPRESSION_MINIMUM_SIZE`` go out as they are,
+since compressing them saves less time than it costs. The same applies
+to media that is already compressed and to responses that carry a
+Content-Encoding. Streamed responses are compressed chunk by chunk, and
+each chunk is flushed so a Server-Sent Event reaches the client as soon
+as it is produced. The response cache keeps the compressed bytes next
+to the plain ones, so a cache hit is not compressed again.
+"""
+import zlib
+from typing import Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+
+from app.core.config import get_settings
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 4  # 5+ costs several times the CPU for a few percent
+ZSTD_LEVEL = 3
+
+COMPRESSIBLE_TYPES = (
+    "text/", "application/json", "application/javascript", "application/xml",
+    "application/problem+json", "image/svg+xml",
+)
+UNCOMPRESSED_STATUSES = (204, 206, 304)
+
+SUPPORTED = {"gzip": True, "br": brotli is not None, "zstd": zstandard is not None}
+
+
+def configured_encodings() -> tuple[str, ...]:
+    """Encodings to offer, in preference order, leaving out codecs that are not installed."""
+    names = [name.strip() for name in get_settings().compression_encodings.split(",")]
+    return tuple(name for name in names if SUPPORTED.get(name))
+
+
+def negotiate(accept_encoding: Optional[str], encodings: tuple[str, ...]) -> Optional[str]:
+    """The encoding to use for an Accept-Encoding header, or None for identity."""
+    if not accept_encoding or not encodings:
+        return None
+    weights = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        weight = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                weight = float(params[2:])
+            except ValueError:
+                weight = 0.0
+        weights[name.strip().lower()] = weight
+    best, best_weight = None, 0.0
+    for name in encodings:
+        weight = weights.get(name, weights.get("*", 0.0))
+        if weight > best_weight:
+            best, best_weight = name, weight
+    return best
+
+
+def compressible(content_type: Optional[str]) -> bool:
+    return bool(content_type) and content_type.startswith(COMPRESSIBLE_TYPES)
+
+
+def choose_encoding(accept_encoding: Optional[str], size: int) -> Optional[str]:
+    """The encoding the middleware would give a complete body of size bytes."""
+    if size < get_settings().compression_minimum_size:
+        return None
+    return negotiate(accept_encoding, configured_encodings())
+
+
+def compress(data: bytes, encoding: str) -> bytes:
+    """Compress a complete body."""
+    if encoding == "br":
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    if encoding == "zstd":
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+    compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+    return compressor.compress(data) + compressor.flush()
+
+
+class StreamCompressor:
+    """Incremental compressor whose output can be flushed after each chunk."""
+
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        if encoding == "br":
+            self._compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        elif encoding == "zstd":
+            self._compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compressobj()
+        else:
+            self._compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    def chunk(self, data: bytes, final: bool) -> bytes:
+        """Compress data; everything written so far is decodable once this returns."""
+        if self.encoding == "br":
+            return self._compressor.process(data) + (
+                self._compressor.finish() if final else self._compressor.flush()
+            )
+        if self.encoding == "zstd":
+            return self._compressor.compress(data) + self._compressor.flush(
+                zstandard.COMPRESSOBJ_FLUSH_FINISH if final else zstandard.COMPRESSOBJ_FLUSH_BLOCK
+            )
+        return self._compressor.compress(data) + self._compressor.flush(
+            zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH
+        )
+
+
+class CompressionMiddleware:
+    """ASGI middleware that compresses response bodies the client can decode."""
+
+    def __init__(self, app, minimum_size: Optional[int] = None, encodings: Optional[tuple[str, ...]] = None):
+        self.app = app
+        self.minimum_size = get_settings().compression_minimum_size if minimum_size is None else minimum_size
+        self.encodings = configured_encodings() if encodings is None else encodings
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding"), self.encodings)
+        if encoding is None:
+            return await self.app(scope, receive, send)
+        await self.app(scope, receive, _CompressingSend(send, encoding, self.minimum_size))
+
+
+class _CompressingSend:
+    """Wraps ``send`` for one response and decides whether to compress it.
+
+    The start message is held back until the first body chunk shows
+    whether the body is complete (compress it in one go when it is big
+    enough) or streamed (compress chunk by chunk).
+    """
+
+    def __init__(self, send, encoding: str, minimum_size: int):
+        self.send = send
+        self.encoding = encoding
+        self.minimum_size = minimum_size
+        self.start = None
+        self.passthrough = False
+        self.compressor: Optional[StreamCompressor] = None
+
+    async def __call__(self, message):
+        if message["type"] == "http.response.start":
+            headers = Headers(raw=message["headers"])
+            if (
+                message["status"] in UNCOMPRESSED_STATUSES
+                or "content-encoding" in headers
+                or "content-range" in headers
+                or not compressible(headers.get("content-type"))
+            ):
+                self.passthrough = True
+                return await self.send(message)
+            self.start = message
+            return
+        if self.passthrough or message["type"] != "http.response.body":
+            return await self.send(message)
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if self.compressor is not None:
+            return await self.send({
+                "type": "http.response.body",
+                "body": self.compressor.chunk(body, final=not more_body),
+                "more_body": more_body,
+            })
+
+        if not more_body and len(body) < self.minimum_size:
+            self.passthrough = True
+            await self.send(self.start)
+            return await self.send(message)
+
+        headers = MutableHeaders(raw=list(self.start["headers"]))
+        headers["Content-Encoding"] = self.encoding
+        headers.add_vary_header("Accept-Encoding")
+        if more_body:
+            del headers["Content-Length"]
+            self.compressor = StreamCompressor(self.encoding)
+            body = self.compressor.chunk(body, final=False)
+        else:
+            body = compress(body, self.encoding)
+            headers["Content-Length"] = str(len(body))
+        await self.send({**self.start, "headers": headers.raw})
+        await self.send({"type": "http.response.body", "body": body, "more_body": more_body})
@@ -0,0 +1,119 @@
+from typing import Any, Callable, Optional
+from fastapi import HTTPException, status
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.exc import StaleDataError
+
+
+def format_etag(version: int) -> str:
+    """Format a row version as an ETag header value."""
+    return f'"{version}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header names etag (weak comparison, as for GET)."""
+    if if_none_match is None:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or etag in (tag[2:] if tag.startswith("W/") else tag for tag in tags)
+
+
+def parse_if_match(if_match: Optional[str]) -> Optional[list[int]]:
+    """Parse an If-Match header into the list of acceptable versions.
+
+    Returns None when the header is absent or is the ``*`` wildcard,
+    meaning the write is unconditional.
+    """
+    if if_match is None or if_match.strip() == "*":
+        return None
+
+    versions = []
+    for tag in if_match.split(","):
+        tag = tag.strip()
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        tag = tag.strip('"')
+        try:
+            versions.append(int(tag))
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Malformed If-Match header"
+            )
+    return versions
+
+
+def check_if_match(if_match: Optional[str], current_version: int) -> None:
+    """Reject the request with 412 if If-Match does not name the current version."""
+    versions = parse_if_match(if_match)
+    if versions is not None and current_version not in versions:
+        raise HTTPException(
+            status_code=status.HTTP_412_PRECONDITION_FAILED,
+            detail="Resource has been modified by another request"
+        )
+
+
+def commit_versioned(db: Session) -> None:
+    """Commit a versioned update, mapping a lost race to 412.
+
+    Models declaring ``version_id_col`` are flushed as
+    ``UPDATE ... WHERE id = ? AND version = ?``; if another writer got
+    there first no row matches and SQLAlchemy raises StaleDataError.
+    """
+    try:
+        db.commit()
+    except StaleDataError:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_412_PRECONDITION_FAILED,
+            detail="Resource has been modified by another request"
+        )
+
+
+def conditional_update(
+    db: Session,
+    model: Any,
+    obj_id: int,
+    values: dict,
+    if_match: Optional[str],
+    not_found_detail: str,
+    before_commit: Optional[Callable[[Any], None]] = None,
+) -> Any:
+    """Apply a partial update as one ``UPDATE ... WHERE id = ? [AND version IN (...)]``.
+
+    Values may be SQL expressions over the row's own columns. On dialects
+    with UPDATE..RETURNING the new row comes back from the same statement;
+    elsewhere (MySQL) it is read back by primary key inside the same
+    transaction. The row is only looked up again to choose between 404
+    and 412 when the UPDATE matched nothing. ``before_commit`` receives
+    the updated object so dependent bookkeeping joins the transaction.
+    """
+    versions = parse_if_match(if_match)
+    stmt = update(model).where(model.id == obj_id)
+    if versions is not None:
+        stmt = stmt.where(model.version.in_(versions))
+    stmt = stmt.values(**values, version=model.version + 1)
+
+    if db.get_bind().dialect.update_returning:
+        # "fetch" applies the RETURNING row to an instance this session already
+        # holds (e.g. from an earlier sub-request of a batch) at no extra cost
+        obj = db.execute(
+            stmt.returning(model), execution_options={"synchronize_session": "fetch"}
+        ).scalar_one_or_none()
+    else:
+        result = db.execute(stmt, execution_options={"synchronize_session": False})
+        obj = db.get(model, obj_id, populate_existing=True) if result.rowcount else None
+
+    if obj is None:
+        db.rollback()
+        if db.query(model.id).filter(model.id == obj_id).first() is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=not_found_detail)
+        raise HTTPException(
+            status_code=status.HTTP_412_PRECONDITION_FAILED,
+            detail="Resource has been modified by another request"
+        )
+
+    if before_commit is not None:
+        before_commit(obj)
+    db.commit()
+    return obj
@@ -18,6 +18,71 @@ class Settings(BaseSettings):
     app_name: str = "Healthcare Management System"
     app_version: str = "1.0.0"
     
+    # Soft delete / purge
+    soft_delete_retention_days: int = 30
+    purge_batch_size: int = 500
+    purge_interval_minutes: int = 0  # 0 disables the in-process purge worker
+    
+    # Idempotency keys
+    idempotency_ttl_hours: int = 24
+    idempotency_lease_seconds: int = 300  # an unfinished claim older than this is taken over by the next retry
+    
+    # Response cache (per process; 0 entries disables it)
+    response_cache_max_entries: int = 10000
+    response_cache_max_mb: int = 64
+    response_cache_ttl_seconds: float = 60.0  # bounds staleness from writes handled by other workers
+    
+    # Response compression (for deployments without the nginx gzip in front)
+    compression_encodings: str = "br,zstd,gzip"  # preference order; br/zstd need the brotli/zstandard packages
+    compression_minimum_size: int = 1024  # bytes; smaller bodies are sent uncompressed
+    
+    # Batch endpoint
+    batch_max_requests: int = 20
+    batch_read_concurrency: int = 4  # consecutive GETs in a batch run in parallel, each on its own pooled session
+    batch_get_max_ids: int = 500  # per ?ids= or POST .../lookup request
+    
+    # Total counts on list endpoints (X-Total-Count)
+    total_count_default: str = "none"  # none | exact | cached | estimated, for requests without ?count=
+    total_count_ttl_seconds: float = 30.0  # cached counts; writes through this process drop them sooner
+    total_count_cache_entries: int = 10000
+    
+    # Scheduling
+    appointment_slot_minutes: int = 15  # a doctor has at most one active appointment per slot
+    
+    # Billing
+    bill_facility_code: str = "MAIN"
+    bill_number_block_size: int = 100
+    aging_interval_hours: int = 0  # 0 disables the in-process aging job; run aging_job.py from cron
+    statement_output_dir: str = "statements"
+    statement_chunk_size: int = 500
+    statement_workers: int = 0  # 0 = one render process per CPU core
+    
+    # Event outbox
+    outbox_sink: str = "none"  # none | file | http | memory; "none" leaves events queued
+    outbox_target: str = ""  # file path for "file", URL for "http"
+    outbox_poll_seconds: float = 2.0
+    outbox_batch_size: int = 100
+    outbox_max_attempts: int = 10
+    outbox_retention_hours: int = 72
+    outbox_pending_retention_hours: int = 0  # undispatched events expire after this; 0 keeps them forever
+    
+    # Live feed (SSE / WebSocket)
+    live_feed_poll_seconds: float = 0.5
+    live_feed_heartbeat_seconds: float = 15.0
+    live_feed_backlog_limit: int = 1000  # older resume tokens get a reset
+    live_feed_queue_size: int = 1000  # per client; a slower client is disconnected
+    
+    # PHI access audit
+    audit_spool_dir: str = "audit_spool"
+    audit_batch_size: int = 500
+    audit_flush_seconds: float = 2.0
+    audit_spool_fsync: bool = False  # fsync the spool on every read to survive host crashes
+    
+    # Analytics snapshots
+    analytics_dir: str = "analytics"
+    analytics_database_url: str = ""  # read replica to extract from; empty uses DATABASE_URL
+    analytics_snapshot_interval_hours: int = 0  # 0 disables the in-process job; run analytics_snapshot.py from cron
+    
     class Config:
         env_file = ".env"
         env_file_encoding = "utf-8"
@@ -0,0 +1,163 @@
+"""Total row counts for paginated lists: ``?count=exact|cached|estimated|none``.
+
+A list route hands its filtered SELECT (before skip/limit) to
+``total_count_headers`` and sends the result as ``X-Total-Count``, with
+``X-Total-Count-Mode`` saying how it was obtained:
+
+* ``none`` skips the count, so large lists do not pay for a total that
+  the client does not display. This is the default unless
+  ``TOTAL_COUNT_DEFAULT`` says otherwise.
+* ``exact`` runs ``SELECT COUNT(*)`` with the same FROM and WHERE.
+* ``cached`` reuses an exact count of the same statement for up to
+  ``TOTAL_COUNT_TTL_SECONDS``. Any commit through this process that
+  writes to one of the counted tables drops it sooner. The session
+  events below see ORM flushes as well as Core and bulk
+  INSERT/UPDATE/DELETE.
+* ``estimated`` asks MySQL's optimizer (``EXPLAIN``) how many rows the
+  statement would read. That estimate comes from index statistics and
+  costs no scan, but it can be off by a good margin. Other databases
+  have no such cheap estimate, so ``estimated`` falls back to
+  ``cached`` there and the mode header says so. The billing rollup
+  tables hold balances, not row counts, so they cannot answer for a
+  list.
+"""
+import threading
+import time
+from enum import Enum
+from typing import Optional
+
+from fastapi import Query
+from sqlalchemy import Select, event, func
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.util import find_tables
+
+from app.core.config import get_settings
+
+TOTAL_COUNT_HEADER = "X-Total-Count"
+TOTAL_COUNT_MODE_HEADER = "X-Total-Count-Mode"
+
+
+class CountMode(str, Enum):
+    NONE = "none"
+    EXACT = "exact"
+    CACHED = "cached"
+    ESTIMATED = "estimated"
+
+
+class CountCache:
+    """Exact counts by statement, dropped after a TTL or when a counted table is written."""
+
+    def __init__(self, ttl_seconds: float, max_entries: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: dict[tuple, tuple[int, float, frozenset]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple) -> Optional[int]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] <= time.monotonic():
+                return None
+            return entry[0]
+
+    def invalidate(self, tables: set[str]) -> None:
+        with self._lock:
+            for key in [key for key, entry in self._entries.items() if entry[2] & tables]:
+                del self._entries[key]
+
+    def set(self, key: tuple, count: int, tables: frozenset) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+            while self._entries and len(self._entries) >= self.max_entries:
+                del self._entries[next(iter(self._entries))]  # oldest first
+            self._entries[key] = (count, time.monotonic() + self.ttl_seconds, tables)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+count_cache = CountCache(get_settings().total_count_ttl_seconds, get_settings().total_count_cache_entries)
+
+
+def count_mode(
+    count: Optional[CountMode] = Query(
+        None, description="How to fill X-Total-Count: exact, cached, estimated or none (skip the count)"
+    )
+) -> CountMode:
+    """Dependency for a list route's ``count`` parameter."""
+    return count or CountMode(get_settings().total_count_default)
+
+
+def _exact(db: Session, statement: Select) -> int:
+    return db.execute(statement.with_only_columns(func.count(), maintain_column_froms=True).order_by(None)).scalar()
+
+
+def _cached(db: Session, statement: Select) -> int:
+    compiled = statement.compile()
+    key = (str(compiled), repr(sorted(compiled.params.items())))
+    count = count_cache.get(key)
+    if count is None:
+        count = _exact(db, statement)
+        count_cache.set(key, count, frozenset(table.name for table in find_tables(statement, include_joins=True)))
+    return count
+
+
+def _estimated(db: Session, statement: Select) -> Optional[int]:
+    bind = db.get_bind()
+    if bind.dialect.name != "mysql":
+        return None
+    try:
+        sql = statement.order_by(None).compile(dialect=bind.dialect, compile_kwargs={"literal_binds": True})
+    except Exception:
+        return None
+    plan = db.connection().exec_driver_sql(f"EXPLAIN {sql}").mappings().first()
+    if plan is None or plan["rows"] is None:
+        return None
+    return int(plan["rows"] * float(plan.get("filtered") or 100) / 100)
+
+
+def total_count_headers(db: Session, statement: Select, mode: CountMode) -> dict:
+    """X-Total-Count headers for the rows statement would return without skip/limit."""
+    if mode == CountMode.NONE:
+        return {}
+    if mode == CountMode.ESTIMATED:
+        count = _estimated(db, statement)
+        if count is not None:
+            return {TOTAL_COUNT_HEADER: str(count), TOTAL_COUNT_MODE_HEADER: mode.value}
+        mode = CountMode.CACHED
+    count = _cached(db, statement) if mode == CountMode.CACHED else _exact(db, statement)
+    return {TOTAL_COUNT_HEADER: str(count), TOTAL_COUNT_MODE_HEADER: mode.value}
+
+
+# Tables written in a session's current transaction, invalidated from the cache on commit
+
+def _written(session: Session) -> set[str]:
+    return session.info.setdefault("count_tables_written", set())
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _note_statement_writes(execute_state):
+    if execute_state.is_insert or execute_state.is_update or execute_state.is_delete:
+        table = getattr(execute_state.statement, "table", None)
+        if table is not None and getattr(table, "name", None):
+            _written(execute_state.session).add(table.name)
+
+
+@event.listens_for(Session, "after_flush")
+def _note_flushed_writes(session, flush_context):
+    written = _written(session)
+    for instance in (*session.new, *session.dirty, *session.deleted):
+        written.update(table.name for table in instance.__mapper__.tables)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_written(session):
+    written = session.info.pop("count_tables_written", None)
+    if written:
+        count_cache.invalidate(written)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_written(session):
+    session.info.pop("count_tables_written", None)
@@ -0,0 +1,125 @@
+"""Related-entity expansion: ``?expand=patient,doctor``.
+
+List routes that return foreign-key ids can embed a compact summary of
+the row each id points to, so a client does not fetch every patient and
+doctor on the page one at a time. A route whitelists the relations it
+can expand. Each expansion costs one extra query for the whole page: a
+Core SELECT ... WHERE id IN over the distinct ids on the page, reading
+only the columns the summary shows (the doctor summary joins
+``doctors`` into the same query for the specialization). A related row
+that has been deleted expands to null.
+
+Only relations of the listed rows themselves can be expanded
+(``MAX_DEPTH``), and summaries carry no relations of their own, so an
+expansion never fans out further.
+"""
+from functools import lru_cache
+from typing import Any, Optional
+
+from fastapi import HTTPException, Query, status
+from pydantic import BaseModel, create_model
+from sqlalchemy import Select, select
+from sqlalchemy.orm import Session
+
+from app.models.doctor import Doctor
+from app.models.patient import Patient
+from app.models.user import User
+from app.schemas.doctor import DoctorSummary
+from app.schemas.patient import PatientSummary
+
+MAX_DEPTH = 1
+
+
+class Expansion:
+    """A many-to-one relation a route can embed, read by statement (summary columns only)."""
+
+    def __init__(self, relationship: Any, summary: type[BaseModel], statement: Select):
+        [(local, remote)] = relationship.property.local_remote_pairs
+        self.foreign_key = local.key  # e.g. patient_id on the listed rows
+        self.remote = remote  # e.g. patients.id
+        self.summary = summary
+        self.statement = statement
+
+    def fetch(self, db: Session, keys: set) -> dict[Any, dict]:
+        """Summaries of the rows with these keys, by key."""
+        rows = db.execute(self.statement.where(self.remote.in_(keys))).mappings()
+        return {row[self.remote.key]: dict(row) for row in rows}
+
+
+def patient_summary(relationship: Any) -> Expansion:
+    return Expansion(
+        relationship, PatientSummary,
+        select(Patient.id, Patient.first_name, Patient.last_name, Patient.date_of_birth)
+    )
+
+
+def doctor_summary(relationship: Any) -> Expansion:
+    # relationship points at the doctor's User row; the profile comes along in a join
+    return Expansion(
+        relationship, DoctorSummary,
+        select(User.id, User.full_name, Doctor.specialization).outerjoin(Doctor, Doctor.user_id == User.id)
+    )
+
+
+@lru_cache(maxsize=None)
+def expanded_model(base: type[BaseModel], summaries: tuple[tuple[str, type[BaseModel]], ...]) -> type[BaseModel]:
+    """base with an optional field per (name, summary); cached per combination."""
+    if not summaries:
+        return base
+    return create_model(
+        f"{base.__name__}Expanded", __base__=base,
+        **{name: (Optional[summary], None) for name, summary in summaries}
+    )
+
+
+class ExpansionSet:
+    """The expansions one request asked for."""
+
+    def __init__(self, expansions: dict[str, Expansion]):
+        self.expansions = expansions
+
+    @property
+    def foreign_keys(self) -> list[str]:
+        """Columns the listed rows must include for expand() to work."""
+        return [expansion.foreign_key for expansion in self.expansions.values()]
+
+    def expand(self, db: Session, rows: list[dict]) -> list[dict]:
+        """Add each requested summary to rows in place; one query per expansion."""
+        for name, expansion in self.expansions.items():
+            keys = {row[expansion.foreign_key] for row in rows} - {None}
+            summaries = expansion.fetch(db, keys) if keys else {}
+            for row in rows:
+                row[name] = summaries.get(row[expansion.foreign_key])
+        return rows
+
+    def model(self, base: type[BaseModel]) -> type[BaseModel]:
+        """The response schema base extended with the expanded summaries."""
+        return expanded_model(base, tuple((name, expansion.summary) for name, expansion in self.expansions.items()))
+
+
+def expandable(**available: Expansion):
+    """Dependency that parses ``expand`` against the named expansions a route allows."""
+
+    def dependency(
+        expand: Optional[str] = Query(
+            None, description=f"Comma-separated relations to embed a summary of: {', '.join(available)}"
+        )
+    ) -> ExpansionSet:
+        if expand is None:
+            return ExpansionSet({})
+        requested = list(dict.fromkeys(name.strip() for name in expand.split(",") if name.strip()))
+        too_deep = [name for name in requested if name.count(".") >= MAX_DEPTH]
+        if too_deep:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Nested expansion is not supported: {', '.join(too_deep)}"
+            )
+        unknown = [name for name in requested if name not in available]
+        if unknown:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Cannot expand {', '.join(unknown)}. Available: {', '.join(available)}"
+            )
+        return ExpansionSet({name: available[name] for name in requested})
+
+    return dependency
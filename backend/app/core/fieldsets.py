@@ -0,0 +1,137 @@
+"""Sparse fieldsets: ``?fields=id,first_name,last_name``.
+
+A route declares which response schema and ORM model its ``fields``
+parameter refers to. Each request then gets a ``FieldSet`` that does two
+things:
+
+* It says which columns to read. List routes read them with
+  ``select()`` and ``fetch()``: plain row mappings straight from Core,
+  plus one ``IN`` query per nested list that was asked for. Nothing is
+  hydrated into ORM objects or tracked in the session's identity map,
+  which is most of the cost of a large read-only page. Single-item
+  routes, whose rows may be written back, use ``load_options()``
+  (``load_only()`` and ``selectinload()``) on an ORM query instead.
+* ``model`` is a copy of the response schema trimmed to the selected
+  fields, so only those fields are serialized.
+
+``id`` is always included. ``fields=*`` selects everything. Without
+``fields``, list routes leave out their large Text columns (``deferred``)
+and single-item routes return the whole schema.
+"""
+from functools import lru_cache
+from typing import Any, Iterable, Optional, get_args
+
+from fastapi import HTTPException, Query, status
+from pydantic import BaseModel, ConfigDict, create_model
+from sqlalchemy import Select, inspect, select
+from sqlalchemy.orm import Session, load_only, selectinload
+
+ALL_FIELDS = "*"
+
+
+@lru_cache(maxsize=None)
+def trimmed_model(schema: type[BaseModel], names: tuple[str, ...]) -> type[BaseModel]:
+    """schema with only the named fields, in schema order; cached per selection."""
+    if names == tuple(schema.model_fields):
+        return schema
+    fields = {name: (schema.model_fields[name].annotation, schema.model_fields[name]) for name in names}
+    return create_model(
+        f"{schema.__name__}Fields", __config__=ConfigDict(from_attributes=True), **fields
+    )
+
+
+class FieldSet:
+    """The response fields one request asked for."""
+
+    def __init__(
+        self, schema: type[BaseModel], orm_model: Any, names: tuple[str, ...], always: tuple[str, ...] = ()
+    ):
+        self.schema = schema
+        self.orm_model = orm_model
+        self.names = names
+        self.always = always
+
+    @classmethod
+    def every(cls, schema: type[BaseModel], orm_model: Any) -> "FieldSet":
+        """All of schema's fields, for routes without a ``fields`` parameter."""
+        return cls(schema, orm_model, tuple(schema.model_fields))
+
+    @property
+    def model(self) -> type[BaseModel]:
+        return trimmed_model(self.schema, self.names)
+
+    def load_options(self) -> list:
+        """Loader options for a query over orm_model that fetch just these fields."""
+        mapper = inspect(self.orm_model)
+        columns, options = [], []
+        for name in (*self.names, *self.always):
+            if name in mapper.relationships:
+                options.append(selectinload(getattr(self.orm_model, name)))
+            elif name in mapper.column_attrs:
+                columns.append(getattr(self.orm_model, name))
+        return [load_only(*columns), *options]
+
+    def select(self, also: Iterable[str] = ()) -> Select:
+        """A Core SELECT of the selected columns (and also); add criteria and paging, then fetch()."""
+        mapper = inspect(self.orm_model)
+        names = dict.fromkeys(name for name in (*self.names, *self.always, *also) if name in mapper.column_attrs)
+        return select(*(getattr(self.orm_model, name) for name in names))
+
+    def fetch(self, db: Session, statement: Select) -> list[dict]:
+        """Run statement and return one dict per row, with any selected nested lists filled in."""
+        rows = [dict(row) for row in db.execute(statement).mappings()]
+        mapper = inspect(self.orm_model)
+        for name in self.names:
+            if name in mapper.relationships and rows:
+                self._fill_children(db, rows, name, mapper.relationships[name])
+        return rows
+
+    def _fill_children(self, db: Session, rows: list[dict], name: str, relationship: Any) -> None:
+        # One-to-many only: parent.id -> child.<fk>, one IN query for the whole page
+        [(parent_key, child_key)] = relationship.local_remote_pairs
+        [child_schema] = get_args(self.schema.model_fields[name].annotation)
+        child_model = relationship.mapper.class_
+        children = FieldSet.every(child_schema, child_model)
+        statement = children.select(also=[child_key.key]).where(
+            child_key.in_({row[parent_key.key] for row in rows})
+        ).order_by(*relationship.mapper.primary_key)
+        by_parent: dict[Any, list] = {}
+        for child in children.fetch(db, statement):
+            by_parent.setdefault(child[child_key.key], []).append(child)
+        for row in rows:
+            row[name] = by_parent.get(row[parent_key.key], [])
+
+
+def sparse_fields(
+    schema: type[BaseModel], orm_model: Any, deferred: Iterable[str] = (), always: Iterable[str] = ()
+):
+    """Dependency that parses ``fields`` for a route serving schema from orm_model.
+
+    deferred fields are left out when the client does not send ``fields``.
+    always names ORM attributes the handler reads itself (for audit
+    entries or ETags), which are loaded even if they are not returned.
+    """
+    every = tuple(schema.model_fields)
+    default = tuple(name for name in every if name not in set(deferred))
+    always = tuple(always)
+
+    def dependency(
+        fields: Optional[str] = Query(
+            None, description="Comma-separated fields to return, or * for all; id is always included"
+        )
+    ) -> FieldSet:
+        if fields is None:
+            return FieldSet(schema, orm_model, default, always)
+        requested = {name.strip() for name in fields.split(",") if name.strip()}
+        if ALL_FIELDS in requested:
+            return FieldSet(schema, orm_model, every, always)
+        unknown = requested.difference(every)
+        if unknown:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Unknown field(s): {', '.join(sorted(unknown))}. Available: {', '.join(every)}"
+            )
+        requested.add("id")
+        return FieldSet(schema, orm_model, tuple(name for name in every if name in requested), always)
+
+    return dependency
@@ -0,0 +1,249 @@
+"""Idempotency-Key support for POST endpoints.
+
+A client that retries a POST with the same ``Idempotency-Key`` header
+gets the stored response of the first attempt instead of running the
+handler again. Retries that arrive while the first attempt is still in
+flight wait for it in the same worker, or get 409 when another worker
+owns it. A claim that is still unfinished after
+``IDEMPOTENCY_LEASE_SECONDS`` is assumed to belong to a worker that
+died, and the next retry takes it over and runs the handler. Reusing a
+key with a different body is a 422.
+"""
+import asyncio
+import hashlib
+from datetime import datetime, timedelta
+from typing import Optional
+
+from fastapi import HTTPException
+from sqlalchemy import delete, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse, Response
+
+from app.core.config import get_settings
+from app.core.security import verify_token
+from app.db.session import app_session
+from app.models.idempotency import IdempotencyRecord, IdempotencyState
+
+IDEMPOTENCY_HEADER = "idempotency-key"
+MAX_KEY_LENGTH = 255
+EXCLUDED_PREFIXES = ("/api/v1/auth/",)
+
+
+def _sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def _reclaimable(record: IdempotencyRecord, now: datetime) -> bool:
+    """Expired, or claimed by a worker that has held it past the lease without finishing."""
+    if record.expires_at <= now:
+        return True
+    lease = timedelta(seconds=get_settings().idempotency_lease_seconds)
+    return record.state != IdempotencyState.COMPLETED.value and record.created_at + lease <= now
+
+
+def _claim(db: Session, key_hash: str, request_hash: str):
+    """Return the live record for key_hash, or claim the key and return None."""
+    now = datetime.utcnow()
+    record = db.execute(
+        select(IdempotencyRecord).where(IdempotencyRecord.key_hash == key_hash)
+    ).scalar_one_or_none()
+    if record is not None and not _reclaimable(record, now):
+        return record
+
+    ttl = timedelta(hours=get_settings().idempotency_ttl_hours)
+    if record is not None:
+        # Conditional on the old claim time, so only one of several retries takes it over
+        taken = db.execute(
+            update(IdempotencyRecord)
+            .where(IdempotencyRecord.id == record.id, IdempotencyRecord.created_at == record.created_at)
+            .values(
+                request_hash=request_hash, state=IdempotencyState.IN_PROGRESS.value, status_code=None,
+                content_type=None, response_body=None, created_at=now, expires_at=now + ttl
+            ),
+            execution_options={"synchronize_session": False}
+        ).rowcount
+        db.commit()
+        db.expire(record)
+        if taken:
+            return None
+        return db.execute(
+            select(IdempotencyRecord).where(IdempotencyRecord.key_hash == key_hash)
+        ).scalar_one()
+
+    db.add(IdempotencyRecord(key_hash=key_hash, request_hash=request_hash, expires_at=now + ttl))
+    try:
+        db.commit()
+    except IntegrityError:
+        # Another worker claimed it between our SELECT and INSERT
+        db.rollback()
+        return db.execute(
+            select(IdempotencyRecord).where(IdempotencyRecord.key_hash == key_hash)
+        ).scalar_one()
+    return None
+
+
+def _complete(db: Session, key_hash: str, status_code: int, content_type: Optional[str], body: bytes) -> None:
+    record = db.execute(
+        select(IdempotencyRecord).where(IdempotencyRecord.key_hash == key_hash)
+    ).scalar_one_or_none()
+    if record is None:
+        return
+    if status_code >= 500:
+        # Server errors are not final; let the client retry for real
+        db.delete(record)
+    else:
+        record.state = IdempotencyState.COMPLETED.value
+        record.status_code = status_code
+        record.content_type = content_type
+        record.response_body = body.decode("utf-8")
+    db.commit()
+
+
+def purge_expired_keys(db: Session, batch_size: int = 1000) -> int:
+    """Delete expired idempotency records in bounded batches."""
+    total = 0
+    while True:
+        ids = db.execute(
+            select(IdempotencyRecord.id)
+            .where(IdempotencyRecord.expires_at < datetime.utcnow())
+            .limit(batch_size)
+        ).scalars().all()
+        if not ids:
+            return total
+        db.execute(delete(IdempotencyRecord).where(IdempotencyRecord.id.in_(ids)))
+        db.commit()
+        total += len(ids)
+
+
+class IdempotencyMiddleware:
+    """ASGI middleware that makes keyed POST requests safe to retry."""
+
+    def __init__(self, app, wait_timeout: float = 30.0):
+        self.app = app
+        self.wait_timeout = wait_timeout
+        self._inflight: dict[str, asyncio.Event] = {}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST":
+            return await self.app(scope, receive, send)
+
+        headers = Headers(scope=scope)
+        key = headers.get(IDEMPOTENCY_HEADER)
+        path = scope["path"]
+        if not key or not path.startswith("/api/v1/") or path.startswith(EXCLUDED_PREFIXES):
+            return await self.app(scope, receive, send)
+
+        user_id = self._user_id(headers)
+        if user_id is None:
+            # Let the route's own auth dependency produce the 401/403
+            return await self.app(scope, receive, send)
+
+        if len(key) > MAX_KEY_LENGTH:
+            response = JSONResponse({"detail": "Idempotency-Key is too long"}, status_code=400)
+            return await response(scope, receive, send)
+
+        body = await self._read_body(receive)
+        key_hash = _sha256(f"{user_id}:{path}:{key}".encode())
+        request_hash = _sha256(body)
+
+        while True:
+            event = self._inflight.get(key_hash)
+            if event is not None:
+                try:
+                    await asyncio.wait_for(event.wait(), self.wait_timeout)
+                except asyncio.TimeoutError:
+                    return await self._busy(scope, receive, send)
+                continue
+
+            self._inflight[key_hash] = event = asyncio.Event()
+            try:
+                with app_session(scope["app"]) as db:
+                    record = await run_in_threadpool(_claim, db, key_hash, request_hash)
+                if record is None:
+                    return await self._execute(scope, body, send, key_hash)
+                if record.request_hash != request_hash:
+                    response = JSONResponse(
+                        {"detail": "Idempotency-Key was already used with a different request"},
+                        status_code=422
+                    )
+                    return await response(scope, receive, send)
+                if record.state != IdempotencyState.COMPLETED.value:
+                    return await self._busy(scope, receive, send)
+                return await self._replay(record, scope, receive, send)
+            finally:
+                event.set()
+                self._inflight.pop(key_hash, None)
+
+    @staticmethod
+    def _user_id(headers: Headers) -> Optional[str]:
+        scheme, _, token = headers.get("authorization", "").partition(" ")
+        if scheme.lower() != "bearer" or not token:
+            return None
+        try:
+            return verify_token(token).get("sub")
+        except HTTPException:
+            return None
+
+    @staticmethod
+    async def _read_body(receive) -> bytes:
+        chunks = []
+        more_body = True
+        while more_body:
+            message = await receive()
+            chunks.append(message.get("body", b""))
+            more_body = message.get("more_body", False)
+        return b"".join(chunks)
+
+    async def _execute(self, scope, body: bytes, send, key_hash: str):
+        """Run the handler on the buffered body, streaming and recording its response."""
+        replayed = False
+
+        async def replay_receive():
+            nonlocal replayed
+            if replayed:
+                return {"type": "http.disconnect"}
+            replayed = True
+            return {"type": "http.request", "body": body, "more_body": False}
+
+        status_code = 500
+        content_type = None
+        chunks = []
+
+        async def capture_send(message):
+            nonlocal status_code, content_type
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                content_type = Headers(raw=message.get("headers", [])).get("content-type")
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, replay_receive, capture_send)
+        finally:
+            with app_session(scope["app"]) as db:
+                await run_in_threadpool(
+                    _complete, db, key_hash, status_code, content_type, b"".join(chunks)
+                )
+
+    @staticmethod
+    async def _replay(record: IdempotencyRecord, scope, receive, send):
+        response = Response(
+            content=record.response_body,
+            status_code=record.status_code,
+            media_type=record.content_type,
+            headers={"Idempotent-Replayed": "true"}
+        )
+        await response(scope, receive, send)
+
+    @staticmethod
+    async def _busy(scope, receive, send):
+        response = JSONResponse(
+            {"detail": "A request with this Idempotency-Key is still being processed"},
+            status_code=409,
+            headers={"Retry-After": "1"}
+        )
+        await response(scope, receive, send)
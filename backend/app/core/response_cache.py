@@ -0,0 +1,328 @@
+"""Read-through cache of serialized GET responses.
+
+Decorate a GET handler with ``@cached_response(Model, tags=[...])``
+below its ``@router.get``. The first request runs the handler and stores
+the JSON body. Later requests with the same path, query string and role
+get the stored bytes without touching the database. Authentication
+dependencies still run on every request; checks made inside the handler
+do not, so routes whose answer depends on who is asking pass
+``per_user=True``.
+
+Entries are tagged by entity, e.g. ``doctor:12`` for one doctor and
+``doctor:list`` for any listing of doctors. Write handlers call
+``response_cache.invalidate(...)`` with the tags they affect after
+committing. Each process has its own cache, and writes made through
+another worker only become visible here after
+``RESPONSE_CACHE_TTL_SECONDS``. Plug in a shared backend to avoid that.
+
+Bodies large enough to be compressed are stored compressed as well, in
+the encoding of the request that filled the entry, so hits from similar
+clients skip the compression middleware.
+
+The in-memory backend is bounded by entry count and bytes. It evicts in
+LRU order, and a TinyLFU admission filter keeps a one-off request from
+displacing an entry that is read often.
+"""
+import functools
+import hashlib
+import inspect
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Iterable, Optional, Union
+
+from fastapi import Request
+from starlette.responses import Response
+
+from app.core.compression import choose_encoding, compress
+from app.core.config import get_settings
+from app.core.responses import dump_json
+
+Tag = Union[str, Callable[[dict, Any], Iterable[str]]]
+
+
+class CacheEntry:
+    __slots__ = ("body", "headers", "tags", "expires_at", "encoded")
+
+    def __init__(
+        self, body: bytes, headers: dict, tags: set[str], expires_at: float,
+        encoded: Optional[dict[str, bytes]] = None
+    ):
+        self.body = body
+        self.headers = headers
+        self.tags = tags
+        self.expires_at = expires_at
+        self.encoded = encoded or {}  # Content-Encoding -> compressed body
+
+    @property
+    def size(self) -> int:
+        return len(self.body) + sum(map(len, self.encoded.values())) + 200  # rough per-entry overhead
+
+    def response(self, accept_encoding: Optional[str], cache_status: str) -> Response:
+        headers = {**self.headers, "X-Cache": cache_status}
+        encoding = choose_encoding(accept_encoding, len(self.body))
+        if encoding in self.encoded:
+            headers.update({"Content-Encoding": encoding, "Vary": "Accept-Encoding"})
+            return Response(self.encoded[encoding], media_type="application/json", headers=headers)
+        return Response(self.body, media_type="application/json", headers=headers)
+
+
+class CacheBackend:
+    """Storage for cached responses. Implementations must be thread-safe."""
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        raise NotImplementedError
+
+    def set(self, key: str, entry: CacheEntry) -> None:
+        raise NotImplementedError
+
+    def invalidate(self, tags: Iterable[str]) -> int:
+        """Drop every entry carrying any of tags; returns entries dropped."""
+        raise NotImplementedError
+
+    def clear(self) -> None:
+        raise NotImplementedError
+
+    def stats(self) -> dict:
+        return {}
+
+
+class FrequencySketch:
+    """Count-min sketch of recent access frequency (the TinyLFU filter).
+
+    Counters saturate at 15 and are halved every ``sample_size``
+    increments, so old popularity fades.
+    """
+
+    DEPTH = 4
+
+    def __init__(self, capacity: int):
+        width = 1
+        while width < max(capacity, 16) * 4:
+            width <<= 1
+        self._mask = width - 1
+        self._rows = [bytearray(width) for _ in range(self.DEPTH)]
+        self._sample_size = max(capacity, 16) * 10
+        self._additions = 0
+
+    def _indexes(self, key: str):
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        for row in range(self.DEPTH):
+            yield int.from_bytes(digest[row * 4:row * 4 + 4], "little") & self._mask
+
+    def increment(self, key: str) -> None:
+        for row, index in zip(self._rows, self._indexes(key)):
+            if row[index] < 15:
+                row[index] += 1
+        self._additions += 1
+        if self._additions >= self._sample_size:
+            for row in self._rows:
+                row[:] = bytes(count >> 1 for count in row)
+            self._additions //= 2
+
+    def frequency(self, key: str) -> int:
+        return min(row[index] for row, index in zip(self._rows, self._indexes(key)))
+
+
+class MemoryBackend(CacheBackend):
+    def __init__(self, max_entries: int = 10000, max_bytes: int = 64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[str, CacheEntry] = OrderedDict()
+        self._by_tag: dict[str, set[str]] = {}
+        self._bytes = 0
+        self._sketch = FrequencySketch(max_entries)
+        self._lock = threading.Lock()
+        self.counters = {"hits": 0, "misses": 0, "evictions": 0, "rejections": 0, "invalidations": 0}
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        with self._lock:
+            self._sketch.increment(key)
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at <= time.monotonic():
+                self._remove(key)
+                entry = None
+            if entry is None:
+                self.counters["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.counters["hits"] += 1
+            return entry
+
+    def set(self, key: str, entry: CacheEntry) -> None:
+        if entry.size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            while self._entries and (
+                len(self._entries) >= self.max_entries or self._bytes + entry.size > self.max_bytes
+            ):
+                victim = next(iter(self._entries))
+                if self._sketch.frequency(key) <= self._sketch.frequency(victim):
+                    # Less popular than what it would displace: not worth caching
+                    self.counters["rejections"] += 1
+                    return
+                self._remove(victim)
+                self.counters["evictions"] += 1
+            self._entries[key] = entry
+            self._bytes += entry.size
+            for tag in entry.tags:
+                self._by_tag.setdefault(tag, set()).add(key)
+
+    def invalidate(self, tags: Iterable[str]) -> int:
+        with self._lock:
+            keys = set()
+            for tag in tags:
+                keys |= self._by_tag.pop(tag, set())
+            for key in keys:
+                self._remove(key)
+            self.counters["invalidations"] += len(keys)
+            return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._by_tag.clear()
+            self._bytes = 0
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        self._bytes -= entry.size
+        for tag in entry.tags:
+            keys = self._by_tag.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_tag[tag]
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.counters["hits"] + self.counters["misses"]
+            return {
+                **self.counters,
+                "hit_ratio": round(self.counters["hits"] / lookups, 4) if lookups else None,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+            }
+
+
+class ResponseCache:
+    def __init__(self, backend: Optional[CacheBackend], ttl_seconds: float):
+        self.backend = backend
+        self.ttl_seconds = ttl_seconds
+
+    @property
+    def enabled(self) -> bool:
+        return self.backend is not None
+
+    def invalidate(self, *tags: str) -> int:
+        if self.backend is None:
+            return 0
+        return self.backend.invalidate(tags)
+
+    def clear(self) -> None:
+        if self.backend is not None:
+            self.backend.clear()
+
+    def stats(self) -> dict:
+        if self.backend is None:
+            return {"enabled": False}
+        return {"enabled": True, "ttl_seconds": self.ttl_seconds, **self.backend.stats()}
+
+
+def build_backend() -> Optional[CacheBackend]:
+    settings = get_settings()
+    if settings.response_cache_max_entries <= 0:
+        return None
+    return MemoryBackend(settings.response_cache_max_entries, settings.response_cache_max_mb * 1024 * 1024)
+
+
+response_cache = ResponseCache(build_backend(), get_settings().response_cache_ttl_seconds)
+
+
+def _cache_key(name: str, request: Request, current_user: dict, per_user: bool) -> str:
+    query = "&".join(f"{k}={v}" for k, v in sorted(request.query_params.multi_items()))
+    who = f"{current_user.get('role')}:{current_user['user_id']}" if per_user else current_user.get("role")
+    return f"{name}|{who}|{request.url.path}?{query}"
+
+
+def _render(model: Any, result: Any, arguments: dict) -> tuple[bytes, dict]:
+    """JSON body and extra headers for a handler's result."""
+    if isinstance(result, Response):
+        body, sub_response = result.body, result
+    else:
+        body = dump_json(model, result)
+        sub_response = next((value for value in arguments.values() if isinstance(value, Response)), None)
+    headers = {
+        k: v for k, v in (sub_response.headers.items() if sub_response else [])
+        if k not in ("content-length", "content-type")
+    }
+    return body, headers
+
+
+def cached_response(
+    model: Any,
+    tags: Iterable[Tag] = (),
+    per_user: bool = False,
+    on_hit: Optional[Callable[[dict, Response], None]] = None,
+    cache: ResponseCache = response_cache,
+):
+    """Cache a GET handler's JSON response.
+
+    model is the route's response_model, used to serialize the result
+    unless the handler already returns a ``Response``. String tags are
+    formatted with the handler's arguments (``"doctor:{doctor_id}"``);
+    callables receive (arguments, result) and return tags. on_hit runs
+    with the arguments and the cached response when a request is served
+    from the cache, for side effects such as audit logging. Headers the
+    handler sets on an injected or returned ``Response`` are cached as
+    well.
+    """
+
+    def decorator(fn):
+        signature = inspect.signature(fn)
+        takes_request = "request" in signature.parameters
+        if not takes_request:
+            signature = signature.replace(parameters=[
+                *signature.parameters.values(),
+                inspect.Parameter("request", inspect.Parameter.KEYWORD_ONLY, annotation=Request),
+            ])
+        name = f"{fn.__module__}.{fn.__qualname__}"
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            request = kwargs["request"] if takes_request else kwargs.pop("request")
+            if not cache.enabled:
+                body, headers = _render(model, fn(*args, **kwargs), kwargs)
+                return Response(body, media_type="application/json", headers=headers)
+            key = _cache_key(name, request, kwargs["current_user"], per_user)
+            entry = cache.backend.get(key)
+            if entry is not None:
+                response = entry.response(request.headers.get("accept-encoding"), "HIT")
+                if on_hit is not None:
+                    on_hit(kwargs, response)
+                return response
+
+            result = fn(*args, **kwargs)
+            body, headers = _render(model, result, kwargs)
+            entry_tags = set()
+            for tag in tags:
+                entry_tags.update(tag(kwargs, result) if callable(tag) else [tag.format(**kwargs)])
+            accept_encoding = request.headers.get("accept-encoding")
+            encoding = choose_encoding(accept_encoding, len(body))
+            entry = CacheEntry(
+                body, headers, entry_tags, time.monotonic() + cache.ttl_seconds,
+                {encoding: compress(body, encoding)} if encoding else None
+            )
+            cache.backend.set(key, entry)
+            return entry.response(accept_encoding, "MISS")
+
+        wrapper.__signature__ = signature
+        return wrapper
+
+    return decorator
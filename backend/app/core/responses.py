@@ -0,0 +1,34 @@
+"""JSON responses that skip FastAPI's second serialization pass.
+
+For a ``response_model`` route FastAPI validates whatever the handler
+returns, dumps the validated model to Python objects and then has the
+response class encode those. ``json_response`` does the same work in
+one pass: ORM rows are read into the model once (from attributes) and
+pydantic-core writes the JSON bytes directly. Model instances the
+handler built itself pass through validation untouched. Handlers keep
+their ``response_model`` so the OpenAPI schema does not change.
+
+Everything else goes out through ``ORJSONResponse``, the app's default
+response class.
+"""
+from functools import lru_cache
+from typing import Any, Optional
+
+from pydantic import TypeAdapter
+from starlette.responses import Response
+
+
+@lru_cache(maxsize=None)
+def type_adapter(model: Any) -> TypeAdapter:
+    """One compiled adapter per response model, built on first use."""
+    return TypeAdapter(model)
+
+
+def dump_json(model: Any, content: Any) -> bytes:
+    adapter = type_adapter(model)
+    return adapter.dump_json(adapter.validate_python(content, from_attributes=True))
+
+
+def json_response(model: Any, content: Any, headers: Optional[dict] = None, status_code: int = 200) -> Response:
+    """Serialize content as model and wrap it in a ready-to-send response."""
+    return Response(dump_json(model, content), status_code=status_code, headers=headers, media_type="application/json")
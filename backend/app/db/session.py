@@ -1,3 +1,7 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, Session
 from app.core.config import get_settings
@@ -13,14 +17,38 @@ engine = create_engine(
     max_overflow=20
 )
 
-# Create session factory
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Create session factory. Objects stay loaded after commit so handlers can
+# serialize what they just wrote without a refresh round trip.
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
+
+# Set while a batch request runs its sub-requests, which then reuse its session
+shared_session: ContextVar[Optional[Session]] = ContextVar("shared_session", default=None)
 
 
 def get_db() -> Session:
     """Get database session."""
+    shared = shared_session.get()
+    if shared is not None:
+        # Closed by the batch request that owns it
+        yield shared
+        return
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+
+@contextmanager
+def app_session(app):
+    """Open a session outside a route the same way routes do, honouring test overrides.
+
+    For middleware and long-lived streams that must not hold a pooled
+    connection for their whole lifetime.
+    """
+    provider = app.dependency_overrides.get(get_db, get_db)
+    generator = provider()
+    try:
+        yield next(generator)
+    finally:
+        generator.close()
@@ -0,0 +1,45 @@
+from datetime import datetime
+from sqlalchemy import Column, DateTime, event, update
+from sqlalchemy.orm import Session, with_loader_criteria
+
+
+class SoftDeleteMixin:
+    """Rows are hidden by setting deleted_at instead of being deleted.
+
+    Every ORM SELECT and UPDATE issued through a Session automatically
+    excludes soft-deleted rows. Pass the ``include_deleted`` execution
+    option to see them (the purge job does).
+    """
+    deleted_at = Column(DateTime, nullable=True, index=True)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _exclude_soft_deleted(execute_state):
+    if (
+        (execute_state.is_select or execute_state.is_update)
+        and not execute_state.is_column_load
+        and not execute_state.is_relationship_load
+        and not execute_state.execution_options.get("include_deleted", False)
+    ):
+        execute_state.statement = execute_state.statement.options(
+            with_loader_criteria(
+                SoftDeleteMixin,
+                lambda cls: cls.deleted_at.is_(None),
+                include_aliases=True
+            )
+        )
+
+
+def soft_delete(db: Session, model, *criteria, **values) -> int:
+    """Mark matching live rows deleted in one UPDATE; returns the row count.
+
+    Extra keyword values are set in the same statement. Does not commit.
+    """
+    values["deleted_at"] = datetime.utcnow()
+    if hasattr(model, "version"):
+        values["version"] = model.version + 1
+    result = db.execute(
+        update(model).where(*criteria).values(**values),
+        execution_options={"synchronize_session": False}
+    )
+    return result.rowcount
@@ -1,11 +1,21 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from fastapi.openapi.utils import get_openapi
 
-from app.api.v1 import auth, users, patients, doctors, appointments, medical_records, billing
+from app.api.v1 import auth, users, patients, doctors, appointments, medical_records, billing, outbox, live, audit, analytics, waitlist, cache, batch
 from app.core.config import get_settings
-from app.db.session import engine
+from app.core.compression import CompressionMiddleware
+from app.core.idempotency import IdempotencyMiddleware, purge_expired_keys
+from app.db.session import engine, SessionLocal
 from app.db.base import Base
+from app.services.purge import run_purge
+from app.services.aging import age_balances
+from app.services.outbox import build_dispatcher, purge_old_events
+from app.services.live_feed import live_feed_broker
+from app.services.audit import audit_logger
+from app.services.analytics import build_snapshot, source_engine
+from app.services.worker import PeriodicWorker
 
 # Create tables
 Base.metadata.create_all(bind=engine)
@@ -16,7 +26,8 @@ app = FastAPI(
     title=settings.app_name,
     description="Healthcare Management System API",
     version=settings.app_version,
-    debug=settings.debug
+    debug=settings.debug,
+    default_response_class=ORJSONResponse
 )
 
 # Configure CORS
@@ -26,7 +37,10 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Missing-Ids", "X-Total-Count", "X-Total-Count-Mode"],
 )
+app.add_middleware(IdempotencyMiddleware)
+app.add_middleware(CompressionMiddleware)
 
 # Include routers
 app.include_router(auth.router)
@@ -36,6 +50,109 @@ app.include_router(doctors.router)
 app.include_router(appointments.router)
 app.include_router(medical_records.router)
 app.include_router(billing.router)
+app.include_router(outbox.router)
+app.include_router(live.router)
+app.include_router(audit.router)
+app.include_router(analytics.router)
+app.include_router(waitlist.router)
+app.include_router(cache.router)
+app.include_router(batch.router)
+
+
+def _purge_soft_deleted():
+    db = SessionLocal()
+    try:
+        run_purge(db)
+    finally:
+        db.close()
+
+
+def _purge_idempotency_keys():
+    db = SessionLocal()
+    try:
+        purge_expired_keys(db)
+    finally:
+        db.close()
+
+
+def _age_receivables():
+    db = SessionLocal()
+    try:
+        age_balances(db)
+    finally:
+        db.close()
+
+
+outbox_dispatcher = build_dispatcher()
+
+
+def _dispatch_outbox():
+    db = SessionLocal()
+    try:
+        outbox_dispatcher.dispatch(db)
+    finally:
+        db.close()
+
+
+def _purge_old_events():
+    db = SessionLocal()
+    try:
+        purge_old_events(db)
+    finally:
+        db.close()
+
+
+def _poll_live_feed():
+    db = SessionLocal()
+    try:
+        live_feed_broker.poll(db)
+    finally:
+        db.close()
+
+
+def _build_analytics_snapshot():
+    build_snapshot(source_engine())
+
+
+purge_worker = PeriodicWorker("soft-delete-purge", settings.purge_interval_minutes * 60, _purge_soft_deleted)
+idempotency_worker = PeriodicWorker("idempotency-cleanup", 3600, _purge_idempotency_keys)
+aging_worker = PeriodicWorker("ar-aging", settings.aging_interval_hours * 3600, _age_receivables)
+outbox_worker = PeriodicWorker("outbox-dispatcher", settings.outbox_poll_seconds, _dispatch_outbox)
+outbox_cleanup_worker = PeriodicWorker("outbox-cleanup", 3600, _purge_old_events)
+live_feed_worker = PeriodicWorker("live-feed", settings.live_feed_poll_seconds, _poll_live_feed)
+analytics_worker = PeriodicWorker(
+    "analytics-snapshot", settings.analytics_snapshot_interval_hours * 3600, _build_analytics_snapshot
+)
+
+
+@app.on_event("startup")
+def start_background_workers():
+    """Start in-process background workers that are enabled in settings."""
+    if settings.purge_interval_minutes > 0:
+        purge_worker.start()
+    if settings.aging_interval_hours > 0:
+        aging_worker.start()
+    if settings.analytics_snapshot_interval_hours > 0:
+        analytics_worker.start()
+    if outbox_dispatcher is not None:
+        outbox_worker.start()
+    idempotency_worker.start()
+    outbox_cleanup_worker.start()
+    live_feed_worker.start()
+    audit_logger.start(app)
+
+
+@app.on_event("shutdown")
+def stop_background_workers():
+    """Stop background workers."""
+    purge_worker.stop()
+    aging_worker.stop()
+    analytics_worker.stop()
+    outbox_worker.stop()
+    idempotency_worker.stop()
+    outbox_cleanup_worker.stop()
+    live_feed_worker.stop()
+    audit_logger.stop()
 
 
 @app.get("/", tags=["Health"])
@@ -1,9 +1,15 @@
 from app.models.user import User, RoleEnum
 from app.models.patient import Patient
 from app.models.doctor import Doctor
-from app.models.appointment import Appointment
+from app.models.appointment import Appointment, AppointmentSlot
 from app.models.medical_record import MedicalRecord, Prescription
 from app.models.billing import Bill, Payment
+from app.models.idempotency import IdempotencyRecord
+from app.models.bill_number_sequence import BillNumberSequence
+from app.models.aging import ArAgingBalance
+from app.models.outbox import OutboxEvent
+from app.models.audit import PhiAccessLog
+from app.models.waitlist import WaitlistEntry, WaitlistWindow
 
 __all__ = [
     "User",
@@ -11,8 +17,16 @@ __all__ = [
     "Patient",
     "Doctor",
     "Appointment",
+    "AppointmentSlot",
     "MedicalRecord",
     "Prescription",
     "Bill",
     "Payment",
+    "IdempotencyRecord",
+    "BillNumberSequence",
+    "ArAgingBalance",
+    "OutboxEvent",
+    "PhiAccessLog",
+    "WaitlistEntry",
+    "WaitlistWindow",
 ]
@@ -0,0 +1,18 @@
+from sqlalchemy import Column, Integer, DateTime, ForeignKey, Numeric
+from datetime import datetime
+from app.db.base import Base
+
+
+class ArAgingBalance(Base):
+    """Accounts-receivable balance per patient, split by days past due."""
+    __tablename__ = "ar_aging_balances"
+
+    patient_id = Column(Integer, ForeignKey("patients.id"), primary_key=True)
+    days_0_30 = Column(Numeric(14, 2), nullable=False, default=0)
+    days_31_60 = Column(Numeric(14, 2), nullable=False, default=0)
+    days_61_90 = Column(Numeric(14, 2), nullable=False, default=0)
+    days_over_90 = Column(Numeric(14, 2), nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<ArAgingBalance(patient_id={self.patient_id})>"
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Enum as SQLEnum
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Index, UniqueConstraint, Enum as SQLEnum
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from enum import Enum
@@ -14,6 +14,7 @@ class AppointmentStatus(str, Enum):
 
 class Appointment(Base):
     __tablename__ = "appointments"
+    __table_args__ = (Index("idx_appointments_doctor_id_appointment_date", "doctor_id", "appointment_date"),)
 
     id = Column(Integer, primary_key=True, index=True)
     patient_id = Column(Integer, ForeignKey("patients.id"), nullable=False)
@@ -24,10 +25,34 @@ class Appointment(Base):
     status = Column(SQLEnum(AppointmentStatus), default=AppointmentStatus.SCHEDULED, nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    version = Column(Integer, nullable=False, server_default="1")
+
+    __mapper_args__ = {"version_id_col": version}
 
     # Relationships
     patient = relationship("Patient", back_populates="appointments")
     doctor = relationship("User", back_populates="appointments", foreign_keys=[doctor_id])
+    slot = relationship("AppointmentSlot", uselist=False, back_populates="appointment", cascade="all, delete-orphan")
 
     def __repr__(self):
         return f"<Appointment(id={self.id}, patient_id={self.patient_id}, doctor_id={self.doctor_id})>"
+
+
+class AppointmentSlot(Base):
+    """A doctor's booked slot; the unique key is what prevents double booking.
+
+    Active appointments own exactly one row; cancelling releases it.
+    """
+    __tablename__ = "appointment_slots"
+    __table_args__ = (UniqueConstraint("doctor_id", "slot_start", name="uq_appointment_slots_doctor_slot"),)
+
+    id = Column(Integer, primary_key=True)
+    doctor_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    slot_start = Column(DateTime, nullable=False)
+    appointment_id = Column(Integer, ForeignKey("appointments.id", ondelete="CASCADE"), unique=True, nullable=False)
+
+    appointment = relationship("Appointment", back_populates="slot")
+
+    def __repr__(self):
+        return f"<AppointmentSlot(doctor_id={self.doctor_id}, slot_start={self.slot_start})>"
+
@@ -0,0 +1,70 @@
+from sqlalchemy import Column, BigInteger, Integer, SmallInteger, String, DateTime, Index, event, text
+from datetime import date, timedelta
+from enum import IntEnum
+from app.db.base import Base
+
+PARTITION_MONTHS_AHEAD = 3
+
+
+class AuditAction(IntEnum):
+    PATIENT_READ = 1
+    MEDICAL_RECORD_READ = 2
+    MEDICAL_RECORD_LIST = 3
+
+
+class PhiAccessLog(Base):
+    """One row per read of protected health information.
+
+    Kept narrow and without foreign keys so it stays cheap to write and
+    outlives purged patients and users. On MySQL the table is partitioned
+    by month of ``accessed_at``, and because MySQL requires the
+    partitioning column in every unique key its primary key there is
+    (id, accessed_at). The mapped key is id alone since SQLite cannot
+    autoincrement a composite key; ``create_all`` reshapes the MySQL
+    table after creating it (see below) so it matches migration 009.
+    """
+    __tablename__ = "phi_access_log"
+    __table_args__ = (
+        Index("idx_phi_access_log_patient_accessed_at", "patient_id", "accessed_at"),
+        Index("idx_phi_access_log_user_accessed_at", "user_id", "accessed_at"),
+    )
+
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True)
+    accessed_at = Column(DateTime, nullable=False)
+    user_id = Column(Integer, nullable=False)
+    role = Column(String(20), nullable=True)
+    action = Column(SmallInteger, nullable=False)  # AuditAction
+    patient_id = Column(Integer, nullable=True)
+    resource_id = Column(Integer, nullable=True)
+    client_ip = Column(String(45), nullable=True)
+
+    def __repr__(self):
+        return f"<PhiAccessLog(id={self.id}, user_id={self.user_id}, action={self.action})>"
+
+
+def next_month(month: date) -> date:
+    return (month.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def month_partitions(first: date, months_ahead: int) -> list[str]:
+    """RANGE partition definitions for the month of first and months_ahead more."""
+    month = first.replace(day=1)
+    partitions = []
+    for _ in range(months_ahead + 1):
+        following = next_month(month)
+        partitions.append(f"PARTITION p{month:%Y%m} VALUES LESS THAN (TO_DAYS('{following:%Y-%m-%d}'))")
+        month = following
+    return partitions
+
+
+@event.listens_for(PhiAccessLog.__table__, "after_create")
+def _partition_on_mysql(table, connection, **kw):
+    """Give a table made by create_all the same key and partitions as migration 009."""
+    if connection.dialect.name != "mysql":
+        return
+    connection.execute(text("ALTER TABLE phi_access_log DROP PRIMARY KEY, ADD PRIMARY KEY (id, accessed_at)"))
+    partitions = month_partitions(date.today(), PARTITION_MONTHS_AHEAD)
+    connection.execute(text(
+        "ALTER TABLE phi_access_log PARTITION BY RANGE (TO_DAYS(accessed_at)) ("
+        + ", ".join(partitions + ["PARTITION pmax VALUES LESS THAN MAXVALUE"]) + ")"
+    ))
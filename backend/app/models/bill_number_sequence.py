@@ -0,0 +1,16 @@
+from sqlalchemy import Column, Integer, String, BigInteger, UniqueConstraint
+from app.db.base import Base
+
+
+class BillNumberSequence(Base):
+    __tablename__ = "bill_number_sequences"
+    __table_args__ = (UniqueConstraint("facility", "year", name="uq_bill_number_sequences_facility_year"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    facility = Column(String(20), nullable=False)
+    year = Column(Integer, nullable=False)
+    # First number not yet handed to any worker
+    next_value = Column(BigInteger, nullable=False, default=1)
+
+    def __repr__(self):
+        return f"<BillNumberSequence(facility={self.facility}, year={self.year}, next_value={self.next_value})>"
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Float, Text, Enum as SQLEnum
+from sqlalchemy import Column, Integer, SmallInteger, String, DateTime, ForeignKey, Numeric, Text, Index, Enum as SQLEnum
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from enum import Enum
@@ -10,6 +10,8 @@ class BillStatus(str, Enum):
     PAID = "paid"
     OVERDUE = "overdue"
     CANCELLED = "cancelled"
+    PARTIALLY_PAID = "partially_paid"
+    OVERPAID = "overpaid"
 
 
 class PaymentStatus(str, Enum):
@@ -26,15 +28,29 @@ class Bill(Base):
     patient_id = Column(Integer, ForeignKey("patients.id"), nullable=False)
     appointment_id = Column(Integer, ForeignKey("appointments.id"), nullable=True)
     bill_number = Column(String(50), unique=True, nullable=False)
-    amount = Column(Float, nullable=False)
-    tax = Column(Float, default=0.0)
-    total_amount = Column(Float, nullable=False)
+    amount = Column(Numeric(12, 2), nullable=False)
+    tax = Column(Numeric(12, 2), default=0)
+    total_amount = Column(Numeric(12, 2), nullable=False)
     description = Column(Text, nullable=True)
     status = Column(SQLEnum(BillStatus), default=BillStatus.PENDING, nullable=False)
     issue_date = Column(DateTime, default=datetime.utcnow)
     due_date = Column(DateTime, nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    version = Column(Integer, nullable=False, server_default="1")
+    # Running totals maintained by app.services.ledger; never summed from payments
+    amount_paid = Column(Numeric(12, 2), nullable=False, default=0)
+    balance_due = Column(
+        Numeric(12, 2),
+        nullable=False,
+        index=True,
+        default=lambda context: context.get_current_parameters()["total_amount"]
+    )
+    # Receivables aging bucket the balance is counted in; see app.services.aging
+    aging_bucket = Column(SmallInteger, nullable=False, default=0)
+
+    __table_args__ = (Index("idx_bills_aging_bucket_due_date", "aging_bucket", "due_date"),)
+    __mapper_args__ = {"version_id_col": version}
 
     # Relationships
     patient = relationship("Patient", back_populates="bills")
@@ -49,7 +65,7 @@ class Payment(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     bill_id = Column(Integer, ForeignKey("bills.id"), nullable=False)
-    amount = Column(Float, nullable=False)
+    amount = Column(Numeric(12, 2), nullable=False)
     payment_method = Column(String(50), nullable=False)  # credit_card, debit_card, cash, etc.
     status = Column(SQLEnum(PaymentStatus), default=PaymentStatus.PENDING, nullable=False)
     transaction_id = Column(String(100), nullable=True)
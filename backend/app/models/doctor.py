@@ -2,9 +2,10 @@ from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Text
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.db.base import Base
+from app.db.soft_delete import SoftDeleteMixin
 
 
-class Doctor(Base):
+class Doctor(SoftDeleteMixin, Base):
     __tablename__ = "doctors"
 
     id = Column(Integer, primary_key=True, index=True)
@@ -0,0 +1,27 @@
+from sqlalchemy import Column, Integer, String, DateTime, Text
+from datetime import datetime
+from enum import Enum
+from app.db.base import Base
+
+
+class IdempotencyState(str, Enum):
+    IN_PROGRESS = "in_progress"
+    COMPLETED = "completed"
+
+
+class IdempotencyRecord(Base):
+    __tablename__ = "idempotency_keys"
+
+    id = Column(Integer, primary_key=True, index=True)
+    # sha256 of user, path and client key; the unique index is the lookup path
+    key_hash = Column(String(64), unique=True, nullable=False)
+    request_hash = Column(String(64), nullable=False)
+    state = Column(String(20), default=IdempotencyState.IN_PROGRESS.value, nullable=False)
+    status_code = Column(Integer, nullable=True)
+    content_type = Column(String(100), nullable=True)
+    response_body = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)  # when the key was (last) claimed
+    expires_at = Column(DateTime, nullable=False, index=True)
+
+    def __repr__(self):
+        return f"<IdempotencyRecord(id={self.id}, state={self.state}, status_code={self.status_code})>"
@@ -0,0 +1,33 @@
+from sqlalchemy import Column, BigInteger, Integer, String, DateTime, Text, Index
+from datetime import datetime
+from enum import Enum
+from app.db.base import Base
+
+
+class OutboxStatus(str, Enum):
+    PENDING = "pending"
+    DELIVERED = "delivered"
+    DEAD = "dead"
+
+
+class OutboxEvent(Base):
+    """Domain event written in the same transaction as the change it describes."""
+    __tablename__ = "outbox_events"
+    __table_args__ = (Index("idx_outbox_events_status_available_at", "status", "available_at"),)
+
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True)
+    event_type = Column(String(50), nullable=False)
+    aggregate_type = Column(String(50), nullable=False)
+    aggregate_id = Column(Integer, nullable=False)
+    payload = Column(Text, nullable=False)  # JSON
+    status = Column(String(20), default=OutboxStatus.PENDING.value, nullable=False)
+    attempts = Column(Integer, default=0, nullable=False)
+    last_error = Column(Text, nullable=True)
+    # Set by the dispatcher that claimed the row; stale claims expire with available_at
+    claim_token = Column(String(32), nullable=True, index=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    available_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    delivered_at = Column(DateTime, nullable=True)
+
+    def __repr__(self):
+        return f"<OutboxEvent(id={self.id}, event_type={self.event_type}, status={self.status})>"
@@ -2,9 +2,10 @@ from sqlalchemy import Column, Integer, String, Date, DateTime, Text
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.db.base import Base
+from app.db.soft_delete import SoftDeleteMixin
 
 
-class Patient(Base):
+class Patient(SoftDeleteMixin, Base):
     __tablename__ = "patients"
 
     id = Column(Integer, primary_key=True, index=True)
@@ -24,6 +25,9 @@ class Patient(Base):
     emergency_contact_phone = Column(String(20), nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    version = Column(Integer, nullable=False, server_default="1")
+
+    __mapper_args__ = {"version_id_col": version}
 
     # Relationships
     appointments = relationship("Appointment", back_populates="patient")
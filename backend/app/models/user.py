@@ -3,6 +3,7 @@ from sqlalchemy.orm import relationship
 from datetime import datetime
 from enum import Enum
 from app.db.base import Base
+from app.db.soft_delete import SoftDeleteMixin
 
 
 class RoleEnum(str, Enum):
@@ -12,7 +13,7 @@ class RoleEnum(str, Enum):
     RECEPTIONIST = "receptionist"
 
 
-class User(Base):
+class User(SoftDeleteMixin, Base):
     __tablename__ = "users"
 
     id = Column(Integer, primary_key=True, index=True)
@@ -0,0 +1,55 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index, Enum as SQLEnum
+from sqlalchemy.orm import relationship
+from datetime import datetime
+from enum import Enum
+from app.db.base import Base
+
+
+class WaitlistStatus(str, Enum):
+    WAITING = "waiting"
+    OFFERED = "offered"
+    BOOKED = "booked"
+    CANCELLED = "cancelled"
+
+
+class WaitlistEntry(Base):
+    """A patient waiting for a slot with a given doctor or any doctor of a specialization."""
+    __tablename__ = "waitlist_entries"
+    __table_args__ = (Index("idx_waitlist_entries_updated_at", "updated_at"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    patient_id = Column(Integer, ForeignKey("patients.id"), nullable=False)
+    doctor_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+    specialization = Column(String(255), nullable=True)
+    reason = Column(String(255), nullable=False)
+    priority = Column(Integer, nullable=False, default=0)  # higher is offered first
+    status = Column(SQLEnum(WaitlistStatus), default=WaitlistStatus.WAITING, nullable=False)
+    offered_doctor_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+    offered_slot_start = Column(DateTime, nullable=True)
+    offered_at = Column(DateTime, nullable=True)
+    appointment_id = Column(Integer, ForeignKey("appointments.id"), nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    windows = relationship(
+        "WaitlistWindow", back_populates="entry", cascade="all, delete-orphan", lazy="selectin",
+        order_by="WaitlistWindow.window_start"
+    )
+
+    def __repr__(self):
+        return f"<WaitlistEntry(id={self.id}, patient_id={self.patient_id}, status={self.status})>"
+
+
+class WaitlistWindow(Base):
+    """A time range in which the patient can attend."""
+    __tablename__ = "waitlist_windows"
+
+    id = Column(Integer, primary_key=True)
+    entry_id = Column(Integer, ForeignKey("waitlist_entries.id", ondelete="CASCADE"), nullable=False, index=True)
+    window_start = Column(DateTime, nullable=False)
+    window_end = Column(DateTime, nullable=False)
+
+    entry = relationship("WaitlistEntry", back_populates="windows")
+
+    def __repr__(self):
+        return f"<WaitlistWindow(entry_id={self.entry_id}, {self.window_start} - {self.window_end})>"
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from datetime import datetime
+from datetime import date, datetime
 from typing import Optional
 from enum import Enum
 
@@ -35,6 +35,29 @@ class AppointmentResponse(AppointmentBase):
     status: AppointmentStatus
     created_at: datetime
     updated_at: datetime
+    version: int
 
     class Config:
         from_attributes = True
+
+
+class CalendarEntry(BaseModel):
+    id: int
+    start: str  # HH:MM
+    status: AppointmentStatus
+    reason: str
+    patient_id: int
+    patient_name: Optional[str]  # None if the patient row is gone
+
+
+class CalendarDay(BaseModel):
+    date: date
+    appointments: list[CalendarEntry]
+
+
+class CalendarResponse(BaseModel):
+    doctor_id: int
+    start: date
+    end: date
+    days: list[CalendarDay]
+
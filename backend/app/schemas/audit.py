@@ -0,0 +1,27 @@
+from pydantic import BaseModel, field_validator
+from datetime import datetime
+from typing import Optional
+
+from app.models.audit import AuditAction
+
+
+class PhiAccessResponse(BaseModel):
+    id: int
+    accessed_at: datetime
+    user_id: int
+    role: Optional[str] = None
+    action: str
+    patient_id: Optional[int] = None
+    resource_id: Optional[int] = None
+    client_ip: Optional[str] = None
+    
+    @field_validator('action', mode='before')
+    @classmethod
+    def action_name(cls, v):
+        # Stored as a small integer code
+        if isinstance(v, int):
+            v = AuditAction(v).name.lower()
+        return v
+
+    class Config:
+        from_attributes = True
@@ -0,0 +1,43 @@
+import posixpath
+from pydantic import BaseModel, Field, field_validator
+from typing import Any, Optional
+from enum import Enum
+from urllib.parse import unquote
+
+
+class BatchMethod(str, Enum):
+    GET = "GET"
+    POST = "POST"
+    PUT = "PUT"
+    PATCH = "PATCH"
+    DELETE = "DELETE"
+
+
+class BatchRequestItem(BaseModel):
+    method: BatchMethod = BatchMethod.GET
+    path: str = Field(..., description="Path and query string, e.g. /api/v1/patients?limit=5")
+    body: Optional[Any] = None
+    headers: dict[str, str] = Field(default_factory=dict, description="Extra headers such as If-Match")
+
+    @field_validator('path')
+    @classmethod
+    def check_path(cls, v):
+        # Checked as it will be routed: percent-decoded, with dot segments resolved
+        path = posixpath.normpath(unquote(v.partition("?")[0]))
+        if not path.startswith("/api/v1/") or path.startswith(("/api/v1/batch", "/api/v1/live")):
+            raise ValueError("path must be an /api/v1/ endpoint other than batch or the live feed")
+        return v
+
+
+class BatchRequest(BaseModel):
+    requests: list[BatchRequestItem] = Field(..., min_length=1)
+
+
+class BatchResponseItem(BaseModel):
+    status: int
+    headers: dict[str, str]
+    body: Optional[Any] = None
+
+
+class BatchResponse(BaseModel):
+    responses: list[BatchResponseItem]
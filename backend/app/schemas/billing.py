@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from datetime import datetime
 from typing import Optional, List
 from enum import Enum
@@ -9,6 +9,8 @@ class BillStatus(str, Enum):
     PAID = "paid"
     OVERDUE = "overdue"
     CANCELLED = "cancelled"
+    PARTIALLY_PAID = "partially_paid"
+    OVERPAID = "overpaid"
 
 
 class PaymentStatus(str, Enum):
@@ -19,7 +21,7 @@ class PaymentStatus(str, Enum):
 
 
 class PaymentBase(BaseModel):
-    amount: float
+    amount: float = Field(..., gt=0)
     payment_method: str
     notes: Optional[str] = None
 
@@ -65,11 +67,33 @@ class BillResponse(BillBase):
     id: int
     bill_number: str
     total_amount: float
+    amount_paid: float
+    balance_due: float
     status: BillStatus
     issue_date: datetime
     created_at: datetime
     updated_at: datetime
+    version: int
     payments: List[PaymentResponse] = []
 
     class Config:
         from_attributes = True
+
+
+class AgingBuckets(BaseModel):
+    days_0_30: float
+    days_31_60: float
+    days_61_90: float
+    days_over_90: float
+    total: float
+
+
+class AgingPatientRow(AgingBuckets):
+    patient_id: int
+    first_name: Optional[str] = None
+    last_name: Optional[str] = None
+
+
+class AgingReport(BaseModel):
+    totals: AgingBuckets
+    patients: List[AgingPatientRow]
@@ -51,3 +51,13 @@ class DoctorResponse(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+class DoctorSummary(BaseModel):
+    """A doctor embedded in another resource; id is the doctor's user id, as in doctor_id."""
+    id: int
+    full_name: str
+    specialization: Optional[str] = None
+
+    class Config:
+        from_attributes = True
@@ -47,6 +47,7 @@ class MedicalRecordResponse(MedicalRecordBase):
     id: int
     created_at: datetime
     updated_at: datetime
+    version: int
     prescriptions: List[PrescriptionResponse] = []
 
     class Config:
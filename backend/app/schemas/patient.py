@@ -1,6 +1,11 @@
 from pydantic import BaseModel, EmailStr
 from datetime import datetime, date
-from typing import Optional
+from typing import List, Optional
+
+from app.schemas.appointment import AppointmentResponse
+from app.schemas.billing import BillResponse
+from app.schemas.medical_record import MedicalRecordResponse
+from app.schemas.user import StoredEmail
 
 
 class PatientBase(BaseModel):
@@ -42,9 +47,48 @@ class PatientUpdate(BaseModel):
 
 
 class PatientResponse(PatientBase):
+    email: Optional[StoredEmail] = None
     id: int
     created_at: datetime
     updated_at: datetime
+    version: int
+
+    class Config:
+        from_attributes = True
+
+
+class PatientSummary(BaseModel):
+    """A patient embedded in another resource."""
+    id: int
+    first_name: str
+    last_name: str
+    date_of_birth: date
 
     class Config:
         from_attributes = True
+
+
+class ChartSection(BaseModel):
+    skip: int
+    limit: int
+    has_more: bool
+
+
+class ChartAppointments(ChartSection):
+    items: List[AppointmentResponse]
+
+
+class ChartMedicalRecords(ChartSection):
+    items: List[MedicalRecordResponse]
+
+
+class ChartBills(ChartSection):
+    items: List[BillResponse]
+
+
+class PatientChart(BaseModel):
+    """A patient with one page of each part of their history, newest first."""
+    patient: PatientResponse
+    appointments: ChartAppointments
+    medical_records: ChartMedicalRecords
+    bills: ChartBills
@@ -1,8 +1,12 @@
-from pydantic import BaseModel, EmailStr, field_validator
+from pydantic import BaseModel, EmailStr, WithJsonSchema, field_validator
 from datetime import datetime
-from typing import Optional
+from typing import Annotated, Optional
 from enum import Enum
 
+# Addresses read back from the database were validated on the way in;
+# checking them again on every response is most of the cost of a list page
+StoredEmail = Annotated[str, WithJsonSchema({"type": "string", "format": "email"})]
+
 
 class RoleEnum(str, Enum):
     ADMIN = "admin"
@@ -38,6 +42,7 @@ class UserUpdate(BaseModel):
 
 
 class UserResponse(UserBase):
+    email: StoredEmail
     id: int
     is_active: bool
     role: RoleEnum
@@ -0,0 +1,60 @@
+from pydantic import BaseModel, Field, model_validator
+from datetime import datetime
+from typing import Optional
+from enum import Enum
+
+
+class WaitlistStatus(str, Enum):
+    WAITING = "waiting"
+    OFFERED = "offered"
+    BOOKED = "booked"
+    CANCELLED = "cancelled"
+
+
+class WaitlistWindow(BaseModel):
+    window_start: datetime
+    window_end: datetime
+
+    @model_validator(mode='after')
+    def check_order(self):
+        if self.window_end <= self.window_start:
+            raise ValueError("window_end must be after window_start")
+        return self
+
+    class Config:
+        from_attributes = True
+
+
+class WaitlistEntryCreate(BaseModel):
+    patient_id: int
+    doctor_id: Optional[int] = None
+    specialization: Optional[str] = None
+    reason: str
+    priority: int = Field(0, ge=0, le=100)
+    windows: list[WaitlistWindow] = Field(..., min_length=1, max_length=20)
+
+    @model_validator(mode='after')
+    def check_target(self):
+        # Exactly one of doctor_id and specialization
+        if (self.doctor_id is None) == (self.specialization is None):
+            raise ValueError("Give either doctor_id or specialization")
+        return self
+
+
+class WaitlistEntryResponse(BaseModel):
+    id: int
+    patient_id: int
+    doctor_id: Optional[int] = None
+    specialization: Optional[str] = None
+    reason: str
+    priority: int
+    status: WaitlistStatus
+    windows: list[WaitlistWindow]
+    offered_doctor_id: Optional[int] = None
+    offered_slot_start: Optional[datetime] = None
+    offered_at: Optional[datetime] = None
+    appointment_id: Optional[int] = None
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
@@ -0,0 +1,192 @@
+"""Incrementally maintained accounts-receivable aging.
+
+Every bill records which aging bucket its balance currently sits in
+(``bills.aging_bucket``: 0 = 0-30 days past due, 1 = 31-60, 2 = 61-90,
+3 = over 90), and ``ar_aging_balances`` holds one row per patient with
+the sum of balances in each bucket. Bill creation and payments adjust
+that row in the same transaction; the nightly ``age_balances`` job moves
+bills that crossed a boundary with a handful of set-based UPDATEs;
+``rebuild`` recomputes everything from bills to repair or verify it.
+"""
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from typing import Optional
+
+from sqlalchemy import case, delete, func, insert, or_, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.models.aging import ArAgingBalance
+from app.models.billing import Bill, BillStatus
+
+BUCKET_COLUMNS = ["days_0_30", "days_31_60", "days_61_90", "days_over_90"]
+# A bill enters bucket k once it is more than BOUNDARIES[k - 1] days past due
+BOUNDARIES = [30, 60, 90]
+
+
+def bucket_for(due_date: datetime, as_of: Optional[date] = None) -> int:
+    """Aging bucket for a bill due on due_date."""
+    as_of = as_of or datetime.utcnow().date()
+    days_past_due = (as_of - due_date.date()).days
+    return sum(1 for boundary in BOUNDARIES if days_past_due > boundary)
+
+
+def _cutoff(as_of: date, boundary: int) -> datetime:
+    """Bills due before this instant are more than boundary days past due."""
+    return datetime.combine(as_of - timedelta(days=boundary), datetime.min.time())
+
+
+def _column(bucket: int):
+    return getattr(ArAgingBalance, BUCKET_COLUMNS[bucket])
+
+
+def add_to_bucket(db: Session, patient_id: int, bucket: int, amount: Decimal) -> None:
+    """Add amount to one of a patient's buckets, creating the row on first use."""
+    column = _column(bucket)
+    stmt = update(ArAgingBalance).where(ArAgingBalance.patient_id == patient_id).values({column: column + amount})
+    if db.execute(stmt).rowcount:
+        return
+    try:
+        with db.begin_nested():
+            db.execute(insert(ArAgingBalance).values({"patient_id": patient_id, column.key: amount}))
+    except IntegrityError:
+        db.execute(stmt)
+
+
+def subtract_payment(db: Session, bill_id: int, amount: Decimal) -> None:
+    """Take a payment off whichever bucket the bill currently sits in.
+
+    One UPDATE keyed through the bill, so it needs no extra read. Call
+    after the bill itself has been updated, which holds its row lock.
+    """
+    bill_bucket = select(Bill.aging_bucket).where(Bill.id == bill_id).scalar_subquery()
+    bill_patient = select(Bill.patient_id).where(Bill.id == bill_id).scalar_subquery()
+    db.execute(
+        update(ArAgingBalance)
+        .where(ArAgingBalance.patient_id == bill_patient)
+        .values({
+            _column(bucket): _column(bucket) - case((bill_bucket == bucket, amount), else_=0)
+            for bucket in range(len(BUCKET_COLUMNS))
+        })
+    )
+
+
+def _expected_balances():
+    """SELECT of per-patient bucket sums computed from bills."""
+    return (
+        select(
+            Bill.patient_id,
+            *[
+                func.coalesce(func.sum(case((Bill.aging_bucket == bucket, Bill.balance_due), else_=0)), 0)
+                .label(BUCKET_COLUMNS[bucket])
+                for bucket in range(len(BUCKET_COLUMNS))
+            ]
+        )
+        .where(Bill.status != BillStatus.CANCELLED)
+        .group_by(Bill.patient_id)
+    )
+
+
+def refresh_patient(db: Session, patient_id: int) -> None:
+    """Recompute one patient's row from their bills (used after bill edits)."""
+    row = db.execute(_expected_balances().where(Bill.patient_id == patient_id)).first()
+    values = {column: getattr(row, column) if row else 0 for column in BUCKET_COLUMNS}
+    if not db.execute(
+        update(ArAgingBalance).where(ArAgingBalance.patient_id == patient_id).values(**values)
+    ).rowcount:
+        db.execute(insert(ArAgingBalance).values(patient_id=patient_id, **values))
+
+
+def age_balances(db: Session, as_of: Optional[date] = None) -> dict:
+    """Move balances of bills that crossed an aging boundary; commits per step.
+
+    Bills being moved are first tagged with a negative bucket so the
+    per-patient totals are computed from exactly the rows this step locked.
+    """
+    as_of = as_of or datetime.utcnow().date()
+    moved = {}
+    for bucket in range(1, len(BUCKET_COLUMNS)):
+        marker = -bucket
+        tagged = db.execute(
+            update(Bill)
+            .where(Bill.aging_bucket == bucket - 1, Bill.due_date < _cutoff(as_of, BOUNDARIES[bucket - 1]))
+            .values(aging_bucket=marker),
+            execution_options={"synchronize_session": False}
+        ).rowcount
+        if tagged:
+            moving = (
+                select(func.coalesce(func.sum(Bill.balance_due), 0))
+                .where(
+                    Bill.patient_id == ArAgingBalance.patient_id,
+                    Bill.aging_bucket == marker,
+                    Bill.status != BillStatus.CANCELLED
+                )
+                .scalar_subquery()
+            )
+            source, target = _column(bucket - 1), _column(bucket)
+            db.execute(
+                update(ArAgingBalance)
+                .where(ArAgingBalance.patient_id.in_(select(Bill.patient_id).where(Bill.aging_bucket == marker)))
+                .values({source: source - moving, target: target + moving})
+            )
+            db.execute(
+                update(Bill).where(Bill.aging_bucket == marker).values(aging_bucket=bucket),
+                execution_options={"synchronize_session": False}
+            )
+        db.commit()
+        moved[BUCKET_COLUMNS[bucket]] = tagged
+    return moved
+
+
+def rebuild(db: Session, as_of: Optional[date] = None) -> int:
+    """Reassign every bill's bucket and rebuild all patient rows from bills."""
+    as_of = as_of or datetime.utcnow().date()
+    db.execute(
+        update(Bill).values(aging_bucket=case(
+            *[
+                (Bill.due_date < _cutoff(as_of, BOUNDARIES[bucket - 1]), bucket)
+                for bucket in range(len(BUCKET_COLUMNS) - 1, 0, -1)
+            ],
+            else_=0
+        )),
+        execution_options={"synchronize_session": False}
+    )
+    db.execute(delete(ArAgingBalance))
+    expected = _expected_balances()
+    db.execute(insert(ArAgingBalance).from_select(["patient_id", *BUCKET_COLUMNS], expected))
+    db.commit()
+    return db.query(func.count(ArAgingBalance.patient_id)).scalar()
+
+
+def check(db: Session, as_of: Optional[date] = None) -> dict:
+    """Compare stored balances and bill buckets with a full recomputation."""
+    as_of = as_of or datetime.utcnow().date()
+    columns = [_column(bucket) for bucket in range(len(BUCKET_COLUMNS))]
+    stored = {
+        row.patient_id: tuple(row[1:])
+        for row in db.execute(select(ArAgingBalance.patient_id, *columns))
+    }
+    mismatched_patients = []
+    for row in db.execute(_expected_balances()):
+        expected = tuple(Decimal(getattr(row, column)) for column in BUCKET_COLUMNS)
+        actual = stored.pop(row.patient_id, (Decimal(0),) * len(BUCKET_COLUMNS))
+        if expected != tuple(Decimal(value) for value in actual):
+            mismatched_patients.append(row.patient_id)
+    mismatched_patients.extend(
+        patient_id for patient_id, values in stored.items() if any(values)
+    )
+
+    # A bill in bucket k is misplaced if it is already due before bucket
+    # k + 1's cutoff, or not yet due before bucket k's own cutoff
+    misbucketed_bills = 0
+    for bucket in range(len(BUCKET_COLUMNS)):
+        out_of_range = []
+        if bucket < len(BOUNDARIES):
+            out_of_range.append(Bill.due_date < _cutoff(as_of, BOUNDARIES[bucket]))
+        if bucket > 0:
+            out_of_range.append(Bill.due_date >= _cutoff(as_of, BOUNDARIES[bucket - 1]))
+        misbucketed_bills += db.execute(
+            select(func.count(Bill.id)).where(Bill.aging_bucket == bucket, or_(*out_of_range))
+        ).scalar()
+
+    return {"mismatched_patients": mismatched_patients, "misbucketed_bills": misbucketed_bills}
@@ -0,0 +1,380 @@
+"""Columnar snapshot of billing and appointment data for reporting.
+
+``build_snapshot`` copies ``doctors``, ``appointments``, ``bills`` and
+``payments`` into one ``.npy`` file per column under
+``ANALYTICS_DIR/<snapshot>/``: integer ids, money in cents, dates as
+month numbers, and strings dictionary-encoded to small integer codes
+with the dictionaries in ``manifest.json``. Bills and payments carry the
+doctor of their appointment so reports never join at query time.
+``CURRENT`` names the newest complete snapshot and is swapped
+atomically, so readers never see a half-written one.
+
+Reports memory-map the columns and aggregate them with numpy
+(``bincount`` over dense group keys), touching only the columns they
+use. Point ``ANALYTICS_DATABASE_URL`` at a replica to keep the nightly
+extract off the primary as well.
+"""
+import json
+import os
+import shutil
+import threading
+from datetime import datetime
+from functools import lru_cache
+from typing import Optional
+
+import numpy as np
+from sqlalchemy import Integer, cast, create_engine, func, select
+from sqlalchemy.engine import Engine
+
+from app.core.config import get_settings
+from app.models.appointment import Appointment
+from app.models.billing import Bill, BillStatus, Payment, PaymentStatus
+from app.models.doctor import Doctor
+from app.models.user import User
+
+CURRENT_FILE = "CURRENT"
+MANIFEST_FILE = "manifest.json"
+EXTRACT_CHUNK = 50_000
+MISSING = -1  # null foreign keys
+
+
+class SnapshotNotFound(Exception):
+    pass
+
+
+# -- extraction ---------------------------------------------------------
+
+def _cents(column):
+    return cast(func.round(column * 100), Integer)
+
+
+def _months(values: list) -> np.ndarray:
+    """Months since 1970-01 for a list of datetimes (None -> MISSING)."""
+    dates = np.array(values, dtype="datetime64[s]")
+    months = dates.astype("datetime64[M]").astype(np.int32)
+    months[np.isnat(dates)] = MISSING
+    return months
+
+
+class _Dictionary:
+    """Dictionary-encodes strings to int16 codes in first-seen order."""
+
+    def __init__(self):
+        self.values: list[str] = []
+        self._codes: dict[str, int] = {}
+
+    def encode(self, values) -> np.ndarray:
+        codes = np.empty(len(values), dtype=np.int16)
+        for i, value in enumerate(values):
+            value = value.value if hasattr(value, "value") else value
+            code = self._codes.get(value)
+            if code is None:
+                code = self._codes[value] = len(self.values)
+                self.values.append(value)
+            codes[i] = code
+        return codes
+
+
+def _extract(conn, query, id_column, columns: dict) -> dict[str, np.ndarray]:
+    """Stream a query by primary key and convert each chunk to arrays.
+
+    columns maps output name -> converter(list of values) -> ndarray.
+    """
+    parts = {name: [] for name in columns}
+    last_id = 0
+    while True:
+        rows = conn.execute(query.where(id_column > last_id).order_by(id_column).limit(EXTRACT_CHUNK)).all()
+        if not rows:
+            break
+        for index, (name, convert) in enumerate(columns.items()):
+            parts[name].append(convert([row[index] for row in rows]))
+        last_id = rows[-1][0]
+    return {
+        name: np.concatenate(chunks) if chunks else convert([])
+        for (name, convert), chunks in zip(columns.items(), parts.values())
+    }
+
+
+def _ints(dtype):
+    return lambda values: np.array([MISSING if v is None else v for v in values], dtype=dtype)
+
+
+@lru_cache()
+def source_engine() -> Engine:
+    """Engine to extract from: the analytics replica if configured, else the primary."""
+    url = get_settings().analytics_database_url
+    if url:
+        return create_engine(url, pool_pre_ping=True)
+    from app.db.session import engine
+    return engine
+
+
+def build_snapshot(engine: Engine, output_dir: Optional[str] = None, keep: int = 2) -> dict:
+    """Extract a new snapshot and make it current; returns its manifest."""
+    output_dir = output_dir or get_settings().analytics_dir
+    os.makedirs(output_dir, exist_ok=True)
+    name = datetime.utcnow().strftime("%Y%m%dT%H%M%S%f")
+    staging = os.path.join(output_dir, f".{name}.tmp")
+    os.makedirs(staging)
+
+    specializations, doctor_names, methods = _Dictionary(), _Dictionary(), _Dictionary()
+    appointment_status, bill_status, payment_status = _Dictionary(), _Dictionary(), _Dictionary()
+    with engine.connect() as conn:
+        # Deleted doctors stay in history: core selects bypass the soft-delete filter
+        tables = {
+            "doctors": _extract(
+                conn,
+                select(Doctor.id, Doctor.user_id, Doctor.specialization, User.full_name)
+                .join(User, User.id == Doctor.user_id),
+                Doctor.id,
+                {"id": _ints(np.int32), "user_id": _ints(np.int32),
+                 "specialization": specializations.encode, "name": doctor_names.encode},
+            ),
+            "appointments": _extract(
+                conn,
+                select(Appointment.id, Appointment.doctor_id, Appointment.patient_id,
+                       Appointment.appointment_date, Appointment.status),
+                Appointment.id,
+                {"id": _ints(np.int32), "doctor_id": _ints(np.int32), "patient_id": _ints(np.int32),
+                 "month": _months, "status": appointment_status.encode},
+            ),
+            "bills": _extract(
+                conn,
+                select(Bill.id, Appointment.doctor_id, Bill.patient_id, Bill.issue_date,
+                       _cents(Bill.total_amount), _cents(Bill.amount_paid), _cents(Bill.balance_due), Bill.status)
+                .outerjoin(Appointment, Appointment.id == Bill.appointment_id),
+                Bill.id,
+                {"id": _ints(np.int32), "doctor_id": _ints(np.int32), "patient_id": _ints(np.int32),
+                 "month": _months, "total_cents": _ints(np.int64), "paid_cents": _ints(np.int64),
+                 "balance_cents": _ints(np.int64), "status": bill_status.encode},
+            ),
+            "payments": _extract(
+                conn,
+                select(Payment.id, Appointment.doctor_id, Payment.bill_id, Payment.payment_date,
+                       _cents(Payment.amount), Payment.payment_method, Payment.status)
+                .join(Bill, Bill.id == Payment.bill_id)
+                .outerjoin(Appointment, Appointment.id == Bill.appointment_id),
+                Payment.id,
+                {"id": _ints(np.int32), "doctor_id": _ints(np.int32), "bill_id": _ints(np.int32),
+                 "month": _months, "amount_cents": _ints(np.int64), "method": methods.encode,
+                 "status": payment_status.encode},
+            ),
+        }
+
+    for table, columns in tables.items():
+        os.makedirs(os.path.join(staging, table))
+        for column, values in columns.items():
+            np.save(os.path.join(staging, table, f"{column}.npy"), values)
+    manifest = {
+        "name": name,
+        "created_at": datetime.utcnow().isoformat(),
+        "rows": {table: len(columns["id"]) for table, columns in tables.items()},
+        "dictionaries": {
+            "doctors.specialization": specializations.values,
+            "doctors.name": doctor_names.values,
+            "appointments.status": appointment_status.values,
+            "bills.status": bill_status.values,
+            "payments.method": methods.values,
+            "payments.status": payment_status.values,
+        },
+    }
+    with open(os.path.join(staging, MANIFEST_FILE), "w", encoding="utf-8") as fh:
+        json.dump(manifest, fh, indent=2)
+
+    os.replace(staging, os.path.join(output_dir, name))
+    with open(os.path.join(output_dir, CURRENT_FILE + ".tmp"), "w", encoding="utf-8") as fh:
+        fh.write(name)
+    os.replace(os.path.join(output_dir, CURRENT_FILE + ".tmp"), os.path.join(output_dir, CURRENT_FILE))
+
+    snapshots = sorted(entry for entry in os.listdir(output_dir) if entry[:1].isdigit())
+    for old in snapshots[:-keep]:
+        shutil.rmtree(os.path.join(output_dir, old), ignore_errors=True)
+    return manifest
+
+
+# -- reading ------------------------------------------------------------
+
+class Snapshot:
+    """Memory-mapped columns of one snapshot; loaded lazily per column."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, MANIFEST_FILE), encoding="utf-8") as fh:
+            self.manifest = json.load(fh)
+        self._columns: dict[str, np.ndarray] = {}
+
+    def column(self, table: str, name: str) -> np.ndarray:
+        key = f"{table}.{name}"
+        if key not in self._columns:
+            self._columns[key] = np.load(os.path.join(self.path, table, f"{name}.npy"), mmap_mode="r")
+        return self._columns[key]
+
+    def dictionary(self, key: str) -> list[str]:
+        return self.manifest["dictionaries"][key]
+
+    def code(self, key: str, value: str) -> int:
+        """Code of value in a dictionary, or MISSING if it never occurs."""
+        values = self.dictionary(key)
+        return values.index(value) if value in values else MISSING
+
+
+_cache_lock = threading.Lock()
+_cached: dict[str, Snapshot] = {}
+
+
+def current_snapshot(output_dir: Optional[str] = None) -> Snapshot:
+    """The newest complete snapshot, reopened only when CURRENT changes."""
+    output_dir = output_dir or get_settings().analytics_dir
+    try:
+        with open(os.path.join(output_dir, CURRENT_FILE), encoding="utf-8") as fh:
+            name = fh.read().strip()
+    except FileNotFoundError:
+        raise SnapshotNotFound("No analytics snapshot has been built")
+    path = os.path.join(output_dir, name)
+    with _cache_lock:
+        snapshot = _cached.get(output_dir)
+        if snapshot is None or snapshot.path != path:
+            snapshot = _cached[output_dir] = Snapshot(path)
+        return snapshot
+
+
+def month_number(value: str) -> int:
+    """YYYY-MM -> months since 1970-01."""
+    return int(np.datetime64(value, "M").astype(np.int32))
+
+
+def month_label(number: int) -> str:
+    return str(np.datetime64(int(number), "M"))
+
+
+def _in_months(months: np.ndarray, start: Optional[str], end: Optional[str]) -> np.ndarray:
+    """Mask for months within [start, end], both YYYY-MM and inclusive."""
+    mask = months != MISSING
+    if start:
+        mask &= months >= month_number(start)
+    if end:
+        mask &= months <= month_number(end)
+    return mask
+
+
+def _group_sum(keys: np.ndarray, *weights: np.ndarray) -> tuple[np.ndarray, list[np.ndarray]]:
+    """Distinct keys with the count and weight sums of each group."""
+    unique, inverse = np.unique(keys, return_inverse=True)
+    sums = [np.bincount(inverse, minlength=len(unique))]
+    sums += [np.bincount(inverse, weights=w, minlength=len(unique)) for w in weights]
+    return unique, sums
+
+
+def _doctor_lookup(snapshot: Snapshot) -> tuple[np.ndarray, np.ndarray]:
+    """Dense arrays mapping a doctor's user id to specialization and name codes."""
+    user_ids = snapshot.column("doctors", "user_id")
+    size = int(user_ids.max()) + 1 if len(user_ids) else 1
+    specialization = np.full(size, MISSING, dtype=np.int32)
+    name = np.full(size, MISSING, dtype=np.int32)
+    specialization[user_ids] = snapshot.column("doctors", "specialization")
+    name[user_ids] = snapshot.column("doctors", "name")
+    return specialization, name
+
+
+def _lookup(table: np.ndarray, ids: np.ndarray) -> np.ndarray:
+    result = np.full(len(ids), MISSING, dtype=np.int32)
+    known = (ids >= 0) & (ids < len(table))
+    result[known] = table[ids[known]]
+    return result
+
+
+def revenue_by_doctor_month(snapshot: Snapshot, start: Optional[str] = None, end: Optional[str] = None) -> list[dict]:
+    """Billed (by issue month, excluding cancelled) and collected (completed
+    payments, by payment month) per doctor and month. Bills without an
+    appointment are reported under doctor_id None.
+    """
+    months_per_key = 1 << 20
+    cancelled = snapshot.code("bills.status", BillStatus.CANCELLED.value)
+    bill_months = snapshot.column("bills", "month")
+    bill_mask = _in_months(bill_months, start, end) & (snapshot.column("bills", "status") != cancelled)
+    completed = snapshot.code("payments.status", PaymentStatus.COMPLETED.value)
+    payment_months = snapshot.column("payments", "month")
+    payment_mask = _in_months(payment_months, start, end) & (snapshot.column("payments", "status") == completed)
+
+    # One int64 key per (doctor, month); doctor -1 (no appointment) stays distinct
+    def keys(table, mask, months):
+        doctors = snapshot.column(table, "doctor_id")[mask].astype(np.int64)
+        return (doctors + 1) * months_per_key + months[mask]
+
+    bill_keys = keys("bills", bill_mask, bill_months)
+    payment_keys = keys("payments", payment_mask, payment_months)
+    all_keys = np.concatenate([bill_keys, payment_keys])
+    billed = np.concatenate([snapshot.column("bills", "total_cents")[bill_mask], np.zeros(len(payment_keys))])
+    collected = np.concatenate([np.zeros(len(bill_keys)), snapshot.column("payments", "amount_cents")[payment_mask]])
+    is_bill = np.concatenate([np.ones(len(bill_keys)), np.zeros(len(payment_keys))])
+    unique, (_, bill_counts, billed_cents, collected_cents) = _group_sum(all_keys, is_bill, billed, collected)
+
+    doctor_ids = unique // months_per_key - 1
+    months = unique % months_per_key
+    _, names = _doctor_lookup(snapshot)
+    name_codes = _lookup(names, doctor_ids)
+    name_values = snapshot.dictionary("doctors.name")
+    return [
+        {
+            "doctor_id": int(doctor_id) if doctor_id != MISSING else None,
+            "doctor_name": name_values[code] if code != MISSING else None,
+            "month": month_label(month),
+            "bills": int(bill_count),
+            "billed": round(billed_sum / 100, 2),
+            "collected": round(collected_sum / 100, 2),
+        }
+        for doctor_id, code, month, bill_count, billed_sum, collected_sum
+        in zip(doctor_ids, name_codes, months, bill_counts, billed_cents, collected_cents)
+    ]
+
+
+def visits_by_specialization(
+    snapshot: Snapshot,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    status: Optional[str] = None,
+) -> list[dict]:
+    """Appointment counts per doctor specialization, optionally for one status."""
+    months = snapshot.column("appointments", "month")
+    mask = _in_months(months, start, end)
+    if status:
+        mask &= snapshot.column("appointments", "status") == snapshot.code("appointments.status", status)
+    specialization, _ = _doctor_lookup(snapshot)
+    codes = _lookup(specialization, snapshot.column("appointments", "doctor_id")[mask])
+    unique, (counts,) = _group_sum(codes)
+    # Distinct patients per group: count distinct (group, patient) pairs
+    pairs = np.unique(np.stack([codes, snapshot.column("appointments", "patient_id")[mask]]), axis=1)
+    patients = np.bincount(np.searchsorted(unique, pairs[0]), minlength=len(unique))
+    values = snapshot.dictionary("doctors.specialization")
+    report = [
+        {
+            "specialization": values[code] if code != MISSING else None,
+            "visits": int(count),
+            "patients": int(patient_count),
+        }
+        for code, count, patient_count in zip(unique, counts, patients)
+    ]
+    return sorted(report, key=lambda row: row["visits"], reverse=True)
+
+
+def payment_method_mix(snapshot: Snapshot, start: Optional[str] = None, end: Optional[str] = None) -> list[dict]:
+    """Completed payments per method with their share of the amount collected."""
+    months = snapshot.column("payments", "month")
+    completed = snapshot.code("payments.status", PaymentStatus.COMPLETED.value)
+    mask = _in_months(months, start, end) & (snapshot.column("payments", "status") == completed)
+    unique, (counts, cents) = _group_sum(
+        snapshot.column("payments", "method")[mask],
+        snapshot.column("payments", "amount_cents")[mask],
+    )
+    total = cents.sum()
+    values = snapshot.dictionary("payments.method")
+    report = [
+        {
+            "payment_method": values[code],
+            "payments": int(count),
+            "amount": round(amount / 100, 2),
+            "share": round(amount / total, 4) if total else 0.0,
+        }
+        for code, count, amount in zip(unique, counts, cents)
+    ]
+    return sorted(report, key=lambda row: row["amount"], reverse=True)
@@ -0,0 +1,329 @@
+"""Asynchronous audit log of reads of protected health information.
+
+Handlers call ``audit_logger.record``, which appends the event to a
+local spool file and an in-memory queue and returns; the request never
+waits on the database. A writer thread flushes the queue with one
+multi-row INSERT whenever ``batch_size`` events are waiting or
+``flush_seconds`` have passed, then deletes the spool segments those
+rows came from. The writer opens its sessions through the app it was
+started with, the way routes get theirs, so audit rows land in the same
+database as the reads they record (including under test overrides).
+
+Spool files live in ``AUDIT_SPOOL_DIR`` and are named per process, so
+gunicorn workers never share one. Each process holds an exclusive lock
+on its own ``audit-<pid>.lock``; on start a process replays the segments
+of any process whose lock is no longer held, which covers events queued
+by a worker that crashed before its last flush.
+"""
+import json
+import logging
+import os
+import threading
+from datetime import date, datetime
+from typing import Optional
+
+from sqlalchemy import insert, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.core.config import get_settings
+from app.db.session import app_session
+from app.models.audit import AuditAction, PhiAccessLog, month_partitions
+
+try:
+    import fcntl
+except ImportError:  # Windows development servers run a single process
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+COLUMNS = ("accessed_at", "user_id", "role", "action", "patient_id", "resource_id", "client_ip")
+
+
+class AuditLogger:
+    def __init__(self, spool_dir: str, batch_size: int = 500, flush_seconds: float = 2.0, fsync: bool = False):
+        self.spool_dir = spool_dir
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self.fsync = fsync
+        self._pending: list[dict] = []
+        self._segments: list[str] = []  # spool files covering the rows in _pending
+        self._spool = None
+        self._sequence = 0
+        self._lock_file = None
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._app = None
+
+    # -- producers -----------------------------------------------------
+
+    def record(
+        self,
+        current_user: dict,
+        action: AuditAction,
+        patient_id: Optional[int] = None,
+        resource_id: Optional[int] = None,
+        client_ip: Optional[str] = None,
+    ) -> None:
+        """Queue one access event. Never touches the database."""
+        self.record_many(current_user, action, [(patient_id, resource_id)], client_ip)
+
+    def record_many(
+        self,
+        current_user: dict,
+        action: AuditAction,
+        subjects: list[tuple[Optional[int], Optional[int]]],
+        client_ip: Optional[str] = None,
+    ) -> None:
+        """Queue one event per (patient_id, resource_id), e.g. for every row of a list."""
+        now = datetime.utcnow()
+        rows = [
+            {
+                "accessed_at": now,
+                "user_id": int(current_user["user_id"]),
+                "role": current_user.get("role"),
+                "action": int(action),
+                "patient_id": patient_id,
+                "resource_id": resource_id,
+                "client_ip": client_ip,
+            }
+            for patient_id, resource_id in subjects
+        ]
+        if not rows:
+            return
+        with self._cond:
+            if self._spool is not None:
+                self._spool.write("".join(_encode(row) + "\n" for row in rows))
+                # Into the OS page cache: survives a process crash. fsync
+                # also survives losing the host, at a cost on every read.
+                self._spool.flush()
+                if self.fsync:
+                    os.fsync(self._spool.fileno())
+            self._pending.extend(rows)
+            if len(self._pending) >= self.batch_size:
+                self._cond.notify()
+
+    # -- writer --------------------------------------------------------
+
+    def flush(self, db: Optional[Session] = None) -> int:
+        """Write everything queued so far in one INSERT; returns rows written.
+
+        On failure the rows stay queued (and spooled) for the next flush.
+        """
+        with self._flush_lock:
+            with self._cond:
+                rows, self._pending = self._pending, []
+                segments, self._segments = self._segments, []
+                if self._spool is not None and rows:
+                    segments.append(self._rotate())
+            if not rows:
+                return 0
+            try:
+                self._insert(db, rows)
+            except Exception:
+                logger.exception("Audit flush of %d events failed; will retry", len(rows))
+                with self._cond:
+                    self._pending[:0] = rows
+                    self._segments[:0] = segments
+                return 0
+            for path in segments:
+                _unlink(path)
+            return len(rows)
+
+    def start(self, app) -> None:
+        """Open this process's spool, replay orphaned spools and start the writer.
+
+        app supplies the writer's database sessions (see ``app_session``).
+        """
+        if self._thread is not None:
+            return
+        self._app = app
+        os.makedirs(self.spool_dir, exist_ok=True)
+        pid = os.getpid()
+        self._lock_file = open(os.path.join(self.spool_dir, f"audit-{pid}.lock"), "w")
+        _try_lock(self._lock_file)
+        try:
+            # Leftovers of an earlier process that had our pid, then everyone else's
+            self._replay(pid)
+            self.recover()
+        except Exception:
+            logger.exception("Replaying orphaned audit spools failed")
+        with self._cond:
+            self._spool = open(self._segment_path(), "a", encoding="utf-8")
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="phi-audit-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the writer after a final flush."""
+        if self._thread is None:
+            return
+        self._stop.set()
+        with self._cond:
+            self._cond.notify()
+        self._thread.join(10)
+        self._thread = None
+        self.flush()
+        with self._cond:
+            if self._spool is not None:
+                path = self._spool.name
+                self._spool.close()
+                self._spool = None
+                if not self._pending:
+                    _unlink(path)
+        if self._lock_file is not None:
+            # Unflushed rows stay spooled; the next process to start replays them
+            if not self._pending:
+                _unlink(self._lock_file.name)
+            self._lock_file.close()
+            self._lock_file = None
+
+    def recover(self) -> int:
+        """Insert rows spooled by processes that exited without flushing."""
+        recovered = 0
+        for name in sorted(os.listdir(self.spool_dir)):
+            if not (name.startswith("audit-") and name.endswith(".lock")):
+                continue
+            pid = name[len("audit-"):-len(".lock")]
+            lock_path = os.path.join(self.spool_dir, name)
+            if pid == str(os.getpid()):
+                continue
+            # Hold the dead process's lock while replaying so two starting
+            # workers cannot both replay it
+            with open(lock_path, "a") as lock:
+                if not _try_lock(lock):
+                    continue
+                recovered += self._replay(pid)
+                _unlink(lock_path)
+        if recovered:
+            logger.warning("Recovered %d audit events from orphaned spool files", recovered)
+        return recovered
+
+    def _replay(self, pid) -> int:
+        """Insert and delete the spool segments written by process pid."""
+        replayed = 0
+        prefix = f"audit-{pid}-"
+        for segment in sorted(n for n in os.listdir(self.spool_dir) if n.startswith(prefix)):
+            path = os.path.join(self.spool_dir, segment)
+            with open(path, encoding="utf-8") as fh:
+                rows = [_decode(line) for line in fh if line.strip()]
+            if rows:
+                self._insert(None, rows)
+                replayed += len(rows)
+            _unlink(path)
+        return replayed
+
+    def clear(self) -> None:
+        """Drop queued events without writing them; for tests, whose database is dropped after each one."""
+        with self._cond:
+            self._pending.clear()
+            self._segments.clear()
+
+    @property
+    def pending_count(self) -> int:
+        return len(self._pending)
+
+    def _insert(self, db: Optional[Session], rows: list[dict]) -> None:
+        """One multi-row INSERT ... VALUES (...), (...), committed, in db or a session of the app."""
+        if db is not None:
+            _insert(db, rows)
+            return
+        with app_session(self._app) as session:
+            _insert(session, rows)
+
+    def _segment_path(self) -> str:
+        self._sequence += 1
+        return os.path.join(self.spool_dir, f"audit-{os.getpid()}-{self._sequence:08d}.spool")
+
+    def _rotate(self) -> str:
+        """Close the current spool segment and start a new one; returns the closed path."""
+        path = self._spool.name
+        self._spool.close()
+        self._spool = open(self._segment_path(), "a", encoding="utf-8")
+        return path
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            with self._cond:
+                if len(self._pending) < self.batch_size:
+                    self._cond.wait(self.flush_seconds)
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Audit writer failed")
+
+
+def _encode(row: dict) -> str:
+    return json.dumps([row["accessed_at"].isoformat()] + [row[column] for column in COLUMNS[1:]])
+
+
+def _decode(line: str) -> dict:
+    values = json.loads(line)
+    row = dict(zip(COLUMNS, values))
+    row["accessed_at"] = datetime.fromisoformat(row["accessed_at"])
+    return row
+
+
+def _insert(db: Session, rows: list[dict]) -> None:
+    db.execute(insert(PhiAccessLog).values(rows))
+    db.commit()
+
+
+def _try_lock(fh) -> bool:
+    """Take an exclusive lock without waiting; released when fh is closed."""
+    if fcntl is None:
+        return True
+    try:
+        fcntl.flock(fh, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        return False
+    return True
+
+
+def _unlink(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def client_ip(request) -> Optional[str]:
+    return request.client.host if request.client else None
+
+
+def ensure_month_partitions(engine: Engine, months_ahead: int = 3) -> list[str]:
+    """Split monthly partitions off ``pmax`` up to months_ahead (MySQL only).
+
+    Returns the partitions added. ``pmax`` is empty in normal operation,
+    so reorganizing it moves no rows.
+    """
+    if engine.dialect.name != "mysql":
+        return []
+    with engine.begin() as conn:
+        existing = set(conn.execute(text(
+            "SELECT partition_name FROM information_schema.partitions "
+            "WHERE table_schema = DATABASE() AND table_name = 'phi_access_log'"
+        )).scalars())
+        if "pmax" not in existing:
+            return []
+        added = [
+            definition for definition in month_partitions(date.today(), months_ahead)
+            if definition.split()[1] not in existing
+        ]
+        if added:
+            conn.execute(text(
+                "ALTER TABLE phi_access_log REORGANIZE PARTITION pmax INTO ("
+                + ", ".join(added + ["PARTITION pmax VALUES LESS THAN MAXVALUE"]) + ")"
+            ))
+    return [definition.split()[1] for definition in added]
+
+
+settings = get_settings()
+audit_logger = AuditLogger(
+    settings.audit_spool_dir,
+    batch_size=settings.audit_batch_size,
+    flush_seconds=settings.audit_flush_seconds,
+    fsync=settings.audit_spool_fsync,
+)
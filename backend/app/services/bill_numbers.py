@@ -0,0 +1,68 @@
+"""Hi/lo allocation of bill numbers.
+
+Each worker reserves a block of sequence values per facility and year
+from ``bill_number_sequences`` in one short transaction, then formats
+bill numbers from memory until the block runs out. Numbers are unique
+and increase within a worker; blocks held by different workers
+interleave, and numbers left in a block when a worker exits are never
+issued.
+"""
+import threading
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import insert, select, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import IntegrityError
+
+from app.core.config import get_settings
+from app.models.bill_number_sequence import BillNumberSequence
+
+
+def format_bill_number(facility: str, year: int, value: int) -> str:
+    return f"{facility}-{year}-{value:07d}"
+
+
+class BillNumberAllocator:
+    def __init__(self, block_size: int):
+        self.block_size = block_size
+        self._blocks: dict[tuple[str, int], list[int]] = {}  # key -> [next, limit)
+        self._lock = threading.Lock()
+
+    def next_number(self, engine: Engine, facility: str, year: Optional[int] = None) -> str:
+        """Return the next bill number, reserving a new block when needed."""
+        year = year or datetime.utcnow().year
+        key = (facility, year)
+        with self._lock:
+            block = self._blocks.get(key)
+            if block is None or block[0] >= block[1]:
+                block = self._blocks[key] = list(self._reserve(engine, facility, year))
+            value = block[0]
+            block[0] += 1
+        return format_bill_number(facility, year, value)
+
+    def _reserve(self, engine: Engine, facility: str, year: int) -> tuple[int, int]:
+        """Advance the shared counter by one block; returns [start, end)."""
+        table = BillNumberSequence.__table__
+        where = (table.c.facility == facility) & (table.c.year == year)
+        for _ in range(2):
+            with engine.begin() as conn:
+                bumped = conn.execute(
+                    update(table).where(where).values(next_value=table.c.next_value + self.block_size)
+                ).rowcount
+                if bumped:
+                    end = conn.execute(select(table.c.next_value).where(where)).scalar_one()
+                    return end - self.block_size, end
+            try:
+                with engine.begin() as conn:
+                    conn.execute(insert(table).values(
+                        facility=facility, year=year, next_value=1 + self.block_size
+                    ))
+                return 1, 1 + self.block_size
+            except IntegrityError:
+                # Another worker created the counter first; bump it instead
+                continue
+        raise RuntimeError(f"Could not reserve bill numbers for {facility}/{year}")
+
+
+bill_number_allocator = BillNumberAllocator(get_settings().bill_number_block_size)
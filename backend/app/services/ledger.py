@@ -0,0 +1,59 @@
+"""Bill balance bookkeeping.
+
+Bills carry denormalized ``amount_paid`` and ``balance_due`` so that
+outstanding balances never need an aggregate over ``payments``. Both are
+changed only by single UPDATE statements that do the arithmetic in SQL,
+so concurrent payments on the same bill serialize on the row lock
+instead of overwriting each other.
+
+Assignments are ordered so that expressions only read columns that have
+not yet been assigned in the same statement. MySQL applies SET clauses
+left to right, while other databases read the old row.
+"""
+from decimal import Decimal, ROUND_HALF_UP
+
+from sqlalchemy import case, literal, update
+from sqlalchemy.orm import Session
+
+from app.models.billing import Bill, BillStatus
+
+CENT = Decimal("0.01")
+
+
+def to_money(value) -> Decimal:
+    """Convert a float or string amount to an exact two-place Decimal."""
+    return Decimal(str(value)).quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+def _status(value: BillStatus):
+    return literal(value, type_=Bill.__table__.c.status.type)
+
+
+def status_for_balance(balance_due, amount_paid):
+    """SQL expression deriving a bill's status from its new balance."""
+    return case(
+        (balance_due < 0, _status(BillStatus.OVERPAID)),
+        (balance_due == 0, _status(BillStatus.PAID)),
+        (amount_paid > 0, _status(BillStatus.PARTIALLY_PAID)),
+        else_=Bill.status,
+    )
+
+
+def apply_payment(db: Session, bill_id: int, amount: Decimal) -> int:
+    """Add a payment to a bill's running totals; returns rows updated.
+
+    Cancelled bills are left untouched. Does not commit.
+    """
+    new_balance = Bill.total_amount - Bill.amount_paid - amount
+    new_paid = Bill.amount_paid + amount
+    stmt = (
+        update(Bill)
+        .where(Bill.id == bill_id, Bill.status != BillStatus.CANCELLED)
+        .ordered_values(
+            (Bill.balance_due, new_balance),
+            (Bill.status, status_for_balance(new_balance, new_paid)),
+            (Bill.version, Bill.version + 1),
+            (Bill.amount_paid, new_paid),
+        )
+    )
+    return db.execute(stmt, execution_options={"synchronize_session": False}).rowcount
@@ -0,0 +1,253 @@
+"""Live appointment and billing feed for SSE and WebSocket clients.
+
+Each worker process runs one ``LiveFeedBroker``. Its tailer thread reads
+new rows from ``outbox_events`` (the transactional log the dispatcher
+delivers from) with one primary-key range query per poll and fans each
+event out to the in-process subscribers whose filters match. Because the
+outbox table is the log shared by all gunicorn workers, a change
+committed through any worker reaches clients connected to every worker,
+and an event id is a resume token that is valid on all of them.
+
+Events are published in id order. When the tailer sees a gap in the ids
+(a transaction that took an id but has not committed yet) it waits up to
+``gap_grace_seconds`` for it before moving on, so a client that resumes
+after id N has not silently missed a lower id that committed late.
+"""
+import asyncio
+import threading
+import time
+from typing import AsyncIterator, Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import get_settings
+from app.db.session import app_session
+from app.models.appointment import Appointment
+from app.models.doctor import Doctor
+from app.models.outbox import OutboxEvent
+from app.services.outbox import to_message
+
+FEED_EVENT_PREFIXES = ("appointment.", "bill.")
+
+# Control messages; they carry no id and do not move a client's resume token
+HEARTBEAT = {"type": "heartbeat"}
+RESET = {"type": "reset"}  # resume token too old: reload state over REST, then keep streaming
+OVERFLOW = {"type": "overflow"}  # client fell behind: reconnect with the last id received
+
+
+class FeedFilter:
+    """Subscription filter; ``None`` fields match everything."""
+
+    def __init__(
+        self,
+        doctor_id: Optional[int] = None,
+        department: Optional[str] = None,
+        event_prefixes: tuple[str, ...] = FEED_EVENT_PREFIXES,
+    ):
+        self.doctor_id = doctor_id
+        self.department = department.lower() if department else None
+        self.event_prefixes = event_prefixes
+
+    def matches(self, event: dict) -> bool:
+        if not event["type"].startswith(self.event_prefixes):
+            return False
+        if self.doctor_id is not None and event["doctor_id"] != self.doctor_id:
+            return False
+        if self.department is not None and (event["department"] or "").lower() != self.department:
+            return False
+        return True
+
+
+def enrich(db: Session, rows: list[OutboxEvent]) -> list[dict]:
+    """Feed messages for outbox rows, tagged with doctor and department for filtering.
+
+    Bill events reach their doctor through the bill's appointment. Costs
+    at most two queries per batch, however many clients are connected.
+    """
+    messages = [to_message(row) for row in rows if row.event_type.startswith(FEED_EVENT_PREFIXES)]
+    appointment_ids = {
+        message["data"].get("appointment_id")
+        for message in messages
+        if message["aggregate_type"] == "bill" and message["data"].get("appointment_id")
+    }
+    appointment_doctors = dict(
+        db.execute(select(Appointment.id, Appointment.doctor_id).where(Appointment.id.in_(appointment_ids))).all()
+    ) if appointment_ids else {}
+
+    for message in messages:
+        data = message["data"]
+        if message["aggregate_type"] == "appointment":
+            message["doctor_id"] = data.get("doctor_id")
+        else:
+            message["doctor_id"] = appointment_doctors.get(data.get("appointment_id"))
+
+    doctor_ids = {message["doctor_id"] for message in messages if message["doctor_id"] is not None}
+    departments = dict(
+        db.execute(select(Doctor.user_id, Doctor.specialization).where(Doctor.user_id.in_(doctor_ids))).all()
+    ) if doctor_ids else {}
+    for message in messages:
+        message["department"] = departments.get(message["doctor_id"])
+    return messages
+
+
+class Subscription:
+    """One connected client: a bounded queue fed from the broker thread."""
+
+    def __init__(self, feed_filter: FeedFilter, loop: asyncio.AbstractEventLoop, max_queue: int):
+        self.filter = feed_filter
+        self.loop = loop
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self.overflowed = False
+
+    def offer(self, event: dict) -> None:
+        """Enqueue on the subscriber's loop; a full queue ends the subscription."""
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(OVERFLOW)
+
+
+class LiveFeedBroker:
+    """Tails the outbox and fans events out to this process's subscribers."""
+
+    def __init__(self, batch_size: int = 500, gap_grace_seconds: float = 2.0, max_queue: int = 1000):
+        self.batch_size = batch_size
+        self.gap_grace_seconds = gap_grace_seconds
+        self.max_queue = max_queue
+        self.cursor: Optional[int] = None  # highest id published; None until the first poll
+        self._gap_since: Optional[float] = None
+        self._subscribers: set[Subscription] = set()
+        self._lock = threading.Lock()
+
+    def subscribe(self, feed_filter: FeedFilter) -> Subscription:
+        """Register a subscriber; call from the client's event loop."""
+        subscription = Subscription(feed_filter, asyncio.get_running_loop(), self.max_queue)
+        with self._lock:
+            self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def poll(self, db: Session) -> int:
+        """Publish events committed since the last poll; returns events published."""
+        try:
+            if self.cursor is None:
+                # Start at the head of the log; history is served by backlog()
+                self.cursor = db.execute(select(func.max(OutboxEvent.id))).scalar() or 0
+                return 0
+
+            rows = db.execute(
+                select(OutboxEvent)
+                .where(OutboxEvent.id > self.cursor)
+                .order_by(OutboxEvent.id)
+                .limit(self.batch_size)
+            ).scalars().all()
+            ready = []
+            for row in rows:
+                if row.id != self.cursor + 1:
+                    now = time.monotonic()
+                    if self._gap_since is None:
+                        self._gap_since = now
+                    if now - self._gap_since < self.gap_grace_seconds:
+                        break
+                self._gap_since = None
+                self.cursor = row.id
+                ready.append(row)
+            if not ready or not self._subscribers:
+                return 0
+            events = enrich(db, ready)
+        finally:
+            # Never keep a snapshot open between polls
+            db.rollback()
+
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            for event in events:
+                if subscription.filter.matches(event):
+                    try:
+                        subscription.loop.call_soon_threadsafe(subscription.offer, event)
+                    except RuntimeError:
+                        # The client's event loop is gone
+                        self.unsubscribe(subscription)
+                        break
+        return len(events)
+
+    def backlog(self, db: Session, since: int, feed_filter: FeedFilter, limit: int) -> Optional[list[dict]]:
+        """Matching events after ``since`` that the broker has already published.
+
+        Returns None when the token cannot be honoured: the events after it
+        were purged or there are more than ``limit`` of them.
+        """
+        oldest = db.execute(select(func.min(OutboxEvent.id))).scalar()
+        if oldest is not None and since < oldest - 1:
+            return None
+        query = select(OutboxEvent).where(OutboxEvent.id > since).order_by(OutboxEvent.id).limit(limit + 1)
+        if self.cursor is not None:
+            query = query.where(OutboxEvent.id <= self.cursor)
+        rows = db.execute(query).scalars().all()
+        if len(rows) > limit:
+            return None
+        return [event for event in enrich(db, rows) if feed_filter.matches(event)]
+
+
+live_feed_broker = LiveFeedBroker(max_queue=get_settings().live_feed_queue_size)
+
+
+async def stream_events(
+    app,
+    feed_filter: FeedFilter,
+    since: Optional[int] = None,
+    broker: LiveFeedBroker = live_feed_broker,
+) -> AsyncIterator[dict]:
+    """Yield the backlog after ``since``, then live events, with periodic heartbeats.
+
+    Ends after yielding OVERFLOW. The subscription is taken before the
+    backlog is read so nothing committed in between is missed; events
+    seen in both are sent once.
+    """
+    settings = get_settings()
+    subscription = broker.subscribe(feed_filter)
+    try:
+        last_id = since
+        if since is not None:
+            with app_session(app) as db:
+                backlog = await run_in_threadpool(
+                    broker.backlog, db, since, feed_filter, settings.live_feed_backlog_limit
+                )
+            if backlog is None:
+                last_id = None
+                yield RESET
+            else:
+                for event in backlog:
+                    last_id = event["id"]
+                    yield event
+
+        while True:
+            try:
+                event = await asyncio.wait_for(subscription.queue.get(), settings.live_feed_heartbeat_seconds)
+            except asyncio.TimeoutError:
+                yield HEARTBEAT
+                continue
+            if event is OVERFLOW:
+                yield OVERFLOW
+                return
+            if last_id is not None and event["id"] <= last_id:
+                continue
+            last_id = event["id"]
+            yield event
+    finally:
+        broker.unsubscribe(subscription)
@@ -0,0 +1,385 @@
+"""Transactional outbox for events consumed by reminder and accounting systems.
+
+Routers call ``record_event`` inside the transaction that makes the
+change, so an event exists if and only if the change committed, and no
+request waits on a remote system. ``OutboxDispatcher`` later claims
+pending rows in batches, hands them to a sink and marks them delivered,
+retrying failed batches with exponential backoff.
+
+Delivery is at least once: a dispatcher that dies after the sink
+accepted a batch but before marking it delivered will send it again once
+its claim expires. Consumers should de-duplicate on the event ``id``.
+"""
+import json
+import logging
+import threading
+import urllib.request
+import uuid
+from collections import deque
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Optional
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.orm import Session
+
+from app.core.config import get_settings
+from app.models.outbox import OutboxEvent, OutboxStatus
+
+logger = logging.getLogger(__name__)
+
+
+def record_event(db: Session, event_type: str, aggregate_type: str, aggregate_id: int, payload: dict) -> OutboxEvent:
+    """Queue an event in the caller's transaction. Does not commit."""
+    event = OutboxEvent(
+        event_type=event_type,
+        aggregate_type=aggregate_type,
+        aggregate_id=aggregate_id,
+        # Money stays exact: Decimals are sent as strings
+        payload=json.dumps(jsonable_encoder(payload, custom_encoder={Decimal: str})),
+    )
+    db.add(event)
+    return event
+
+
+def to_message(event: OutboxEvent) -> dict:
+    """The JSON document delivered to sinks for one event."""
+    return {
+        "id": event.id,
+        "type": event.event_type,
+        "aggregate_type": event.aggregate_type,
+        "aggregate_id": event.aggregate_id,
+        "occurred_at": event.created_at.isoformat(),
+        "data": json.loads(event.payload),
+    }
+
+
+class EventSink:
+    """Destination for event batches. ``send`` raises to request a retry."""
+
+    def send(self, messages: list[dict]) -> None:
+        raise NotImplementedError
+
+
+class MemorySink(EventSink):
+    """Keeps delivered messages in a list; for tests and local development."""
+
+    def __init__(self):
+        self.messages: list[dict] = []
+        self.fail_next = 0  # number of upcoming batches to reject
+
+    def send(self, messages: list[dict]) -> None:
+        if self.fail_next:
+            self.fail_next -= 1
+            raise RuntimeError("MemorySink rejected the batch")
+        self.messages.extend(messages)
+
+
+class FileSink(EventSink):
+    """Appends one JSON line per event to a local file."""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def send(self, messages: list[dict]) -> None:
+        with open(self.path, "a", encoding="utf-8") as fh:
+            fh.write("".join(json.dumps(message) + "\n" for message in messages))
+
+
+class HttpSink(EventSink):
+    """POSTs each batch as ``{"events": [...]}``; any non-2xx status is a failure."""
+
+    def __init__(self, url: str, timeout: float = 10.0):
+        self.url = url
+        self.timeout = timeout
+
+    def send(self, messages: list[dict]) -> None:
+        request = urllib.request.Request(
+            self.url,
+            data=json.dumps({"events": messages}).encode("utf-8"),
+            headers={"Content-Type": "application/json"},
+            method="POST",
+        )
+        # urlopen raises HTTPError for 4xx/5xx responses
+        with urllib.request.urlopen(request, timeout=self.timeout):
+            pass
+
+
+def build_sink(kind: str, target: str = "") -> Optional[EventSink]:
+    """Sink for the OUTBOX_SINK setting, or None when dispatching is disabled."""
+    if kind == "none":
+        return None
+    if kind == "memory":
+        return MemorySink()
+    if kind == "file":
+        return FileSink(target or "outbox_events.jsonl")
+    if kind == "http":
+        if not target:
+            raise ValueError("OUTBOX_TARGET must be set to a URL for the http sink")
+        return HttpSink(target)
+    raise ValueError(f"Unknown outbox sink: {kind}")
+
+
+class DispatchMetrics:
+    """Delivery counters and recent lag (commit to delivery) for this process."""
+
+    def __init__(self, window: int = 1000):
+        self._lock = threading.Lock()
+        self._lags = deque(maxlen=window)
+        self.delivered = 0
+        self.failed_batches = 0
+        self.dead = 0
+        self.last_delivery_at: Optional[datetime] = None
+
+    def record_delivery(self, created: list[datetime], delivered_at: datetime) -> None:
+        with self._lock:
+            self._lags.extend((delivered_at - created_at).total_seconds() for created_at in created)
+            self.delivered += len(created)
+            self.last_delivery_at = delivered_at
+
+    def record_failure(self, dead: int) -> None:
+        with self._lock:
+            self.failed_batches += 1
+            self.dead += dead
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            lags = sorted(self._lags)
+            delivered, failed, dead, last = self.delivered, self.failed_batches, self.dead, self.last_delivery_at
+
+        def percentile(p: float) -> Optional[float]:
+            return round(lags[min(len(lags) - 1, int(p * len(lags)))], 3) if lags else None
+
+        return {
+            "delivered": delivered,
+            "failed_batches": failed,
+            "dead": dead,
+            "last_delivery_at": last,
+            "lag_seconds_p50": percentile(0.50),
+            "lag_seconds_p95": percentile(0.95),
+            "lag_seconds_max": round(lags[-1], 3) if lags else None,
+        }
+
+
+dispatch_metrics = DispatchMetrics()
+
+
+def supports_skip_locked(dialect) -> bool:
+    """Whether SELECT ... FOR UPDATE SKIP LOCKED is available."""
+    version = dialect.server_version_info or ()
+    if dialect.name == "postgresql":
+        return True
+    if dialect.name in ("mysql", "mariadb"):
+        return version >= ((10, 6) if getattr(dialect, "is_mariadb", False) else (8, 0, 1))
+    return False
+
+
+class OutboxDispatcher:
+    """Claims pending events in batches and delivers them through a sink.
+
+    Claiming stamps rows with a random token and pushes ``available_at``
+    out by ``lease_seconds`` in one short transaction, so delivery happens
+    without holding row locks and other dispatchers (other threads,
+    gunicorn workers or hosts) skip the batch. Where the database supports
+    it the candidate rows are also selected with SKIP LOCKED so concurrent
+    claimers never wait on each other.
+    """
+
+    def __init__(
+        self,
+        sink: EventSink,
+        batch_size: int = 100,
+        max_attempts: int = 10,
+        backoff_base_seconds: float = 5.0,
+        backoff_max_seconds: float = 3600.0,
+        lease_seconds: float = 60.0,
+        metrics: DispatchMetrics = dispatch_metrics,
+    ):
+        self.sink = sink
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.backoff_base_seconds = backoff_base_seconds
+        self.backoff_max_seconds = backoff_max_seconds
+        self.lease_seconds = lease_seconds
+        self.metrics = metrics
+
+    def backoff(self, attempts: int) -> timedelta:
+        """Delay before retrying an event that has failed ``attempts`` times."""
+        seconds = self.backoff_base_seconds * 2 ** (attempts - 1)
+        return timedelta(seconds=min(seconds, self.backoff_max_seconds))
+
+    def claim(self, db: Session) -> list[OutboxEvent]:
+        """Claim up to batch_size due events for this dispatcher."""
+        now = datetime.utcnow()
+        candidates = (
+            select(OutboxEvent.id)
+            .where(OutboxEvent.status == OutboxStatus.PENDING.value, OutboxEvent.available_at <= now)
+            .order_by(OutboxEvent.id)
+            .limit(self.batch_size)
+        )
+        if supports_skip_locked(db.get_bind().dialect):
+            candidates = candidates.with_for_update(skip_locked=True)
+        ids = db.execute(candidates).scalars().all()
+        if not ids:
+            db.commit()
+            return []
+
+        token = uuid.uuid4().hex
+        # Re-check the predicate so a row taken by a concurrent claimer
+        # (possible without SKIP LOCKED) is not claimed twice
+        db.execute(
+            update(OutboxEvent)
+            .where(
+                OutboxEvent.id.in_(ids),
+                OutboxEvent.status == OutboxStatus.PENDING.value,
+                OutboxEvent.available_at <= now,
+            )
+            .values(claim_token=token, available_at=now + timedelta(seconds=self.lease_seconds)),
+            execution_options={"synchronize_session": False}
+        )
+        db.commit()
+        return db.execute(
+            select(OutboxEvent).where(OutboxEvent.claim_token == token).order_by(OutboxEvent.id)
+        ).scalars().all()
+
+    def deliver(self, db: Session, events: list[OutboxEvent]) -> int:
+        """Send one claimed batch and record the outcome; returns events delivered."""
+        token = events[0].claim_token
+        try:
+            self.sink.send([to_message(event) for event in events])
+        except Exception as exc:
+            self._record_failure(db, events, exc)
+            return 0
+
+        delivered_at = datetime.utcnow()
+        db.execute(
+            update(OutboxEvent)
+            .where(OutboxEvent.claim_token == token)
+            .values(
+                status=OutboxStatus.DELIVERED.value,
+                delivered_at=delivered_at,
+                attempts=OutboxEvent.attempts + 1,
+                claim_token=None,
+                last_error=None,
+            ),
+            execution_options={"synchronize_session": False}
+        )
+        db.commit()
+        self.metrics.record_delivery([event.created_at for event in events], delivered_at)
+        return len(events)
+
+    def _record_failure(self, db: Session, events: list[OutboxEvent], exc: Exception) -> None:
+        logger.warning("Outbox delivery of %d events failed: %s", len(events), exc)
+        now = datetime.utcnow()
+        dead = 0
+        for event in events:
+            event.attempts += 1
+            event.last_error = f"{type(exc).__name__}: {exc}"[:2000]
+            event.claim_token = None
+            if event.attempts >= self.max_attempts:
+                event.status = OutboxStatus.DEAD.value
+                dead += 1
+            else:
+                event.available_at = now + self.backoff(event.attempts)
+        db.commit()
+        self.metrics.record_failure(dead)
+
+    def dispatch(self, db: Session, max_batches: Optional[int] = None) -> int:
+        """Deliver due events until none are left (or max_batches); returns events delivered."""
+        delivered = 0
+        batches = 0
+        while max_batches is None or batches < max_batches:
+            events = self.claim(db)
+            if not events:
+                break
+            batches += 1
+            sent = self.deliver(db, events)
+            delivered += sent
+            if not sent or len(events) < self.batch_size:
+                break
+        return delivered
+
+
+def build_dispatcher() -> Optional[OutboxDispatcher]:
+    """Dispatcher configured from settings, or None when OUTBOX_SINK is "none"."""
+    settings = get_settings()
+    sink = build_sink(settings.outbox_sink, settings.outbox_target)
+    if sink is None:
+        return None
+    return OutboxDispatcher(
+        sink,
+        batch_size=settings.outbox_batch_size,
+        max_attempts=settings.outbox_max_attempts,
+    )
+
+
+def _delete_events(db: Session, batch_size: int, *criteria) -> int:
+    total = 0
+    while True:
+        ids = db.execute(select(OutboxEvent.id).where(*criteria).limit(batch_size)).scalars().all()
+        if not ids:
+            return total
+        db.execute(delete(OutboxEvent).where(OutboxEvent.id.in_(ids)))
+        db.commit()
+        total += len(ids)
+
+
+def purge_old_events(
+    db: Session,
+    retention_hours: Optional[int] = None,
+    pending_retention_hours: Optional[int] = None,
+    batch_size: int = 1000,
+) -> int:
+    """Delete old delivered and never-dispatched events in batches; returns the count.
+
+    Delivered events go after ``OUTBOX_RETENTION_HOURS``. Pending events
+    are kept until delivered. ``OUTBOX_PENDING_RETENTION_HOURS`` expires
+    them too, for deployments that run no ``dispatch_outbox.py`` at all,
+    where pending events only feed the live stream. It is off by default:
+    this process cannot tell whether a dispatcher runs elsewhere, and one
+    that is down must find its backlog intact. Dead events are kept for
+    inspection until handled by hand.
+    """
+    settings = get_settings()
+    if retention_hours is None:
+        retention_hours = settings.outbox_retention_hours
+    if pending_retention_hours is None:
+        pending_retention_hours = settings.outbox_pending_retention_hours
+    now = datetime.utcnow()
+    total = _delete_events(
+        db, batch_size,
+        OutboxEvent.status == OutboxStatus.DELIVERED.value,
+        OutboxEvent.delivered_at < now - timedelta(hours=retention_hours),
+    )
+    if pending_retention_hours > 0:
+        expired = _delete_events(
+            db, batch_size,
+            OutboxEvent.status == OutboxStatus.PENDING.value,
+            OutboxEvent.created_at < now - timedelta(hours=pending_retention_hours),
+        )
+        if expired:
+            logger.warning("Expired %d outbox events that were never dispatched", expired)
+        total += expired
+    return total
+
+
+def backlog_stats(db: Session) -> dict:
+    """Pending and dead counts and the age of the oldest undelivered event."""
+    rows = dict(
+        db.execute(
+            select(OutboxEvent.status, func.count(OutboxEvent.id))
+            .where(OutboxEvent.status != OutboxStatus.DELIVERED.value)
+            .group_by(OutboxEvent.status)
+        ).all()
+    )
+    oldest = db.execute(
+        select(func.min(OutboxEvent.created_at)).where(OutboxEvent.status == OutboxStatus.PENDING.value)
+    ).scalar()
+    return {
+        "pending": rows.get(OutboxStatus.PENDING.value, 0),
+        "dead": rows.get(OutboxStatus.DEAD.value, 0),
+        "oldest_pending_age_seconds": (
+            round((datetime.utcnow() - oldest).total_seconds(), 3) if oldest else None
+        ),
+    }
@@ -0,0 +1,74 @@
+"""Minimal PDF writer for fixed-width text documents.
+
+Statements and invoices are columns of text, so a monospaced page
+layout is all they need; this avoids a rendering dependency and keeps
+the output byte-for-byte reproducible. Pages are A4, set in Courier,
+with each content stream Flate-compressed.
+"""
+import zlib
+
+PAGE_WIDTH = 595
+PAGE_HEIGHT = 842
+MARGIN = 40
+FONT_SIZE = 9
+LEADING = 11
+# Courier glyphs are 0.6 em wide
+LINE_WIDTH = int((PAGE_WIDTH - 2 * MARGIN) / (FONT_SIZE * 0.6))
+LINES_PER_PAGE = int((PAGE_HEIGHT - 2 * MARGIN) / LEADING)
+
+
+def _escape(line: str) -> bytes:
+    text = line[:LINE_WIDTH].encode("latin-1", "replace")
+    return text.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)")
+
+
+def paginate(lines: list[str], footer: str = "") -> list[list[str]]:
+    """Split lines into pages, appending "footer  Page n of N" to each."""
+    body = LINES_PER_PAGE - 2
+    chunks = [lines[i:i + body] for i in range(0, len(lines), body)] or [[]]
+    return [
+        chunk + [""] * (body - len(chunk)) + ["", f"{footer}  Page {n} of {len(chunks)}".strip()]
+        for n, chunk in enumerate(chunks, 1)
+    ]
+
+
+def render_text_pdf(pages: list[list[str]], title: str = "") -> bytes:
+    """Render pages of text lines into a PDF document."""
+    objects: list[bytes] = []
+
+    def add(body: bytes) -> int:
+        objects.append(body)
+        return len(objects)
+
+    catalog = add(b"")  # filled in once the page tree exists
+    page_tree = add(b"")
+    font = add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Courier /Encoding /WinAnsiEncoding >>")
+    page_ids = []
+    for lines in pages:
+        stream = b"BT /F1 %d Tf %d TL %d %d Td " % (FONT_SIZE, LEADING, MARGIN, PAGE_HEIGHT - MARGIN)
+        stream += b"".join(b"(" + _escape(line) + b") Tj T* " for line in lines) + b"ET"
+        data = zlib.compress(stream)
+        content = add(b"<< /Length %d /Filter /FlateDecode >>\nstream\n" % len(data) + data + b"\nendstream")
+        page_ids.append(add(
+            b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 %d %d] /Contents %d 0 R "
+            b"/Resources << /Font << /F1 %d 0 R >> >> >>"
+            % (page_tree, PAGE_WIDTH, PAGE_HEIGHT, content, font)
+        ))
+    objects[catalog - 1] = b"<< /Type /Catalog /Pages %d 0 R >>" % page_tree
+    objects[page_tree - 1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (
+        b" ".join(b"%d 0 R" % page for page in page_ids), len(page_ids)
+    )
+    info = add(b"<< /Title (" + _escape(title) + b") /Producer (HMS) >>")
+
+    out = bytearray(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root %d 0 R /Info %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (
+        len(objects) + 1, catalog, info, xref
+    )
+    return bytes(out)
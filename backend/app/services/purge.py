@@ -0,0 +1,143 @@
+"""Hard purge of soft-deleted rows past their retention period.
+
+Dependent rows are removed in bounded batches, each in its own short
+transaction, so purging a patient or doctor with a long history never
+loads that history into memory or holds locks for long. Users who still
+authored clinical rows that belong to other patients are anonymized
+instead of removed.
+"""
+import logging
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, or_, select, update
+from sqlalchemy.orm import Session
+
+from app.core.config import get_settings
+from app.models.aging import ArAgingBalance
+from app.models.appointment import Appointment, AppointmentSlot
+from app.models.billing import Bill, Payment
+from app.models.doctor import Doctor
+from app.models.medical_record import MedicalRecord, Prescription
+from app.models.patient import Patient
+from app.models.user import User
+from app.models.waitlist import WaitlistEntry, WaitlistWindow
+
+logger = logging.getLogger(__name__)
+
+ANONYMIZED_EMAIL_DOMAIN = "purged.invalid"
+
+INCLUDE_DELETED = {"include_deleted": True}
+
+
+def _delete_in_batches(db: Session, model, id_query, batch_size: int) -> int:
+    """Delete rows whose ids come from id_query, batch_size at a time."""
+    total = 0
+    while True:
+        ids = db.execute(id_query.limit(batch_size), execution_options=INCLUDE_DELETED).scalars().all()
+        if not ids:
+            return total
+        db.execute(delete(model).where(model.id.in_(ids)))
+        db.commit()
+        total += len(ids)
+
+
+def purge_patient(db: Session, patient_id: int, batch_size: int) -> int:
+    """Remove a patient and everything hanging off it; returns rows deleted."""
+    steps = [
+        (Payment, select(Payment.id).join(Bill, Payment.bill_id == Bill.id)
+            .where(Bill.patient_id == patient_id)),
+        (Bill, select(Bill.id).where(Bill.patient_id == patient_id)),
+        (Prescription, select(Prescription.id)
+            .join(MedicalRecord, Prescription.medical_record_id == MedicalRecord.id)
+            .where(MedicalRecord.patient_id == patient_id)),
+        (MedicalRecord, select(MedicalRecord.id).where(MedicalRecord.patient_id == patient_id)),
+        (WaitlistWindow, select(WaitlistWindow.id)
+            .join(WaitlistEntry, WaitlistWindow.entry_id == WaitlistEntry.id)
+            .where(WaitlistEntry.patient_id == patient_id)),
+        (WaitlistEntry, select(WaitlistEntry.id).where(WaitlistEntry.patient_id == patient_id)),
+        (AppointmentSlot, select(AppointmentSlot.id)
+            .join(Appointment, AppointmentSlot.appointment_id == Appointment.id)
+            .where(Appointment.patient_id == patient_id)),
+        (Appointment, select(Appointment.id).where(Appointment.patient_id == patient_id)),
+    ]
+    total = sum(_delete_in_batches(db, model, query, batch_size) for model, query in steps)
+
+    db.execute(delete(ArAgingBalance).where(ArAgingBalance.patient_id == patient_id))
+    db.execute(delete(Patient).where(Patient.id == patient_id))
+    db.commit()
+    return total + 1
+
+
+def purge_user(db: Session, user_id: int) -> str:
+    """Delete a user, or anonymize it if clinical rows still reference it."""
+    db.execute(delete(Doctor).where(Doctor.user_id == user_id))
+
+    referenced = db.execute(
+        select(Appointment.id).where(Appointment.doctor_id == user_id).limit(1)
+    ).first() or db.execute(
+        select(MedicalRecord.id).where(MedicalRecord.doctor_id == user_id).limit(1)
+    ).first() or db.execute(
+        select(WaitlistEntry.id).where(
+            or_(WaitlistEntry.doctor_id == user_id, WaitlistEntry.offered_doctor_id == user_id)
+        ).limit(1)
+    ).first()
+
+    if referenced:
+        db.execute(
+            update(User).where(User.id == user_id).values(
+                email=f"user-{user_id}@{ANONYMIZED_EMAIL_DOMAIN}",
+                username=f"purged-user-{user_id}",
+                full_name="Purged user",
+                hashed_password="",
+                is_active=False
+            ),
+            execution_options=INCLUDE_DELETED
+        )
+        outcome = "anonymized"
+    else:
+        db.execute(delete(User).where(User.id == user_id))
+        outcome = "deleted"
+
+    db.commit()
+    return outcome
+
+
+def run_purge(db: Session, retention_days: int = None, batch_size: int = None) -> dict:
+    """Purge everything soft-deleted more than retention_days ago."""
+    settings = get_settings()
+    retention_days = settings.soft_delete_retention_days if retention_days is None else retention_days
+    batch_size = batch_size or settings.purge_batch_size
+    cutoff = datetime.utcnow() - timedelta(days=retention_days)
+
+    stats = {"patients": 0, "rows": 0, "doctors": 0, "users_deleted": 0, "users_anonymized": 0}
+
+    while True:
+        patient_ids = db.execute(
+            select(Patient.id).where(Patient.deleted_at < cutoff).limit(batch_size),
+            execution_options=INCLUDE_DELETED
+        ).scalars().all()
+        if not patient_ids:
+            break
+        for patient_id in patient_ids:
+            stats["rows"] += purge_patient(db, patient_id, batch_size)
+            stats["patients"] += 1
+
+    stats["doctors"] = _delete_in_batches(
+        db, Doctor, select(Doctor.id).where(Doctor.deleted_at < cutoff), batch_size
+    )
+
+    while True:
+        user_ids = db.execute(
+            select(User.id).where(
+                User.deleted_at < cutoff,
+                ~User.email.endswith(f"@{ANONYMIZED_EMAIL_DOMAIN}")
+            ).limit(batch_size),
+            execution_options=INCLUDE_DELETED
+        ).scalars().all()
+        if not user_ids:
+            break
+        for user_id in user_ids:
+            stats[f"users_{purge_user(db, user_id)}"] += 1
+
+    logger.info("Purge finished: %s", stats)
+    return stats
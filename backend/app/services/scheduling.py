@@ -0,0 +1,126 @@
+"""Slot reservations that keep a doctor from being double-booked.
+
+Every active appointment owns one ``appointment_slots`` row keyed by
+(doctor_id, slot_start), where slot_start is the appointment time
+rounded down to ``APPOINTMENT_SLOT_MINUTES``. The unique constraint on
+that key settles concurrent bookings inside the database: the losing
+INSERT fails in the same round trip that would have stored it, with no
+SELECT beforehand and no table lock. Cancelled appointments release
+their slot so it can be booked again.
+"""
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, insert, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.config import get_settings
+from app.models.appointment import Appointment, AppointmentSlot, AppointmentStatus
+
+
+SLOT_KEY = "uq_appointment_slots_doctor_slot"
+# SQLite names the columns instead of the constraint
+SLOT_KEY_COLUMNS = "appointment_slots.doctor_id, appointment_slots.slot_start"
+# How MySQL, PostgreSQL and SQLite report a foreign key violation
+FOREIGN_KEY_MESSAGES = (
+    "a foreign key constraint fails", "violates foreign key constraint", "FOREIGN KEY constraint failed"
+)
+
+
+class SlotTaken(Exception):
+    """The doctor already has an active appointment in the requested slot."""
+
+
+class MissingReference(Exception):
+    """The appointment's patient or doctor does not exist."""
+
+
+def _is_slot_conflict(error: IntegrityError) -> bool:
+    """Whether error is a duplicate on the (doctor_id, slot_start) key, not some other constraint."""
+    message = str(error.orig)
+    return SLOT_KEY in message or SLOT_KEY_COLUMNS in message
+
+
+def _is_missing_reference(error: IntegrityError) -> bool:
+    message = str(error.orig)
+    return any(text in message for text in FOREIGN_KEY_MESSAGES)
+
+
+def _translate(error: IntegrityError) -> Exception:
+    """SlotTaken or MissingReference for the failures callers answer with a 4xx, else error itself."""
+    if _is_slot_conflict(error):
+        return SlotTaken()
+    if _is_missing_reference(error):
+        return MissingReference()
+    return error
+
+
+def slot_start(when: datetime) -> datetime:
+    """Start of the slot containing when."""
+    minutes = get_settings().appointment_slot_minutes
+    midnight = when.replace(hour=0, minute=0, second=0, microsecond=0)
+    elapsed = int((when - midnight).total_seconds() // 60)
+    return midnight + timedelta(minutes=elapsed - elapsed % minutes)
+
+
+def event_payload(appointment: Appointment) -> dict:
+    """Outbox payload for appointment.* events."""
+    return {
+        "appointment_id": appointment.id,
+        "patient_id": appointment.patient_id,
+        "doctor_id": appointment.doctor_id,
+        "appointment_date": appointment.appointment_date,
+        "status": appointment.status or AppointmentStatus.SCHEDULED,
+    }
+
+
+def holds_slot(appointment: Appointment) -> bool:
+    return appointment.status != AppointmentStatus.CANCELLED
+
+
+def _flush(db: Session) -> None:
+    try:
+        db.flush()
+    except IntegrityError as error:
+        db.rollback()
+        raise _translate(error)
+
+
+def book(db: Session, appointment: Appointment) -> None:
+    """Add a new appointment together with its slot; raises SlotTaken or MissingReference.
+
+    Both rows are flushed together, so a conflict rolls back the
+    appointment as well. An unknown patient or doctor fails the same
+    flush on its foreign key, so it costs no lookup beforehand.
+    """
+    db.add(appointment)
+    if holds_slot(appointment):
+        appointment.slot = AppointmentSlot(
+            doctor_id=appointment.doctor_id, slot_start=slot_start(appointment.appointment_date)
+        )
+    _flush(db)
+
+
+def sync_slot(db: Session, appointment: Appointment) -> None:
+    """Move or release an updated appointment's slot; raises SlotTaken.
+
+    Runs inside the update's transaction, so a conflict undoes the update.
+    """
+    if not holds_slot(appointment):
+        db.execute(delete(AppointmentSlot).where(AppointmentSlot.appointment_id == appointment.id))
+        return
+    start = slot_start(appointment.appointment_date)
+    try:
+        moved = db.execute(
+            update(AppointmentSlot)
+            .where(AppointmentSlot.appointment_id == appointment.id)
+            .values(slot_start=start, doctor_id=appointment.doctor_id)
+        ).rowcount
+        if not moved:
+            # Re-activated after a cancellation
+            db.execute(insert(AppointmentSlot).values(
+                doctor_id=appointment.doctor_id, slot_start=start, appointment_id=appointment.id
+            ))
+    except IntegrityError as error:
+        db.rollback()
+        raise _translate(error)
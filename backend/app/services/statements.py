@@ -0,0 +1,285 @@
+"""Month-end patient statements rendered to PDF in a process pool.
+
+The parent process streams patients by primary key in chunks, fetches
+each chunk's bills and payments with one query apiece, and hands the
+chunk to a ``ProcessPoolExecutor`` as plain tuples. Workers format and
+write the PDFs themselves, so only a count comes back, and the parent
+keeps at most two chunks per worker in flight while it reads ahead.
+
+Progress is written to ``progress.json`` in the period's directory after
+every chunk. Its ``resume_after`` is the highest patient id below which
+every chunk has finished; a rerun of the same period continues from
+there, and statements are simply overwritten if a chunk was half done.
+"""
+import json
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import datetime
+from decimal import Decimal
+from typing import Callable, Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.core.config import get_settings
+from app.models.billing import Bill, BillStatus, Payment, PaymentStatus
+from app.models.patient import Patient
+from app.services.pdf import LINE_WIDTH, paginate, render_text_pdf
+
+PROGRESS_FILE = "progress.json"
+
+
+def period_bounds(period: str) -> tuple[datetime, datetime]:
+    """[start, end) of a YYYY-MM statement period."""
+    start = datetime.strptime(period, "%Y-%m")
+    end = start.replace(year=start.year + start.month // 12, month=start.month % 12 + 1)
+    return start, end
+
+
+def period_dir(output_dir: str, period: str) -> str:
+    return os.path.join(output_dir, period)
+
+
+def statement_path(output_dir: str, period: str, patient_id: int) -> str:
+    """Where a patient's statement lives; sharded so no directory gets huge."""
+    return os.path.join(
+        period_dir(output_dir, period), f"{patient_id // 1000:04d}", f"statement-{period}-{patient_id}.pdf"
+    )
+
+
+def read_progress(output_dir: str, period: str) -> Optional[dict]:
+    try:
+        with open(os.path.join(period_dir(output_dir, period), PROGRESS_FILE), encoding="utf-8") as fh:
+            return json.load(fh)
+    except FileNotFoundError:
+        return None
+
+
+def _write_progress(output_dir: str, period: str, progress: dict) -> None:
+    path = os.path.join(period_dir(output_dir, period), PROGRESS_FILE)
+    with open(path + ".tmp", "w", encoding="utf-8") as fh:
+        json.dump(progress, fh, indent=2, default=str)
+    os.replace(path + ".tmp", path)
+
+
+# -- rendering (runs in pool workers) -----------------------------------
+
+def _money(value) -> str:
+    return f"{Decimal(value):,.2f}"
+
+
+def format_statement(period: str, patient: tuple, bills: list[tuple], payments: list[tuple]) -> list[str]:
+    """Lines of one patient's statement.
+
+    patient is (id, first_name, last_name, address, city, state, zip_code);
+    bills are (id, bill_number, issue_date, due_date, total_amount, status);
+    payments are (bill_id, payment_date, amount, payment_method).
+    """
+    patient_id, first_name, last_name, address, city, state, zip_code = patient
+    start, end = period_bounds(period)
+    numbers = {bill[0]: bill[1] for bill in bills}
+    paid_by_bill: dict[int, Decimal] = {}
+    for bill_id, _, amount, _ in payments:
+        paid_by_bill[bill_id] = paid_by_bill.get(bill_id, Decimal(0)) + Decimal(amount)
+
+    lines = [
+        "Healthcare Management System".ljust(LINE_WIDTH - 20) + "PATIENT STATEMENT".rjust(20),
+        f"Statement period: {period}".ljust(LINE_WIDTH - 20) + f"Patient #{patient_id}".rjust(20),
+        "",
+        f"{first_name} {last_name}",
+    ]
+    if address:
+        lines.append(address)
+    locality = " ".join(part for part in (city, state, zip_code) if part)
+    if locality:
+        lines.append(locality)
+    lines += ["", "=" * LINE_WIDTH, "BILLS", ""]
+    lines.append(f"{'Bill number':<22}{'Issued':<12}{'Due':<12}{'Total':>12}{'Paid':>12}{'Balance':>12}  Status")
+    lines.append("-" * LINE_WIDTH)
+    total_balance = Decimal(0)
+    for bill_id, bill_number, issue_date, due_date, total_amount, status in bills:
+        paid = paid_by_bill.get(bill_id, Decimal(0))
+        balance = Decimal(total_amount) - paid
+        total_balance += balance
+        lines.append(
+            f"{bill_number:<22}{issue_date:%Y-%m-%d}  {due_date:%Y-%m-%d}  "
+            f"{_money(total_amount):>12}{_money(paid):>12}{_money(balance):>12}  {status}"
+        )
+
+    in_period = [payment for payment in payments if payment[1] >= start]
+    lines += ["", "PAYMENTS RECEIVED THIS PERIOD", ""]
+    lines.append(f"{'Date':<12}{'Bill number':<22}{'Method':<16}{'Amount':>12}")
+    lines.append("-" * LINE_WIDTH)
+    for bill_id, payment_date, amount, method in in_period:
+        lines.append(f"{payment_date:%Y-%m-%d}  {numbers[bill_id]:<22}{method:<16}{_money(amount):>12}")
+    if not in_period:
+        lines.append("No payments received.")
+    lines += [
+        "",
+        "=" * LINE_WIDTH,
+        f"{'BALANCE DUE AS OF ' + f'{end:%Y-%m-%d}':<{LINE_WIDTH - 14}}{_money(total_balance):>14}",
+    ]
+    return lines
+
+
+def render_chunk(output_dir: str, period: str, statements: list[tuple]) -> int:
+    """Render and write a chunk of statements; returns how many were written."""
+    written = 0
+    for patient, bills, payments in statements:
+        lines = format_statement(period, patient, bills, payments)
+        pdf = render_text_pdf(paginate(lines, f"Statement {period} - Patient #{patient[0]}"), f"Statement {period}")
+        path = statement_path(output_dir, period, patient[0])
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path + ".tmp", "wb") as fh:
+            fh.write(pdf)
+        os.replace(path + ".tmp", path)
+        written += 1
+    return written
+
+
+# -- orchestration (runs in the parent) ---------------------------------
+
+def fetch_chunk(db: Session, period: str, after_id: int, chunk_size: int) -> tuple[list[int], list[tuple]]:
+    """Next chunk of patients after after_id with their bills and payments.
+
+    Returns (patient ids scanned, statements); no ids means the end.
+    Patients without bills in the period get no statement.
+    """
+    _, end = period_bounds(period)
+    patients = db.execute(
+        select(Patient.id, Patient.first_name, Patient.last_name, Patient.address,
+               Patient.city, Patient.state, Patient.zip_code)
+        .where(Patient.id > after_id)
+        .order_by(Patient.id)
+        .limit(chunk_size)
+    ).all()
+    if not patients:
+        return [], []
+    ids = [patient.id for patient in patients]
+
+    bills_by_patient: dict[int, list[tuple]] = {}
+    for row in db.execute(
+        select(Bill.patient_id, Bill.id, Bill.bill_number, Bill.issue_date, Bill.due_date,
+               Bill.total_amount, Bill.status)
+        .where(Bill.patient_id.in_(ids), Bill.issue_date < end, Bill.status != BillStatus.CANCELLED)
+        .order_by(Bill.patient_id, Bill.issue_date, Bill.id)
+    ):
+        bills_by_patient.setdefault(row.patient_id, []).append(
+            (row.id, row.bill_number, row.issue_date, row.due_date, row.total_amount, row.status.value)
+        )
+
+    payments_by_patient: dict[int, list[tuple]] = {}
+    if bills_by_patient:
+        for row in db.execute(
+            select(Bill.patient_id, Payment.bill_id, Payment.payment_date, Payment.amount, Payment.payment_method)
+            .join(Bill, Bill.id == Payment.bill_id)
+            .where(
+                Bill.patient_id.in_(list(bills_by_patient)),
+                Bill.issue_date < end,
+                Bill.status != BillStatus.CANCELLED,
+                Payment.status == PaymentStatus.COMPLETED,
+                Payment.payment_date < end,
+            )
+            .order_by(Payment.payment_date, Payment.id)
+        ):
+            payments_by_patient.setdefault(row.patient_id, []).append(
+                (row.bill_id, row.payment_date, row.amount, row.payment_method)
+            )
+    db.rollback()
+
+    statements = [
+        (tuple(patient), bills_by_patient[patient.id], payments_by_patient.get(patient.id, []))
+        for patient in patients
+        if patient.id in bills_by_patient
+    ]
+    return ids, statements
+
+
+def generate_statements(
+    db: Session,
+    period: str,
+    output_dir: Optional[str] = None,
+    workers: Optional[int] = None,
+    chunk_size: Optional[int] = None,
+    restart: bool = False,
+    on_progress: Optional[Callable[[dict], None]] = None,
+) -> dict:
+    """Render every patient's statement for period; resumes an unfinished run.
+
+    workers=1 renders in this process (handy for tests and debugging).
+    """
+    settings = get_settings()
+    output_dir = output_dir or settings.statement_output_dir
+    workers = workers or settings.statement_workers or os.cpu_count() or 1
+    chunk_size = chunk_size or settings.statement_chunk_size
+    period_bounds(period)  # validate before touching the disk
+    os.makedirs(period_dir(output_dir, period), exist_ok=True)
+
+    progress = None if restart else read_progress(output_dir, period)
+    if progress and progress["status"] == "completed":
+        return progress
+    if progress is None:
+        progress = {
+            "period": period,
+            "status": "running",
+            "total_patients": db.execute(select(func.count(Patient.id))).scalar(),
+            "patients_scanned": 0,
+            "statements_written": 0,
+            "resume_after": 0,
+            "started_at": datetime.utcnow(),
+        }
+    progress.update(status="running", workers=workers, updated_at=datetime.utcnow())
+    _write_progress(output_dir, period, progress)
+    started = time.monotonic()
+    written_at_start = progress["statements_written"]
+
+    # One entry per chunk in patient order: [last_id, scanned, written or None]
+    chunks: list[list] = []
+
+    def chunk_done(chunk: list, written: int) -> None:
+        chunk[2] = written
+        # The checkpoint only moves over the finished prefix of chunks
+        while chunks and chunks[0][2] is not None:
+            last_id, scanned, done = chunks.pop(0)
+            progress["resume_after"] = last_id
+            progress["patients_scanned"] += scanned
+            progress["statements_written"] += done
+        elapsed = time.monotonic() - started
+        progress["statements_per_second"] = round(
+            (progress["statements_written"] - written_at_start) / elapsed, 1
+        ) if elapsed else None
+        progress["updated_at"] = datetime.utcnow()
+        _write_progress(output_dir, period, progress)
+        if on_progress:
+            on_progress(progress)
+
+    after_id = progress["resume_after"]
+    executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        in_flight = {}
+        while True:
+            ids, statements = fetch_chunk(db, period, after_id, chunk_size)
+            if not ids:
+                break
+            after_id = ids[-1]
+            chunk = [after_id, len(ids), None]
+            chunks.append(chunk)
+            if executor is None:
+                chunk_done(chunk, render_chunk(output_dir, period, statements))
+                continue
+            in_flight[executor.submit(render_chunk, output_dir, period, statements)] = chunk
+            # Read ahead, but only so far: bounded memory in the parent
+            while len(in_flight) >= 2 * workers:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    chunk_done(in_flight.pop(future), future.result())
+        for future in list(in_flight):
+            chunk_done(in_flight.pop(future), future.result())
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+
+    progress.update(status="completed", finished_at=datetime.utcnow())
+    _write_progress(output_dir, period, progress)
+    return progress
@@ -0,0 +1,212 @@
+"""Offer slots freed by cancellations to the best waiting patient.
+
+Waiting entries are indexed in memory, one tree per doctor and one per
+specialization. Each tree is a segment tree over slot numbers (time in
+``APPOINTMENT_SLOT_MINUTES`` steps since 1970). An entry's windows are
+split into the O(log T) nodes that exactly cover the slots the windows
+fully contain. Each node keeps a heap of (-priority, entry id). The
+best entry for a freed slot is the top of the heaps on the path from
+that slot's leaf to the root. That is one walk of ``DEPTH`` nodes with
+a heap peek at each, however long the waitlist is.
+
+Heaps are cleaned lazily: entries that stop waiting are dropped when
+they surface at the top. Before matching, the index reads only the
+entries changed since its last refresh, so entries added through other
+worker processes are picked up. The offer itself is claimed with a
+conditional UPDATE. If another process got there first, the next best
+entry is tried.
+"""
+import heapq
+import threading
+from datetime import datetime, timedelta
+from typing import Iterable, Optional
+
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+from app.core.config import get_settings
+from app.models.appointment import AppointmentSlot
+from app.models.doctor import Doctor
+from app.models.waitlist import WaitlistEntry, WaitlistStatus
+from app.services.outbox import record_event
+
+DEPTH = 26  # slot numbers below 2**26: over a century even with 1-minute slots
+LEAVES = 1 << DEPTH
+EPOCH = datetime(1970, 1, 1)
+REFRESH_OVERLAP = timedelta(seconds=60)  # tolerates clock skew between app servers
+
+
+def _slot_seconds() -> int:
+    return get_settings().appointment_slot_minutes * 60
+
+
+def slot_number(when: datetime) -> int:
+    return int((when - EPOCH).total_seconds()) // _slot_seconds()
+
+
+def window_slots(start: datetime, end: datetime) -> tuple[int, int]:
+    """[first, last) slot numbers that lie entirely inside the window."""
+    seconds = _slot_seconds()
+    return -(-int((start - EPOCH).total_seconds()) // seconds), int((end - EPOCH).total_seconds()) // seconds
+
+
+class SlotIntervalTree:
+    """Segment tree over slot numbers whose nodes hold priority heaps.
+
+    Nodes use the implicit layout of an array-backed segment tree (root
+    1, children 2i and 2i+1, leaves from LEAVES) but are only created
+    when something is stored in them.
+    """
+
+    def __init__(self):
+        self._heaps: dict[int, list[tuple[int, int]]] = {}
+
+    def insert(self, first: int, last: int, item: tuple[int, int]) -> int:
+        """Store item on the nodes covering slots [first, last); returns nodes used."""
+        used = 0
+        low, high = first + LEAVES, last + LEAVES
+        while low < high:
+            if low & 1:
+                heapq.heappush(self._heaps.setdefault(low, []), item)
+                low += 1
+                used += 1
+            if high & 1:
+                high -= 1
+                heapq.heappush(self._heaps.setdefault(high, []), item)
+                used += 1
+            low >>= 1
+            high >>= 1
+        return used
+
+    def best(self, slot: int, waiting: dict, exclude: set[int]) -> Optional[tuple[int, int]]:
+        """Smallest item whose intervals contain slot, among waiting entries not in exclude."""
+        best = None
+        node = slot + LEAVES
+        while node:
+            heap = self._heaps.get(node)
+            if heap:
+                skipped = []
+                while heap and (heap[0][1] not in waiting or heap[0][1] in exclude):
+                    item = heapq.heappop(heap)
+                    if item[1] in waiting:
+                        skipped.append(item)  # excluded for this slot only
+                top = heap[0] if heap else None
+                for item in skipped:
+                    heapq.heappush(heap, item)
+                if top is not None and (best is None or top < best):
+                    best = top
+                if not heap:
+                    del self._heaps[node]
+            node >>= 1
+        return best
+
+
+class WaitlistMatcher:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        """Forget the index; the next match reloads it from the database."""
+        self._by_doctor: dict[int, SlotIntervalTree] = {}
+        self._by_specialization: dict[str, SlotIntervalTree] = {}
+        self._waiting: dict[int, int] = {}  # entry id -> priority
+        self._stored = 0  # heap items, live or not
+        self._refreshed_at: Optional[datetime] = None
+
+    def refresh(self, db: Session) -> None:
+        """Load entries changed since the last refresh (all waiting ones the first time)."""
+        now = datetime.utcnow()
+        if self._stored > 4 * max(len(self._waiting), 1000):
+            # Mostly dead heap items (offered, booked or expired): rebuild
+            self.reset()
+        query = select(WaitlistEntry)
+        if self._refreshed_at is None:
+            query = query.where(WaitlistEntry.status == WaitlistStatus.WAITING)
+        else:
+            query = query.where(WaitlistEntry.updated_at >= self._refreshed_at - REFRESH_OVERLAP)
+        self._refreshed_at = now
+        for entry in db.execute(query).scalars():
+            if entry.status == WaitlistStatus.WAITING:
+                self._add(entry, now)
+            else:
+                self._waiting.pop(entry.id, None)
+
+    def _add(self, entry: WaitlistEntry, now: datetime) -> None:
+        if entry.id in self._waiting:
+            return
+        self._waiting[entry.id] = entry.priority
+        if entry.doctor_id is not None:
+            tree = self._by_doctor.setdefault(entry.doctor_id, SlotIntervalTree())
+        else:
+            tree = self._by_specialization.setdefault(entry.specialization.lower(), SlotIntervalTree())
+        for window in entry.windows:
+            if window.window_end > now:
+                first, last = window_slots(window.window_start, window.window_end)
+                if first < last:
+                    self._stored += tree.insert(first, last, (-entry.priority, entry.id))
+
+    def match(
+        self, db: Session, doctor_id: int, slot_start: datetime, exclude: Iterable[int] = ()
+    ) -> Optional[WaitlistEntry]:
+        """Offer a free slot to the best waiting entry; returns it, or None.
+
+        The offer is written in the caller's transaction, with a
+        ``waitlist.offered`` event for notification.
+        """
+        now = datetime.utcnow()
+        if slot_start < now:
+            return None
+        if db.execute(select(AppointmentSlot.id).where(
+            AppointmentSlot.doctor_id == doctor_id, AppointmentSlot.slot_start == slot_start
+        )).first():
+            return None
+        specialization = db.execute(
+            select(Doctor.specialization).where(Doctor.user_id == doctor_id)
+        ).scalar()
+        slot = slot_number(slot_start)
+        excluded = set(exclude)
+
+        with self._lock:
+            self.refresh(db)
+        while True:
+            with self._lock:
+                trees = [self._by_doctor.get(doctor_id)]
+                if specialization:
+                    trees.append(self._by_specialization.get(specialization.lower()))
+                candidates = [tree.best(slot, self._waiting, excluded) for tree in trees if tree]
+                candidates = [candidate for candidate in candidates if candidate]
+            if not candidates:
+                return None
+            _, entry_id = min(candidates)
+            claimed = db.execute(
+                update(WaitlistEntry)
+                .where(WaitlistEntry.id == entry_id, WaitlistEntry.status == WaitlistStatus.WAITING)
+                .values(
+                    status=WaitlistStatus.OFFERED,
+                    offered_doctor_id=doctor_id,
+                    offered_slot_start=slot_start,
+                    offered_at=now,
+                ),
+                execution_options={"synchronize_session": False}
+            ).rowcount
+            if claimed:
+                entry = db.get(WaitlistEntry, entry_id, populate_existing=True)
+                record_event(db, "waitlist.offered", "waitlist_entry", entry.id, {
+                    "waitlist_entry_id": entry.id,
+                    "patient_id": entry.patient_id,
+                    "doctor_id": doctor_id,
+                    "slot_start": slot_start,
+                    "priority": entry.priority,
+                })
+                return entry
+            # Offered or withdrawn through another process since our refresh
+            with self._lock:
+                self._waiting.pop(entry_id, None)
+
+    @property
+    def waiting_count(self) -> int:
+        return len(self._waiting)
+
+
+waitlist_matcher = WaitlistMatcher()
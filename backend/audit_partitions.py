@@ -0,0 +1,19 @@
+#!/usr/bin/env python
+"""Add monthly partitions to the PHI access audit log ahead of time (MySQL).
+
+Run monthly from cron. Without it rows land in the catch-all pmax
+partition, which still works but is not pruned by month.
+"""
+import argparse
+import sys
+sys.path.insert(0, '.')
+
+from app.db.session import engine
+from app.services.audit import ensure_month_partitions
+
+parser = argparse.ArgumentParser(description=__doc__)
+parser.add_argument("--months-ahead", type=int, default=3, help="Partitions to keep ready past the current month")
+args = parser.parse_args()
+
+added = ensure_month_partitions(engine, args.months_ahead)
+print(f"✓ Added partitions: {', '.join(added)}" if added else "✓ Partitions already in place")
@@ -0,0 +1,122 @@
+#!/usr/bin/env python
+"""CPU time and peak memory of a read-only page: ORM objects vs Core rows.
+
+For pages of 100 and 10,000 patients, and of bills with their payments,
+compares the previous list path (``db.query(Model)...all()`` with
+``selectinload`` for nested lists, read back by pydantic attribute by
+attribute) with the one the list routes use now (``FieldSet.select()``
+and ``fetch()``: Core row mappings, one IN query per nested list). Both
+serialize to the same JSON bytes. Each run uses a fresh session, as a
+request would. Memory is the tracemalloc peak for one page.
+
+Usage (from backend/):
+    DATABASE_URL=sqlite:///bench.db python benchmarks/bench_hydration.py
+"""
+import sys
+import time
+import tracemalloc
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy import func, insert, select
+from sqlalchemy.orm import selectinload
+
+from app.db.base import Base
+from app.db.session import SessionLocal, engine
+from app.core.fieldsets import FieldSet
+from app.core.responses import dump_json
+from app.models import Patient, Bill, Payment
+from app.schemas.billing import BillResponse
+from app.schemas.patient import PatientResponse
+
+PAGE_SIZES = (100, 10_000)
+RUNS = {100: 200, 10_000: 5}
+
+
+def seed(rows: int) -> None:
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        missing = rows - db.execute(select(func.count(Bill.id))).scalar()
+        if missing <= 0:
+            return
+        tag = datetime.utcnow().strftime("%H%M%S%f")
+        now = datetime.utcnow()
+        patient_ids = [
+            db.execute(insert(Patient).values(
+                first_name=f"Hydrate{i}", last_name="Patient", email=f"hydrate{tag}{i}@example.com",
+                date_of_birth=date(1980, 1, 1), gender="Female", address="1 Bench Street", city="Dhaka",
+                allergies="None known", created_at=now, updated_at=now
+            )).inserted_primary_key[0]
+            for i in range(missing)
+        ]
+        for i, patient_id in enumerate(patient_ids):
+            bill_id = db.execute(insert(Bill).values(
+                patient_id=patient_id, bill_number=f"HYD-{tag}-{i}", amount=100, tax=10, total_amount=110,
+                amount_paid=60, balance_due=50, due_date=now + timedelta(days=30), description="Consultation",
+                issue_date=now, created_at=now, updated_at=now
+            )).inserted_primary_key[0]
+            db.execute(insert(Payment), [
+                {"bill_id": bill_id, "amount": 30, "payment_method": "cash", "payment_date": now, "created_at": now}
+                for _ in range(2)
+            ])
+        db.commit()
+    finally:
+        db.close()
+
+
+def orm_patients(db, limit):
+    return dump_json(list[PatientResponse], db.query(Patient).limit(limit).all())
+
+
+def core_patients(db, limit):
+    fields = FieldSet.every(PatientResponse, Patient)
+    return dump_json(list[PatientResponse], fields.fetch(db, fields.select().limit(limit)))
+
+
+def orm_bills(db, limit):
+    return dump_json(list[BillResponse], db.query(Bill).options(selectinload(Bill.payments)).limit(limit).all())
+
+
+def core_bills(db, limit):
+    fields = FieldSet.every(BillResponse, Bill)
+    return dump_json(list[BillResponse], fields.fetch(db, fields.select().limit(limit)))
+
+
+def measure(page, limit):
+    runs = RUNS[limit]
+    started = time.process_time()
+    for _ in range(runs):
+        db = SessionLocal()
+        try:
+            page(db, limit)
+        finally:
+            db.close()
+    cpu_ms = (time.process_time() - started) * 1000 / runs
+
+    db = SessionLocal()
+    tracemalloc.start()
+    try:
+        body = page(db, limit)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+        db.close()
+    return cpu_ms, peak / 1024 / 1024, body
+
+
+def main():
+    seed(max(PAGE_SIZES))
+    print(f"{'page':<10} {'rows':>6} {'ORM ms':>8} {'Core ms':>8} {'ORM MiB':>8} {'Core MiB':>9}")
+    for name, orm, core in (("patients", orm_patients, core_patients), ("bills", orm_bills, core_bills)):
+        for limit in PAGE_SIZES:
+            orm_ms, orm_mib, orm_body = measure(orm, limit)
+            core_ms, core_mib, core_body = measure(core, limit)
+            assert orm_body == core_body, f"{name}: the two paths disagree"
+            print(f"{name:<10} {limit:>6} {orm_ms:>8.2f} {core_ms:>8.2f} {orm_mib:>8.2f} {core_mib:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+"""Requests per second for the list endpoints at 100 items per page.
+
+Seeds 100 rows per resource (bills with two payments each), then calls
+each list endpoint with ``limit=100`` in a loop. The response cache is
+switched off so every request runs the handler and serializes the page.
+
+Usage (from backend/):
+    DATABASE_URL=sqlite:///bench.db python benchmarks/bench_reads.py
+"""
+import os
+import sys
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+os.environ.setdefault("RESPONSE_CACHE_MAX_ENTRIES", "0")
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.db.session import SessionLocal
+from app.core.security import create_access_token, hash_password
+from app.models import Patient, Appointment, Bill, Payment, MedicalRecord, Doctor, User, RoleEnum
+
+ROWS = 100
+DURATION = 3.0  # seconds per endpoint
+
+
+def seed():
+    db = SessionLocal()
+    try:
+        if db.query(Patient).count() >= ROWS:
+            return
+        tag = datetime.utcnow().strftime("%H%M%S%f")
+        start = datetime.utcnow() + timedelta(days=30)
+        for i in range(ROWS):
+            user = User(
+                email=f"bench{tag}{i}@example.com", username=f"bench{tag}{i}", full_name=f"Doctor {i}",
+                hashed_password=hash_password("bench"), role=RoleEnum.DOCTOR
+            )
+            db.add(user)
+            db.flush()
+            db.add(Doctor(
+                user_id=user.id, specialization="General", license_number=f"LIC{tag}{i}",
+                phone="555-0100", bio="Bench doctor " * 10, office_hours="9-5"
+            ))
+            patient = Patient(
+                first_name=f"Bench{i}", last_name="Patient", email=f"patient{tag}{i}@example.com",
+                date_of_birth=date(1980, 1, 1), gender="Female", address="1 Bench Street",
+                city="Dhaka", allergies="None known"
+            )
+            db.add(patient)
+            db.flush()
+            appointment = Appointment(
+                patient_id=patient.id, doctor_id=user.id,
+                appointment_date=start + timedelta(minutes=15 * i), reason="Checkup"
+            )
+            db.add(appointment)
+            db.flush()
+            db.add(MedicalRecord(
+                patient_id=patient.id, doctor_id=user.id, appointment_id=appointment.id,
+                diagnosis="Seasonal allergy " * 5, treatment="Antihistamines " * 5
+            ))
+            bill = Bill(
+                patient_id=patient.id, appointment_id=appointment.id, bill_number=f"BENCH-{tag}-{i}",
+                amount=100, tax=10, total_amount=110, amount_paid=60, balance_due=50,
+                due_date=start, description="Consultation"
+            )
+            bill.payments = [
+                Payment(amount=30, payment_method="cash", transaction_id=f"T{tag}{i}{n}") for n in range(2)
+            ]
+            db.add(bill)
+        db.commit()
+    finally:
+        db.close()
+
+
+def main():
+    seed()
+    client = TestClient(app)
+    headers = {"Authorization": f"Bearer {create_access_token(data={'sub': '1', 'role': 'admin'})}"}
+    endpoints = [
+        "/api/v1/patients",
+        "/api/v1/doctors",
+        "/api/v1/users",
+        "/api/v1/appointments",
+        "/api/v1/billing/bills",
+        "/api/v1/medical-records",
+    ]
+    print(f"{'endpoint':<28} {'items':>6} {'req/s':>8} {'ms/req':>8}")
+    for path in endpoints:
+        url = f"{path}?limit={ROWS}"
+        response = client.get(url, headers=headers)
+        assert response.status_code == 200, response.text
+        items = len(response.json())
+        count = 0
+        started = time.perf_counter()
+        while time.perf_counter() - started < DURATION:
+            client.get(url, headers=headers)
+            count += 1
+        elapsed = time.perf_counter() - started
+        print(f"{path:<28} {items:>6} {count / elapsed:>8.1f} {elapsed * 1000 / count:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+#!/usr/bin/env python
+"""Round trips and latency per write endpoint.
+
+Runs each write endpoint of the API next to a copy of the previous
+handler (SELECT, setattr, commit, refresh on an expire-on-commit
+session) mounted on a side app with the same auth and response models,
+and counts the statements plus commits each request sends to the
+database.
+
+Usage (from backend/):
+    DATABASE_URL=sqlite:///bench.db python benchmarks/bench_writes.py
+"""
+import sys
+import time
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.main import app
+from app.db.session import engine
+from app.core.security import create_access_token, check_role
+from app.models import Patient, Appointment, Bill
+from app.schemas.patient import PatientCreate, PatientUpdate, PatientResponse
+from app.schemas.appointment import AppointmentUpdate, AppointmentResponse
+from app.schemas.billing import BillCreate, BillUpdate, BillResponse
+from app.services.ledger import to_money
+
+ITERATIONS = 200
+
+statements = []
+
+
+@event.listens_for(engine, "before_cursor_execute")
+def _count_statement(conn, cursor, statement, parameters, context, executemany):
+    statements.append(statement)
+
+
+@event.listens_for(engine, "commit")
+def _count_commit(conn):
+    statements.append("COMMIT")
+
+
+# Previous write path, kept here only as the benchmark baseline
+LegacySession = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+legacy_app = FastAPI()
+
+
+def get_legacy_db():
+    db = LegacySession()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def _legacy_update(db: Session, model, obj_id: int, update_data: dict):
+    obj = db.query(model).filter(model.id == obj_id).first()
+    for field, value in update_data.items():
+        setattr(obj, field, value)
+    db.commit()
+    db.refresh(obj)
+    return obj
+
+
+@legacy_app.post("/patients", response_model=PatientResponse)
+def legacy_create_patient(
+    patient_data: PatientCreate,
+    current_user: dict = Depends(check_role(["admin"])),
+    db: Session = Depends(get_legacy_db)
+):
+    db_patient = Patient(**patient_data.dict())
+    db.add(db_patient)
+    db.commit()
+    db.refresh(db_patient)
+    return db_patient
+
+
+@legacy_app.put("/patients/{patient_id}", response_model=PatientResponse)
+def legacy_update_patient(
+    patient_id: int,
+    patient_update: PatientUpdate,
+    current_user: dict = Depends(check_role(["admin"])),
+    db: Session = Depends(get_legacy_db)
+):
+    return _legacy_update(db, Patient, patient_id, patient_update.dict(exclude_unset=True))
+
+
+@legacy_app.put("/appointments/{appointment_id}", response_model=AppointmentResponse)
+def legacy_update_appointment(
+    appointment_id: int,
+    appointment_update: AppointmentUpdate,
+    current_user: dict = Depends(check_role(["admin"])),
+    db: Session = Depends(get_legacy_db)
+):
+    return _legacy_update(db, Appointment, appointment_id, appointment_update.dict(exclude_unset=True))
+
+
+@legacy_app.post("/bills", response_model=BillResponse)
+def legacy_create_bill(
+    bill_data: BillCreate,
+    current_user: dict = Depends(check_role(["admin"])),
+    db: Session = Depends(get_legacy_db)
+):
+    db_bill = Bill(
+        patient_id=bill_data.patient_id,
+        bill_number=f"BILL-{uuid.uuid4().hex[:8].upper()}",
+        amount=bill_data.amount,
+        tax=bill_data.tax or 0.0,
+        total_amount=bill_data.amount + (bill_data.tax or 0.0),
+        due_date=bill_data.due_date
+    )
+    db.add(db_bill)
+    db.commit()
+    db.refresh(db_bill)
+    return db_bill
+
+
+@legacy_app.put("/bills/{bill_id}", response_model=BillResponse)
+def legacy_update_bill(
+    bill_id: int,
+    bill_update: BillUpdate,
+    current_user: dict = Depends(check_role(["admin"])),
+    db: Session = Depends(get_legacy_db)
+):
+    update_data = bill_update.dict(exclude_unset=True)
+    bill = db.query(Bill).filter(Bill.id == bill_id).first()
+    # Stored amounts are Decimals, request amounts floats
+    amount, tax = to_money(update_data.get("amount", bill.amount)), to_money(update_data.get("tax", bill.tax))
+    update_data["total_amount"] = amount + tax
+    return _legacy_update(db, Bill, bill_id, update_data)
+
+
+def measure(fn):
+    """Return (round trips per call, mean latency in ms) for fn."""
+    statements.clear()
+    start = time.perf_counter()
+    for i in range(ITERATIONS):
+        response = fn(i)
+        assert response.status_code == 200, response.text
+    elapsed = time.perf_counter() - start
+    return len(statements) / ITERATIONS, elapsed * 1000 / ITERATIONS
+
+
+def main():
+    client = TestClient(app)
+    legacy_client = TestClient(legacy_app)
+    token = create_access_token(data={"sub": "1", "role": "admin"})
+    headers = {"Authorization": f"Bearer {token}"}
+
+    patient_id = client.post("/api/v1/patients", json={
+        "first_name": "Bench", "last_name": "Patient",
+        "date_of_birth": "1980-01-01", "gender": "Female"
+    }, headers=headers).json()["id"]
+    suffix = uuid.uuid4().hex[:8]  # the doctor's unique fields must not clash with an earlier run
+    doctor_id = client.post("/api/v1/doctors", json={
+        "email": f"bench.{suffix}@example.com", "username": f"bench_{suffix}", "full_name": "Bench Doctor",
+        "password": "benchpass123", "specialization": "General Practice", "license_number": f"BENCH-{suffix}",
+        "phone": "555-0100"
+    }, headers=headers).json()["user_id"]
+    appointment_id = client.post("/api/v1/appointments", json={
+        "patient_id": patient_id, "doctor_id": doctor_id,
+        "appointment_date": "2024-01-01T09:00:00", "reason": "Bench"
+    }, headers=headers).json()["id"]
+    bill_id = client.post("/api/v1/billing/bills", json={
+        "patient_id": patient_id, "amount": 100.0, "tax": 10.0,
+        "due_date": "2024-02-01T00:00:00"
+    }, headers=headers).json()["id"]
+
+    patient = lambda i: {
+        "first_name": f"P{i}", "last_name": "Bench",
+        "date_of_birth": "1980-01-01", "gender": "Male"
+    }
+    bill = {"patient_id": patient_id, "amount": 50.0, "tax": 5.0, "due_date": "2024-02-01T00:00:00"}
+
+    cases = [
+        ("create_patient", "POST", "/api/v1/patients", "/patients", patient),
+        ("update_patient", "PUT", f"/api/v1/patients/{patient_id}", f"/patients/{patient_id}",
+         lambda i: {"phone": str(i)}),
+        ("update_appointment", "PUT", f"/api/v1/appointments/{appointment_id}",
+         f"/appointments/{appointment_id}", lambda i: {"notes": str(i)}),
+        ("create_bill", "POST", "/api/v1/billing/bills", "/bills", lambda i: bill),
+        ("update_bill", "PUT", f"/api/v1/billing/bills/{bill_id}", f"/bills/{bill_id}",
+         lambda i: {"tax": float(i)}),
+    ]
+
+    print(f"{'endpoint':<20} {'legacy trips':>12} {'current trips':>14} {'legacy ms':>10} {'current ms':>11}")
+    for name, method, path, legacy_path, body in cases:
+        legacy_trips, legacy_ms = measure(
+            lambda i: legacy_client.request(method, legacy_path, json=body(i), headers=headers)
+        )
+        current_trips, current_ms = measure(
+            lambda i: client.request(method, path, json=body(i), headers=headers)
+        )
+        print(f"{name:<20} {legacy_trips:>12.1f} {current_trips:>14.1f} "
+              f"{legacy_ms:>10.2f} {current_ms:>11.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+#!/usr/bin/env python
+"""Deliver pending outbox events through the configured sink.
+
+Runs alongside (or instead of) the in-process dispatcher; several
+copies can run at once since each batch is claimed before delivery.
+"""
+import argparse
+import sys
+import time
+sys.path.insert(0, '.')
+
+from app.core.config import get_settings
+from app.db.session import SessionLocal
+from app.services.outbox import OutboxDispatcher, build_sink
+
+settings = get_settings()
+
+parser = argparse.ArgumentParser(description=__doc__)
+parser.add_argument("--sink", default=settings.outbox_sink, help="Override OUTBOX_SINK (file, http, memory)")
+parser.add_argument("--target", default=settings.outbox_target, help="Override OUTBOX_TARGET")
+parser.add_argument("--batch-size", type=int, default=settings.outbox_batch_size, help="Override OUTBOX_BATCH_SIZE")
+parser.add_argument("--once", action="store_true", help="Drain due events once and exit")
+args = parser.parse_args()
+
+sink = build_sink(args.sink, args.target)
+if sink is None:
+    parser.error("an outbox sink is required (set OUTBOX_SINK or pass --sink)")
+dispatcher = OutboxDispatcher(sink, batch_size=args.batch_size, max_attempts=settings.outbox_max_attempts)
+
+db = SessionLocal()
+try:
+    while True:
+        delivered = dispatcher.dispatch(db)
+        if args.once:
+            print(f"✓ Delivered {delivered} events")
+            break
+        if not delivered:
+            time.sleep(settings.outbox_poll_seconds)
+finally:
+    db.close()
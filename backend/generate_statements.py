@@ -0,0 +1,44 @@
+#!/usr/bin/env python
+"""Render month-end patient statements to PDF.
+
+Rerunning an interrupted period resumes where it stopped; --restart
+renders the whole period again.
+"""
+import argparse
+import sys
+from datetime import date
+sys.path.insert(0, '.')
+
+from app.db.session import SessionLocal
+from app.services.statements import generate_statements
+
+last_month = (date.today().replace(day=1) - date.resolution).strftime("%Y-%m")
+
+parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+parser.add_argument("--period", default=last_month, help="Statement month as YYYY-MM (default: last month)")
+parser.add_argument("--output-dir", default=None, help="Override STATEMENT_OUTPUT_DIR")
+parser.add_argument("--workers", type=int, default=None, help="Render processes (default: one per core)")
+parser.add_argument("--chunk-size", type=int, default=None, help="Patients per chunk")
+parser.add_argument("--restart", action="store_true", help="Ignore saved progress")
+
+
+def report(progress: dict) -> None:
+    print(
+        f"\r  {progress['patients_scanned']}/{progress['total_patients']} patients, "
+        f"{progress['statements_written']} statements, {progress['statements_per_second']}/s",
+        end="", flush=True
+    )
+
+
+# Guarded so render processes started with "spawn" do not rerun the job
+if __name__ == "__main__":
+    args = parser.parse_args()
+    db = SessionLocal()
+    try:
+        result = generate_statements(
+            db, args.period, output_dir=args.output_dir, workers=args.workers,
+            chunk_size=args.chunk_size, restart=args.restart, on_progress=report
+        )
+        print(f"\n✓ Statements for {args.period}: {result['statements_written']} written")
+    finally:
+        db.close()
@@ -181,6 +181,8 @@ try:
             amount=amount,
             tax=tax,
             total_amount=total_amount,
+            amount_paid=total_amount if i % 2 == 0 else 0,
+            balance_due=0 if i % 2 == 0 else total_amount,
             status=BillStatus.PAID if i % 2 == 0 else BillStatus.PENDING,
             description=f"Medical services for patient {i+1}",
             due_date=datetime.now() + timedelta(days=30)
@@ -0,0 +1,20 @@
+#!/usr/bin/env python
+"""Hard-purge soft-deleted patients, doctors and users past retention."""
+import argparse
+import sys
+sys.path.insert(0, '.')
+
+from app.db.session import SessionLocal
+from app.services.purge import run_purge
+
+parser = argparse.ArgumentParser(description=__doc__)
+parser.add_argument("--retention-days", type=int, default=None, help="Override SOFT_DELETE_RETENTION_DAYS")
+parser.add_argument("--batch-size", type=int, default=None, help="Override PURGE_BATCH_SIZE")
+args = parser.parse_args()
+
+db = SessionLocal()
+try:
+    stats = run_purge(db, retention_days=args.retention_days, batch_size=args.batch_size)
+    print(f"✓ Purge complete: {stats}")
+finally:
+    db.close()
@@ -1,4 +1,17 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import pytest
 from fastapi import status
+from sqlalchemy import func, select
+from sqlalchemy.orm import sessionmaker
+from starlette.websockets import WebSocketDisconnect
+
+from app.core.security import create_access_token
+from app.db.session import get_db
+from app.main import app
+from app.models.appointment import AppointmentSlot
+from app.services.outbox import MemorySink, OutboxDispatcher
 
 
 def test_create_appointment(client):
@@ -50,3 +63,193 @@ def test_update_appointment_status(client):
     assert response.status_code == status.HTTP_200_OK
     data = response.json()
     assert data["status"] == "completed"
+
+
+def test_update_missing_appointment(client, auth_headers):
+    """Test that updating an unknown appointment is a 404, not a silent no-op."""
+    response = client.put(
+        "/api/v1/appointments/999999",
+        json={"status": "cancelled"},
+        headers=auth_headers
+    )
+    
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+def test_appointment_events_are_dispatched(client, auth_headers, test_db, patient_id, doctor_id):
+    """Test that creating and cancelling an appointment queues events for the dispatcher."""
+    create_response = client.post(
+        "/api/v1/appointments",
+        json={
+            "patient_id": patient_id,
+            "doctor_id": doctor_id,
+            "appointment_date": "2024-03-01T09:00:00",
+            "reason": "Vaccination"
+        },
+        headers=auth_headers
+    )
+    appointment_id = create_response.json()["id"]
+    client.put(
+        f"/api/v1/appointments/{appointment_id}",
+        json={"status": "cancelled"},
+        headers=auth_headers
+    )
+    
+    sink = MemorySink()
+    sink.fail_next = 1
+    dispatcher = OutboxDispatcher(sink, backoff_base_seconds=0)
+    assert dispatcher.dispatch(test_db) == 0
+    assert dispatcher.dispatch(test_db) == 2
+    
+    assert [message["type"] for message in sink.messages] == ["appointment.created", "appointment.cancelled"]
+    assert all(message["aggregate_id"] == appointment_id for message in sink.messages)
+    assert dispatcher.dispatch(test_db) == 0
+
+
+def test_live_feed_resumes_from_event_id(client, auth_headers, patient_id, doctor_id):
+    """Test that a WebSocket client resuming from an event id receives later changes."""
+    create_response = client.post(
+        "/api/v1/appointments",
+        json={
+            "patient_id": patient_id,
+            "doctor_id": doctor_id,
+            "appointment_date": "2024-03-02T11:00:00",
+            "reason": "Check-in"
+        },
+        headers=auth_headers
+    )
+    appointment_id = create_response.json()["id"]
+    token = create_access_token(data={"sub": "1", "role": "receptionist"})
+    
+    with client.websocket_connect(f"/api/v1/live/ws?since=0&doctor_id={doctor_id}&access_token={token}") as websocket:
+        message = websocket.receive_json()
+    
+    assert message["type"] == "appointment.created"
+    assert message["data"]["appointment_id"] == appointment_id
+    assert message["id"] > 0
+    
+    # Doctors may only follow their own schedule
+    other_doctor = create_access_token(data={"sub": str(doctor_id + 1), "role": "doctor"})
+    with pytest.raises(WebSocketDisconnect):
+        with client.websocket_connect(f"/api/v1/live/ws?doctor_id={doctor_id}&access_token={other_doctor}"):
+            pass
+
+
+def test_concurrent_bookings_never_double_book(client, auth_headers, test_db, patient_id, doctor_id):
+    """Test that parallel bookings of the same slots succeed exactly once per slot."""
+    # A session per request, as in production, so the bookings really race
+    RequestSession = sessionmaker(bind=test_db.get_bind(), expire_on_commit=False)
+    
+    def request_db():
+        db = RequestSession()
+        try:
+            yield db
+        finally:
+            db.close()
+    
+    app.dependency_overrides[get_db] = request_db
+    slots = [f"2024-04-01T{9 + i // 4:02d}:{i % 4 * 15:02d}:00" for i in range(10)]
+    
+    def book(n):
+        return client.post(
+            "/api/v1/appointments",
+            json={
+                "patient_id": patient_id,
+                "doctor_id": doctor_id,
+                "appointment_date": slots[n % len(slots)],
+                "reason": f"Booking {n}"
+            },
+            headers=auth_headers
+        ).status_code
+    
+    with ThreadPoolExecutor(max_workers=50) as pool:
+        codes = list(pool.map(book, range(300)))
+    
+    assert codes.count(status.HTTP_200_OK) == len(slots)
+    assert codes.count(status.HTTP_409_CONFLICT) == 300 - len(slots)
+    assert test_db.execute(select(func.count(AppointmentSlot.id))).scalar() == len(slots)
+    
+    # An unknown patient is a bad request, not a taken slot
+    response = client.post(
+        "/api/v1/appointments",
+        json={
+            "patient_id": 999999,
+            "doctor_id": doctor_id,
+            "appointment_date": "2024-04-02T09:00:00",
+            "reason": "Unknown patient"
+        },
+        headers=auth_headers
+    )
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert response.json()["detail"] == "Patient or doctor not found"
+
+
+def test_calendar_groups_appointments_by_day(client, auth_headers, patient_id, doctor_id):
+    """Test that the calendar returns a doctor's appointments bucketed by day."""
+    for appointment_date in ("2024-06-03T09:00:00", "2024-06-03T10:30:00", "2024-06-05T14:00:00", "2024-07-01T09:00:00"):
+        client.post(
+            "/api/v1/appointments",
+            json={
+                "patient_id": patient_id,
+                "doctor_id": doctor_id,
+                "appointment_date": appointment_date,
+                "reason": "Follow-up"
+            },
+            headers=auth_headers
+        )
+    
+    response = client.get(
+        f"/api/v1/appointments/calendar?doctor_id={doctor_id}&from=2024-06-01&to=2024-06-30",
+        headers=auth_headers
+    )
+    
+    assert response.status_code == status.HTTP_200_OK
+    days = response.json()["days"]
+    assert [day["date"] for day in days] == ["2024-06-03", "2024-06-05"]
+    assert [entry["start"] for entry in days[0]["appointments"]] == ["09:00", "10:30"]
+    assert set(days[0]["appointments"][0]) == {"id", "start", "status", "reason", "patient_id", "patient_name"}
+    assert days[0]["appointments"][0]["patient_name"] == "Test Patient"
+
+
+def test_cancellation_offers_slot_to_waitlist(client, auth_headers, patient_id, doctor_id):
+    """Test that cancelling an appointment offers its slot to the best matching waitlist entry."""
+    day = (datetime.utcnow() + timedelta(days=2)).replace(hour=0, minute=0, second=0, microsecond=0)
+    appointment_id = client.post(
+        "/api/v1/appointments",
+        json={
+            "patient_id": patient_id,
+            "doctor_id": doctor_id,
+            "appointment_date": (day + timedelta(hours=10)).isoformat(),
+            "reason": "Consultation"
+        },
+        headers=auth_headers
+    ).json()["id"]
+    
+    entry_ids = []
+    for priority, window_start in ((1, 9), (5, 9), (9, 13)):
+        response = client.post(
+            "/api/v1/waitlist",
+            json={
+                "patient_id": patient_id,
+                "doctor_id": doctor_id,
+                "reason": "Earlier slot wanted",
+                "priority": priority,
+                "windows": [{
+                    "window_start": (day + timedelta(hours=window_start)).isoformat(),
+                    "window_end": (day + timedelta(hours=window_start + 3)).isoformat()
+                }]
+            },
+            headers=auth_headers
+        )
+        entry_ids.append(response.json()["id"])
+    
+    client.put(f"/api/v1/appointments/{appointment_id}", json={"status": "cancelled"}, headers=auth_headers)
+    
+    # Highest priority whose window contains 10:00; the priority 9 entry wants the afternoon
+    statuses = [client.get(f"/api/v1/waitlist/{entry_id}", headers=auth_headers).json()["status"] for entry_id in entry_ids]
+    assert statuses == ["waiting", "offered", "waiting"]
+    
+    response = client.post(f"/api/v1/waitlist/{entry_ids[1]}/accept", headers=auth_headers)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["status"] == "booked"
+
@@ -128,3 +128,20 @@ def test_get_current_user(client, test_db):
     assert response.status_code == status.HTTP_200_OK
     data = response.json()
     assert data["email"] == "testuser@example.com"
+
+
+def test_registration_with_deleted_users_email(client, auth_headers):
+    """Test that a soft-deleted user's email stays taken until the purge frees it."""
+    user = {
+        "email": "gone@example.com",
+        "username": "gone",
+        "full_name": "Gone User",
+        "password": "testpass123",
+        "role": "receptionist"
+    }
+    user_id = client.post("/api/v1/auth/register", json=user).json()["user"]["id"]
+    client.delete(f"/api/v1/users/{user_id}", headers=auth_headers)
+    
+    response = client.post("/api/v1/auth/register", json={**user, "username": "back"})
+    
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
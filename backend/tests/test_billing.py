@@ -1,4 +1,11 @@
+import json
 from fastapi import status
+from datetime import datetime, timedelta
+
+from app.core.idempotency import _sha256
+from app.models.idempotency import IdempotencyRecord
+from app.services import analytics
+from app.services.statements import generate_statements, statement_path
 
 
 def test_create_bill(client):
@@ -55,3 +62,243 @@ def test_create_payment(client):
     assert response.status_code == status.HTTP_200_OK
     data = response.json()
     assert data["amount"] == 110.00
+
+
+def test_create_bill_idempotency_key_replays(client, auth_headers, patient_id):
+    """Test that retrying a POST with the same Idempotency-Key does not create a duplicate."""
+    headers = {**auth_headers, "Idempotency-Key": "bill-retry-1"}
+    bill = {
+        "patient_id": patient_id,
+        "amount": 80.00,
+        "tax": 8.00,
+        "due_date": "2024-03-15T00:00:00"
+    }
+    
+    first = client.post("/api/v1/billing/bills", json=bill, headers=headers)
+    retry = client.post("/api/v1/billing/bills", json=bill, headers=headers)
+    
+    assert first.status_code == status.HTTP_200_OK
+    assert retry.status_code == status.HTTP_200_OK
+    assert retry.json()["id"] == first.json()["id"]
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    
+    # Same key with a different body is rejected
+    response = client.post("/api/v1/billing/bills", json={**bill, "amount": 1.00}, headers=headers)
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
+def test_abandoned_idempotency_claim_is_taken_over(client, auth_headers, test_db, patient_id):
+    """Test that a key left in flight by a dead worker is only busy until its lease runs out."""
+    headers = {**auth_headers, "Idempotency-Key": "bill-crashed-1", "Content-Type": "application/json"}
+    bill = json.dumps({"patient_id": patient_id, "amount": 20.00, "due_date": "2024-03-15T00:00:00"}).encode()
+    claimed_at = datetime.utcnow()
+    record = IdempotencyRecord(
+        key_hash=_sha256(b"1:/api/v1/billing/bills:bill-crashed-1"), request_hash=_sha256(bill),
+        created_at=claimed_at, expires_at=claimed_at + timedelta(hours=24)
+    )
+    test_db.add(record)
+    test_db.commit()
+    
+    response = client.post("/api/v1/billing/bills", content=bill, headers=headers)
+    assert response.status_code == status.HTTP_409_CONFLICT
+    
+    record.created_at = claimed_at - timedelta(hours=1)
+    test_db.commit()
+    response = client.post("/api/v1/billing/bills", content=bill, headers=headers)
+    assert response.status_code == status.HTTP_200_OK
+    retry = client.post("/api/v1/billing/bills", content=bill, headers=headers)
+    assert retry.json()["id"] == response.json()["id"]
+
+
+def test_bill_numbers_are_sequential(client, auth_headers, patient_id):
+    """Test that bill numbers are allocated in increasing order."""
+    bill = {
+        "patient_id": patient_id,
+        "amount": 40.00,
+        "due_date": "2024-04-01T00:00:00"
+    }
+    
+    first = client.post("/api/v1/billing/bills", json=bill, headers=auth_headers).json()["bill_number"]
+    second = client.post("/api/v1/billing/bills", json=bill, headers=auth_headers).json()["bill_number"]
+    
+    facility, year, sequence = first.rsplit("-", 2)
+    assert second == f"{facility}-{year}-{int(sequence) + 1:07d}"
+
+
+def test_partial_payments_update_balance(client, auth_headers, patient_id):
+    """Test that partial payments accumulate into the bill balance and status."""
+    bill_response = client.post(
+        "/api/v1/billing/bills",
+        json={
+            "patient_id": patient_id,
+            "amount": 100.00,
+            "tax": 0.00,
+            "due_date": "2024-05-01T00:00:00"
+        },
+        headers=auth_headers
+    )
+    
+    bill_id = bill_response.json()["id"]
+    
+    for _ in range(2):
+        client.post(
+            f"/api/v1/billing/bills/{bill_id}/payments",
+            json={"amount": 30.00, "payment_method": "cash"},
+            headers=auth_headers
+        )
+    
+    data = client.get(f"/api/v1/billing/bills/{bill_id}", headers=auth_headers).json()
+    assert data["amount_paid"] == 60.00
+    assert data["balance_due"] == 40.00
+    assert data["status"] == "partially_paid"
+    
+    client.post(
+        f"/api/v1/billing/bills/{bill_id}/payments",
+        json={"amount": 40.00, "payment_method": "credit_card"},
+        headers=auth_headers
+    )
+    
+    data = client.get(f"/api/v1/billing/bills/{bill_id}", headers=auth_headers).json()
+    assert data["balance_due"] == 0.00
+    assert data["status"] == "paid"
+
+
+def test_bill_reads_serialize_nested_payments(client, auth_headers, patient_id):
+    """Test that the one-pass serializer keeps nested payments and the ETag."""
+    bill_id = client.post("/api/v1/billing/bills", json={
+        "patient_id": patient_id, "amount": 100.00, "tax": 5.00, "due_date": "2024-05-01T00:00:00"
+    }, headers=auth_headers).json()["id"]
+    client.post(
+        f"/api/v1/billing/bills/{bill_id}/payments",
+        json={"amount": 25.50, "payment_method": "cash"},
+        headers=auth_headers
+    )
+    
+    response = client.get(f"/api/v1/billing/bills?patient_id={patient_id}&limit=100", headers=auth_headers)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"] == "application/json"
+    [bill] = response.json()
+    assert bill["total_amount"] == 105.00
+    assert bill["balance_due"] == 79.50
+    assert [(p["amount"], p["payment_method"]) for p in bill["payments"]] == [(25.50, "cash")]
+    
+    response = client.get(f"/api/v1/billing/bills/{bill_id}", headers=auth_headers)
+    assert response.headers["ETag"] == f'"{response.json()["version"]}"'
+    assert response.json()["payments"][0]["bill_id"] == bill_id
+    
+    patient = client.get(f"/api/v1/patients/{patient_id}", headers=auth_headers).json()
+    assert patient["email"] == "test.patient@example.com"
+
+
+def test_bill_list_expands_patient(client, auth_headers, patient_id):
+    """Test that expand=patient embeds a patient summary and unknown expansions are rejected."""
+    client.post("/api/v1/billing/bills", json={
+        "patient_id": patient_id, "amount": 40.00, "tax": 0, "due_date": "2024-05-01T00:00:00"
+    }, headers=auth_headers)
+    
+    response = client.get(
+        f"/api/v1/billing/bills?patient_id={patient_id}&expand=patient&fields=amount", headers=auth_headers
+    )
+    assert response.status_code == status.HTTP_200_OK
+    [bill] = response.json()
+    assert bill["patient"] == {
+        "id": patient_id, "first_name": "Test", "last_name": "Patient", "date_of_birth": "1980-01-01"
+    }
+    assert "patient" not in client.get("/api/v1/billing/bills", headers=auth_headers).json()[0]
+    
+    for expand in ("doctor", "patient.bills"):
+        response = client.get(f"/api/v1/billing/bills?expand={expand}", headers=auth_headers)
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+def test_aging_report_tracks_bills_and_payments(client, auth_headers, patient_id):
+    """Test that the aging report reflects new bills and payments without a rebuild."""
+    bill_response = client.post(
+        "/api/v1/billing/bills",
+        json={
+            "patient_id": patient_id,
+            "amount": 200.00,
+            "tax": 0.00,
+            "due_date": "2099-01-01T00:00:00"
+        },
+        headers=auth_headers
+    )
+    bill_id = bill_response.json()["id"]
+    before = client.get(f"/api/v1/billing/aging?patient_id={patient_id}", headers=auth_headers).json()["totals"]
+    
+    client.post(
+        f"/api/v1/billing/bills/{bill_id}/payments",
+        json={"amount": 50.00, "payment_method": "cash"},
+        headers=auth_headers
+    )
+    
+    response = client.get(f"/api/v1/billing/aging?patient_id={patient_id}", headers=auth_headers)
+    assert response.status_code == status.HTTP_200_OK
+    after = response.json()["totals"]
+    assert after["days_0_30"] == before["days_0_30"] - 50.00
+    assert after["total"] == before["total"] - 50.00
+
+
+def test_statements_render_and_resume(client, auth_headers, test_db, tmp_path, patient_id):
+    """Test that statement generation writes a PDF per billed patient and skips a finished run."""
+    client.post(
+        "/api/v1/billing/bills",
+        json={
+            "patient_id": patient_id,
+            "amount": 80.00,
+            "tax": 0.00,
+            "due_date": "2099-01-01T00:00:00"
+        },
+        headers=auth_headers
+    )
+    period = datetime.utcnow().strftime("%Y-%m")
+    
+    progress = generate_statements(test_db, period, output_dir=str(tmp_path), workers=1)
+    assert progress["status"] == "completed"
+    assert progress["statements_written"] == 1
+    with open(statement_path(str(tmp_path), period, patient_id), "rb") as fh:
+        assert fh.read(5) == b"%PDF-"
+    
+    rerun = generate_statements(test_db, period, output_dir=str(tmp_path), workers=1)
+    assert rerun["status"] == "completed"
+    assert rerun["statements_written"] == 1
+
+
+def test_analytics_snapshot_reports(client, auth_headers, test_db, tmp_path, patient_id):
+    """Test that reports computed from a snapshot match the bills and payments."""
+    bill = client.post(
+        "/api/v1/billing/bills",
+        json={
+            "patient_id": patient_id,
+            "amount": 100.00,
+            "tax": 10.00,
+            "due_date": "2099-01-01T00:00:00"
+        },
+        headers=auth_headers
+    ).json()
+    client.post(
+        f"/api/v1/billing/bills/{bill['id']}/payments",
+        json={"amount": 40.00, "payment_method": "cash"},
+        headers=auth_headers
+    )
+    month = datetime.utcnow().strftime("%Y-%m")
+    
+    manifest = analytics.build_snapshot(test_db.get_bind(), str(tmp_path))
+    assert manifest["rows"]["bills"] == 1
+    snapshot = analytics.current_snapshot(str(tmp_path))
+    
+    revenue = analytics.revenue_by_doctor_month(snapshot, start=month, end=month)
+    assert revenue == [{
+        "doctor_id": None,
+        "doctor_name": None,
+        "month": month,
+        "bills": 1,
+        "billed": 110.0,
+        "collected": 40.0,
+    }]
+    methods = analytics.payment_method_mix(snapshot)
+    assert methods[0]["payment_method"] == "cash"
+    assert methods[0]["share"] == 1.0
+    assert analytics.revenue_by_doctor_month(snapshot, end="2000-01") == []
+
+
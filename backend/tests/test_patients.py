@@ -1,6 +1,13 @@
 import pytest
 from fastapi import status
 from datetime import date
+from sqlalchemy import event
+from sqlalchemy.orm import sessionmaker
+
+from app.main import app
+from app.db.session import get_db
+from app.core import security
+from app.services.audit import audit_logger
 
 
 def test_create_patient(client):
@@ -102,3 +109,363 @@ def test_update_patient(client):
     assert response.status_code == status.HTTP_200_OK
     data = response.json()
     assert data["phone"] == "555-9999"
+
+
+def test_update_patient_stale_if_match(client, auth_headers):
+    """Test that an update carrying an outdated ETag is rejected."""
+    create_response = client.post(
+        "/api/v1/patients",
+        json={
+            "first_name": "Carol",
+            "last_name": "Davis",
+            "date_of_birth": "1975-11-02",
+            "gender": "Female"
+        },
+        headers=auth_headers
+    )
+    
+    patient_id = create_response.json()["id"]
+    etag = client.get(f"/api/v1/patients/{patient_id}", headers=auth_headers).headers["ETag"]
+    
+    # First writer wins and bumps the version
+    response = client.put(
+        f"/api/v1/patients/{patient_id}",
+        json={"phone": "555-0001"},
+        headers={**auth_headers, "If-Match": etag}
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["ETag"] != etag
+    
+    # Second writer still holds the old ETag
+    response = client.put(
+        f"/api/v1/patients/{patient_id}",
+        json={"phone": "555-0002"},
+        headers={**auth_headers, "If-Match": etag}
+    )
+    assert response.status_code == status.HTTP_412_PRECONDITION_FAILED
+
+
+def test_sparse_fieldsets(client, auth_headers):
+    """Test that fields trims responses and list views leave out large text columns."""
+    create_response = client.post(
+        "/api/v1/patients",
+        json={
+            "first_name": "Erin",
+            "last_name": "Fields",
+            "date_of_birth": "1992-01-15",
+            "gender": "Female",
+            "address": "9 Sparse Lane",
+            "allergies": "Penicillin"
+        },
+        headers=auth_headers
+    )
+    patient_id = create_response.json()["id"]
+    
+    response = client.get("/api/v1/patients?fields=first_name,last_name", headers=auth_headers)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == [{"id": patient_id, "first_name": "Erin", "last_name": "Fields"}]
+    
+    listed = client.get("/api/v1/patients", headers=auth_headers).json()[0]
+    assert "address" not in listed and "allergies" not in listed
+    assert client.get("/api/v1/patients?fields=*", headers=auth_headers).json()[0]["allergies"] == "Penicillin"
+    
+    response = client.get(f"/api/v1/patients/{patient_id}", headers=auth_headers)
+    assert response.json()["address"] == "9 Sparse Lane"
+    assert "ETag" in response.headers
+    
+    response = client.get("/api/v1/patients?fields=first_name,ssn", headers=auth_headers)
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert "ssn" in response.json()["detail"]
+
+
+def test_patient_chart_loads_in_fixed_queries(client, auth_headers, test_db, patient_id):
+    """Test that the chart bundle takes the same number of queries however long the history."""
+    statements = []
+    event.listen(test_db.get_bind(), "before_cursor_execute", lambda *args: statements.append(args[2]))
+    
+    def add_bills(count):
+        for _ in range(count):
+            bill_id = client.post("/api/v1/billing/bills", json={
+                "patient_id": patient_id, "amount": 50.00, "tax": 0, "due_date": "2024-05-01T00:00:00"
+            }, headers=auth_headers).json()["id"]
+            client.post(
+                f"/api/v1/billing/bills/{bill_id}/payments",
+                json={"amount": 10.00, "payment_method": "cash"},
+                headers=auth_headers
+            )
+    
+    def chart(query="", **headers):
+        statements.clear()
+        response = client.get(f"/api/v1/patients/{patient_id}/chart?limit=3{query}", headers={**auth_headers, **headers})
+        return response, len(statements)
+    
+    add_bills(2)
+    response, queries = chart()
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["patient"]["id"] == patient_id
+    assert response.json()["bills"]["has_more"] is False
+    
+    add_bills(6)
+    response, more_queries = chart()
+    bills = response.json()["bills"]
+    assert more_queries == queries
+    assert len(bills["items"]) == 3 and bills["has_more"] is True
+    assert all(len(bill["payments"]) == 1 for bill in bills["items"])
+    
+    last_page = chart("&bills_skip=6")[0].json()["bills"]
+    assert (len(last_page["items"]), last_page["skip"], last_page["has_more"]) == (2, 6, False)
+    
+    etag = response.headers["ETag"]
+    assert chart(**{"If-None-Match": etag})[0].status_code == status.HTTP_304_NOT_MODIFIED
+    add_bills(1)
+    assert chart(**{"If-None-Match": etag})[0].status_code == status.HTTP_200_OK
+
+
+def test_patients_by_ids(client, auth_headers, test_db):
+    """Test that ids returns the requested patients in order and reports the missing ones."""
+    patient_ids = [
+        client.post("/api/v1/patients", json={
+            "first_name": name, "last_name": "Lookup", "date_of_birth": "2000-01-01", "gender": "Female"
+        }, headers=auth_headers).json()["id"]
+        for name in ("Ann", "Bea", "Cy")
+    ]
+    ids = [patient_ids[2], 999999, patient_ids[0], patient_ids[2]]
+    
+    response = client.get(
+        f"/api/v1/patients?ids={','.join(map(str, ids))}&fields=first_name", headers=auth_headers
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert [patient["first_name"] for patient in response.json()] == ["Cy", "Ann"]
+    assert response.headers["X-Missing-Ids"] == "999999"
+    
+    response = client.post("/api/v1/patients/lookup", json={"ids": ids}, headers=auth_headers)
+    assert [patient["id"] for patient in response.json()] == [patient_ids[2], patient_ids[0]]
+    assert response.headers["X-Missing-Ids"] == "999999"
+    
+    # Every patient returned is audited, from the cache too
+    response = client.get(
+        f"/api/v1/patients?ids={','.join(map(str, ids))}&fields=first_name", headers=auth_headers
+    )
+    assert response.headers["X-Cache"] == "HIT"
+    audit_logger.flush(test_db)
+    reads = {
+        patient_id: len(client.get(f"/api/v1/audit/phi-access?patient_id={patient_id}", headers=auth_headers).json())
+        for patient_id in (*patient_ids, 999999)
+    }
+    assert reads == {patient_ids[0]: 3, patient_ids[1]: 0, patient_ids[2]: 3, 999999: 0}
+    
+    assert client.get("/api/v1/patients?ids=1,x", headers=auth_headers).status_code == status.HTTP_400_BAD_REQUEST
+    assert client.post("/api/v1/patients/lookup", json={"ids": [1]}).status_code == status.HTTP_403_FORBIDDEN
+
+
+def test_patient_list_reads_rows_without_orm_objects(client, auth_headers, test_db):
+    """Test that list pages are served from Core rows and leave the session's identity map empty."""
+    for name in ("Row", "Mapping"):
+        client.post("/api/v1/patients", json={
+            "first_name": name, "last_name": "Reader", "date_of_birth": "1995-05-05", "gender": "Female"
+        }, headers=auth_headers)
+    test_db.expunge_all()
+    
+    response = client.get("/api/v1/patients?fields=first_name", headers=auth_headers)
+    assert [patient["first_name"] for patient in response.json()] == ["Row", "Mapping"]
+    response = client.get("/api/v1/billing/bills?expand=patient", headers=auth_headers)
+    assert response.status_code == status.HTTP_200_OK
+    assert len(test_db.identity_map) == 0
+
+
+def test_patient_list_total_count(client, auth_headers):
+    """Test that count adds X-Total-Count and a cached count is dropped when patients change."""
+    def create(name):
+        return client.post("/api/v1/patients", json={
+            "first_name": name, "last_name": "Counted", "date_of_birth": "1980-02-02", "gender": "Male"
+        }, headers=auth_headers).json()["id"]
+    
+    first_id = create("Uno")
+    create("Dos")
+    
+    response = client.get("/api/v1/patients?limit=1", headers=auth_headers)
+    assert len(response.json()) == 1
+    assert "X-Total-Count" not in response.headers
+    
+    response = client.get("/api/v1/patients?limit=1&count=exact", headers=auth_headers)
+    assert response.headers["X-Total-Count"] == "2"
+    assert response.headers["X-Total-Count-Mode"] == "exact"
+    
+    assert client.get("/api/v1/patients?count=cached", headers=auth_headers).headers["X-Total-Count"] == "2"
+    create("Tres")
+    assert client.get("/api/v1/patients?count=cached", headers=auth_headers).headers["X-Total-Count"] == "3"
+    client.delete(f"/api/v1/patients/{first_id}", headers=auth_headers)
+    response = client.get("/api/v1/patients?count=estimated", headers=auth_headers)
+    assert response.headers["X-Total-Count"] == "2"
+    assert response.headers["X-Total-Count-Mode"] == "cached"  # no optimizer estimate on SQLite
+    
+    assert client.get("/api/v1/patients?count=all", headers=auth_headers).status_code == 422
+
+
+def test_deleted_patient_is_hidden(client, auth_headers):
+    """Test that a soft-deleted patient disappears from reads."""
+    create_response = client.post(
+        "/api/v1/patients",
+        json={
+            "first_name": "Dan",
+            "last_name": "Evans",
+            "date_of_birth": "1960-04-22",
+            "gender": "Male"
+        },
+        headers=auth_headers
+    )
+    
+    patient_id = create_response.json()["id"]
+    
+    response = client.delete(f"/api/v1/patients/{patient_id}", headers=auth_headers)
+    assert response.status_code == status.HTTP_200_OK
+    
+    response = client.get(f"/api/v1/patients/{patient_id}", headers=auth_headers)
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+    
+    response = client.delete(f"/api/v1/patients/{patient_id}", headers=auth_headers)
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+def test_patient_reads_are_audited(client, auth_headers, test_db):
+    """Test that reading a patient is recorded in the PHI access log once flushed."""
+    create_response = client.post(
+        "/api/v1/patients",
+        json={
+            "first_name": "Audit",
+            "last_name": "Subject",
+            "email": "audit.subject@example.com",
+            "phone": "555-0100",
+            "date_of_birth": "1985-05-05",
+            "gender": "F",
+            "address": "1 Audit Way"
+        },
+        headers=auth_headers
+    )
+    patient_id = create_response.json()["id"]
+    client.get(f"/api/v1/patients/{patient_id}", headers=auth_headers)
+    audit_logger.flush(test_db)
+    
+    response = client.get(f"/api/v1/audit/phi-access?patient_id={patient_id}", headers=auth_headers)
+    assert response.status_code == status.HTTP_200_OK
+    entries = response.json()
+    assert len(entries) == 1
+    assert entries[0]["action"] == "patient_read"
+    assert entries[0]["user_id"] == 1
+
+
+def test_patient_reads_are_cached_until_updated(client, auth_headers):
+    """Test that repeated reads hit the response cache and an update invalidates it."""
+    create_response = client.post(
+        "/api/v1/patients",
+        json={
+            "first_name": "Cache",
+            "last_name": "Subject",
+            "date_of_birth": "1990-01-01",
+            "gender": "M"
+        },
+        headers=auth_headers
+    )
+    patient_id = create_response.json()["id"]
+    
+    first = client.get(f"/api/v1/patients/{patient_id}", headers=auth_headers)
+    second = client.get(f"/api/v1/patients/{patient_id}", headers=auth_headers)
+    assert first.headers["X-Cache"] == "MISS"
+    assert second.headers["X-Cache"] == "HIT"
+    assert second.json() == first.json()
+    assert second.headers["ETag"] == first.headers["ETag"]
+    
+    client.put(f"/api/v1/patients/{patient_id}", json={"first_name": "Updated"}, headers=auth_headers)
+    
+    third = client.get(f"/api/v1/patients/{patient_id}", headers=auth_headers)
+    assert third.headers["X-Cache"] == "MISS"
+    assert third.json()["first_name"] == "Updated"
+
+
+def test_large_responses_are_compressed(client, auth_headers):
+    """Test that big bodies are gzipped (once, when cached) and small ones are not."""
+    for n in range(30):
+        client.post(
+            "/api/v1/patients",
+            json={
+                "first_name": f"Zip{n}",
+                "last_name": "Subject",
+                "date_of_birth": "1990-01-01",
+                "gender": "F",
+                "address": "12 Compression Road"
+            },
+            headers=auth_headers
+        )
+    headers = {**auth_headers, "Accept-Encoding": "gzip"}
+    
+    first = client.get("/api/v1/patients?limit=100", headers=headers)
+    second = client.get("/api/v1/patients?limit=100", headers=headers)
+    assert first.headers["Content-Encoding"] == "gzip"
+    assert second.headers["X-Cache"] == "HIT"
+    assert second.headers["Content-Encoding"] == "gzip"
+    assert second.headers["Content-Length"] == first.headers["Content-Length"]
+    assert int(first.headers["Content-Length"]) < len(first.content)
+    assert second.json() == first.json()
+    assert len(first.json()) == 30
+    
+    plain = client.get("/api/v1/patients?limit=100", headers={**auth_headers, "Accept-Encoding": "identity"})
+    assert "Content-Encoding" not in plain.headers
+    assert plain.json() == first.json()
+    
+    small = client.get("/api/v1/patients?limit=1", headers=headers)
+    assert "Content-Encoding" not in small.headers
+
+
+def test_batch_runs_sub_requests_in_order(client, auth_headers, test_db, monkeypatch):
+    """Test that a batch authenticates once and returns each sub-response in order."""
+    # Consecutive GETs run in parallel threads, which must not share the test session
+    RequestSession = sessionmaker(bind=test_db.get_bind(), expire_on_commit=False)
+    
+    def request_db():
+        db = RequestSession()
+        try:
+            yield db
+        finally:
+            db.close()
+    
+    app.dependency_overrides[get_db] = request_db
+    patient_id = client.post(
+        "/api/v1/patients",
+        json={"first_name": "Batch", "last_name": "Subject", "date_of_birth": "1990-01-01", "gender": "F"},
+        headers=auth_headers
+    ).json()["id"]
+    
+    verified = []
+    verify_token = security.verify_token
+    monkeypatch.setattr(security, "verify_token", lambda token: verified.append(token) or verify_token(token))
+    
+    response = client.post("/api/v1/batch", json={"requests": [
+        {"path": f"/api/v1/patients/{patient_id}"},
+        {"method": "PUT", "path": f"/api/v1/patients/{patient_id}",
+         "body": {"first_name": "Renamed"}, "headers": {"If-Match": '"1"'}},
+        {"path": f"/api/v1/patients/{patient_id}"},
+        {"path": "/api/v1/patients?limit=10"},
+        {"path": "/api/v1/doctors/9999"},
+    ]}, headers=auth_headers)
+    
+    assert response.status_code == status.HTTP_200_OK
+    assert len(verified) == 1
+    results = response.json()["responses"]
+    assert [result["status"] for result in results] == [200, 200, 200, 200, 404]
+    assert results[0]["body"]["first_name"] == "Batch"
+    assert results[1]["headers"]["etag"] == '"2"'
+    assert results[2]["body"]["first_name"] == "Renamed"
+    assert [patient["id"] for patient in results[3]["body"]] == [patient_id]
+    assert results[4]["body"] == {"detail": "Doctor not found"}
+    
+    too_many = client.post(
+        "/api/v1/batch", json={"requests": [{"path": "/api/v1/patients"}] * 21}, headers=auth_headers
+    )
+    assert too_many.status_code == status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    
+    # However the path is spelled, a batch cannot contain a batch
+    for path in ("/api/v1/%62atch", "/api/v1/patients/../batch"):
+        nested = client.post("/api/v1/batch", json={"requests": [
+            {"method": "POST", "path": path, "body": {"requests": [{"path": "/api/v1/patients"}]}}
+        ]}, headers=auth_headers)
+        assert nested.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
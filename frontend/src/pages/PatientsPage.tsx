@@ -100,8 +100,10 @@ export const PatientsPage: React.FC = () => {
     fetchPatients();
   }, []);
 
-  const handleOpen = (patient?: Patient) => {
-    if (patient) {
+  const handleOpen = async (listed?: Patient) => {
+    if (listed) {
+      // List rows leave out address and allergies, so load the full record to edit
+      const { data: patient } = await api.get<Patient>(`/api/v1/patients/${listed.id}`);
       setEditingId(patient.id);
       formik.setValues({
         first_name: patient.first_name,